@@ -0,0 +1,22 @@
+# gunicorn.conf.py
+# По умолчанию — синхронные WSGI-воркеры. SERVER_MODE=asgi включает
+# uvicorn-воркеры и async-view участника (ASYNC_VIEWS включается в
+# schramberg/asgi.py); остальные view под ASGI идут через общий поток
+# sync_to_async, поэтому режим включается явно, после замеров bench_connections.
+import os
+
+server_mode = os.getenv('SERVER_MODE', 'wsgi')
+
+bind = os.getenv('BIND', '0.0.0.0:8000')
+workers = int(os.getenv('WEB_CONCURRENCY', '3'))
+
+if server_mode == 'asgi':
+    wsgi_app = 'schramberg.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'schramberg.wsgi:application'
+    worker_class = 'sync'
+
+# Держим соединения keep-alive чуть дольше обычного прокси-таймаута
+keepalive = int(os.getenv('KEEPALIVE', '5'))
+timeout = int(os.getenv('WORKER_TIMEOUT', '30'))
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .instrumentation import install_sql_wrapper
+
+        # До первого соединения с БД: счётчик SQL ставится на каждое соединение
+        connection_created.connect(install_sql_wrapper, dispatch_uid='instrumentation_sql_wrapper')
@@ -0,0 +1,84 @@
+# caching.py
+# Кэш целых страниц для анонимных посетителей. Залогиненные участники и
+# сотрудники (и все, у кого есть непоказанные сообщения) получают страницу
+# как раньше — с персональной навигацией. Ответ из кэша поддерживает условный
+# GET: ETag / Last-Modified → 304 без тела. Запросы с query string не
+# кэшируются: у этих страниц нет параметров, а произвольные ?x=N иначе
+# забивали бы кэш. Исходы (hit / miss / not_modified / bypass) считает
+# реестр метрик instrumentation.registry.
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .instrumentation import registry
+
+
+def _is_personal(request):
+    if request.method not in ('GET', 'HEAD'):
+        return True
+    if 'messages' in request.COOKIES:
+        return True
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        # Без сессионной куки персонального ничего быть не может — и сессию не грузим
+        return False
+    session = request.session
+    return 'participant_id' in session or SESSION_KEY in session or '_messages' in session
+
+
+def page_cache_key(request):
+    return f'page:{request.path}'
+
+
+def _finish(response, entry, outcome):
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    response['X-Page-Cache'] = outcome
+    patch_cache_control(response, public=True, max_age=settings.PAGE_CACHE_MAX_AGE)
+    patch_vary_headers(response, ('Cookie',))
+    registry.page_cache(outcome)
+    return response
+
+
+def anonymous_page_cache(view):
+    """Декоратор для статичных страниц: кэш целиком для анонимных GET-запросов."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.PAGE_CACHE_TIMEOUT
+        if not timeout or request.GET or _is_personal(request):
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            response['X-Page-Cache'] = 'bypass'
+            registry.page_cache('bypass')
+            return response
+
+        key = page_cache_key(request)
+        entry = cache.get(key)
+        outcome = 'hit'
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content, usedforsecurity=False).hexdigest()),
+                'last_modified': int(timezone.now().timestamp()),
+            }
+            cache.set(key, entry, timeout)
+            outcome = 'miss'
+
+        conditional = get_conditional_response(
+            request, etag=entry['etag'], last_modified=entry['last_modified'],
+        )
+        if conditional is not None:
+            return _finish(conditional, entry, 'not_modified')
+        return _finish(HttpResponse(entry['content'], content_type=entry['content_type']), entry, outcome)
+    return wrapper
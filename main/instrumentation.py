@@ -0,0 +1,229 @@
+# instrumentation.py
+# Метрики по каждому view (имя URL): гистограмма времени ответа, число и
+# время SQL-запросов, время рендера шаблонов и размер ответа. Отдаются в
+# текстовом формате Prometheus на /metrics; медленные запросы пишутся в лог
+# вместе с самыми долгими SQL. Там же исходы кэша страниц (caching.py).
+# Счётчики — в памяти процесса.
+#
+# SQL считает обёртка execute_wrapper, которая ставится на каждое новое
+# соединение (connection_created, см. apps.py) и пишет в сборщик текущего
+# запроса из contextvar. Так учитываются и запросы async-ORM, которые идут в потоках
+# sync_to_async со своими соединениями.
+
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger('schramberg.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_SQL_SHOWN = 5
+
+_current = ContextVar('instrumentation_request', default=None)
+
+
+class RequestStats:
+    """Всё, что набралось за один запрос."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.statements = []  # (секунды, sql) — для лога медленных запросов
+
+    def add_query(self, sql, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        self.statements.append((seconds, sql))
+
+
+def record_sql(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def install_sql_wrapper(sender, connection, **kwargs):
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.views = defaultdict(ViewMetrics)
+        self.page_cache_outcomes = Counter()
+
+    def observe(self, view, seconds, stats, response_bytes):
+        with self._lock:
+            metrics = self.views[view]
+            metrics.count += 1
+            metrics.seconds += seconds
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics.buckets[i] += 1
+            metrics.queries += stats.queries
+            metrics.sql_seconds += stats.sql_seconds
+            metrics.template_seconds += stats.template_seconds
+            metrics.response_bytes += response_bytes
+
+    def page_cache(self, outcome):
+        with self._lock:
+            self.page_cache_outcomes[outcome] += 1
+
+    def clear(self):
+        with self._lock:
+            self.views.clear()
+            self.page_cache_outcomes.clear()
+
+    def render(self):
+        with self._lock:
+            views = sorted(self.views.items())
+            lines = [
+                '# HELP schramberg_request_duration_seconds Request latency per view.',
+                '# TYPE schramberg_request_duration_seconds histogram',
+            ]
+            for view, metrics in views:
+                for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                    lines.append(f'schramberg_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+                lines.append(f'schramberg_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {metrics.count}')
+                lines.append(f'schramberg_request_duration_seconds_sum{{view="{view}"}} {metrics.seconds:.6f}')
+                lines.append(f'schramberg_request_duration_seconds_count{{view="{view}"}} {metrics.count}')
+            counters = [
+                ('sql_queries_total', 'SQL queries per view.', 'queries', '{}'),
+                ('sql_seconds_total', 'Time spent in SQL per view.', 'sql_seconds', '{:.6f}'),
+                ('template_seconds_total', 'Template render time per view.', 'template_seconds', '{:.6f}'),
+                ('response_bytes_total', 'Response body size per view.', 'response_bytes', '{}'),
+            ]
+            for name, help_text, attr, fmt in counters:
+                lines.append(f'# HELP schramberg_{name} {help_text}')
+                lines.append(f'# TYPE schramberg_{name} counter')
+                for view, metrics in views:
+                    lines.append(f'schramberg_{name}{{view="{view}"}} {fmt.format(getattr(metrics, attr))}')
+            lines.append('# HELP schramberg_page_cache_requests_total Anonymous page cache outcomes.')
+            lines.append('# TYPE schramberg_page_cache_requests_total counter')
+            for outcome, count in sorted(self.page_cache_outcomes.items()):
+                lines.append(f'schramberg_page_cache_requests_total{{outcome="{outcome}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+class InstrumentationMiddleware:
+    """Самый внешний middleware: меряет запрос целиком, включая остальные middleware."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def finish(self, request, response, stats, seconds):
+        view = view_name(request)
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, seconds, stats, size)
+        if seconds * 1000 >= settings.SLOW_REQUEST_MS:
+            slowest = sorted(stats.statements, key=lambda item: item[0], reverse=True)[:SLOW_SQL_SHOWN]
+            logger.warning(
+                "Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, templates %.0f ms\n%s",
+                request.method, request.path, view, seconds * 1000,
+                stats.queries, stats.sql_seconds * 1000, stats.template_seconds * 1000,
+                '\n'.join(f'  {duration * 1000:.1f} ms  {sql}' for duration, sql in slowest),
+            )
+
+
+class TimedTemplate:
+    """Обёртка над шаблоном бэкенда: время render() идёт в статистику запроса."""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedTemplates(DjangoTemplates):
+    """DjangoTemplates, который меряет время рендера (BACKEND в settings.TEMPLATES)."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def metrics_view(request):
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    allowed = (
+        (token and constant_time_compare(authorization, f'Bearer {token}'))
+        or (request.user.is_active and request.user.is_staff)
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
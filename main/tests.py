@@ -1,3 +1,118 @@
-from django.test import TestCase
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from users.models import Participant
+
+from .instrumentation import registry
+
+
+class AnonymousPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get(reverse('about'))
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('about'))
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('Cookie', second['Vary'])
+        self.assertEqual(registry.page_cache_outcomes, {'miss': 1, 'hit': 1})
+
+    def test_conditional_get(self):
+        first = self.client.get(reverse('home'))
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(reverse('home'), HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(registry.page_cache_outcomes['not_modified'], 2)
+
+    def test_logged_in_participant_sees_own_navigation(self):
+        self.client.get(reverse('conference'))
+        participant = Participant.objects.create(first_name='Anna', last_name='Becker', email='anna@example.com', password='x')
+        session = self.client.session
+        session['participant_id'] = participant.id
+        session.save()
+        response = self.client.get(reverse('conference'))
+        self.assertEqual(response['X-Page-Cache'], 'bypass')
+        self.assertContains(response, 'Anna Becker')
+        self.assertContains(response, 'Logout')
+
+    def test_query_string_is_not_cached(self):
+        self.client.get(reverse('about'))
+        for n in range(3):
+            response = self.client.get(reverse('about'), {'x': n})
+            self.assertEqual(response['X-Page-Cache'], 'bypass')
+        self.assertEqual(self.client.get(reverse('about'))['X-Page-Cache'], 'hit')
+        self.assertEqual(registry.page_cache_outcomes, {'miss': 1, 'bypass': 3, 'hit': 1})
+        self.assertIsNone(cache.get(f"page:{reverse('about')}?x=0"))
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_can_be_disabled(self):
+        self.client.get(reverse('about'))
+        self.assertEqual(self.client.get(reverse('about'))['X-Page-Cache'], 'bypass')
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+
+    def metric(self, body, name, view):
+        for line in body.splitlines():
+            if line.startswith(f'{name}{{view="{view}"'):
+                return float(line.rsplit(' ', 1)[1])
+        return None
+
+    def participant(self):
+        return Participant.objects.create(first_name='Anna', last_name='Becker', email='anna@example.com', password='x')
+
+    @override_settings(METRICS_TOKEN='geheim')
+    def test_metrics_per_view(self):
+        participant = self.participant()
+        session = self.client.session
+        session['participant_id'] = participant.id
+        session.save()
+        self.client.get(reverse('participant_profile'))
+        self.client.get(reverse('participant_profile'))
+        self.client.get(reverse('about'))
+
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer geheim').content.decode()
+        self.assertEqual(self.metric(body, 'schramberg_request_duration_seconds_count', 'participant_profile'), 2)
+        self.assertIn('schramberg_request_duration_seconds_bucket{view="participant_profile",le="+Inf"} 2', body)
+        self.assertGreaterEqual(self.metric(body, 'schramberg_sql_queries_total', 'participant_profile'), 4)
+        self.assertGreater(self.metric(body, 'schramberg_template_seconds_total', 'participant_profile'), 0)
+        self.assertGreater(self.metric(body, 'schramberg_response_bytes_total', 'about'), 0)
+        # Участник залогинен — about идёт мимо кэша
+        self.assertIn('schramberg_page_cache_requests_total{outcome="bypass"} 1', body)
+
+    def test_staff_can_read_metrics(self):
+        User.objects.create_user('admin', password='x', is_staff=True)
+        self.client.login(username='admin', password='x')
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('schramberg.slow_requests', 'WARNING') as logs:
+            self.client.post(reverse('participant_login'), {'email': 'niemand@example.com', 'password': 'passwort1'})
+        self.assertIn('(participant_login)', logs.output[0])
+        self.assertIn('users_participant', logs.output[0])
+
+    @override_settings(ROOT_URLCONF='schramberg.async_urls')
+    async def test_async_views_count_sql(self):
+        participant = await sync_to_async(self.participant)()
+        session = await self.async_client.asession()
+        await session.aset('participant_id', participant.id)
+        await session.asave()
+        self.async_client.cookies['sessionid'] = session.session_key
+        await self.async_client.get(reverse('participant_profile'))
+        body = registry.render()
+        self.assertGreaterEqual(self.metric(body, 'schramberg_sql_queries_total', 'participant_profile'), 3)
@@ -1,10 +1,16 @@
 from django.shortcuts import render
 
+from .caching import anonymous_page_cache
+
+
+@anonymous_page_cache
 def home(request):
     return render(request, 'main/home.html')
 
+@anonymous_page_cache
 def about(request):
     return render(request, 'main/about.html')
 
+@anonymous_page_cache
 def conference(request):
     return render(request, 'main/conference.html')
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'schramberg.settings')
+# Под ASGI логин и сброс пароля обслуживают async-view с хэшированием в пуле потоков
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
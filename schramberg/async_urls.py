@@ -0,0 +1,16 @@
+"""
+URL configuration used under ASGI (ASYNC_VIEWS=True).
+
+Async views from users.async_urls and the async export are tried first;
+everything else falls through to the regular schramberg.urls patterns.
+"""
+from django.urls import path, include
+
+from users import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('users/', include('users.async_urls')),
+    path('admin/dashboard/export/', async_views.registrations_export, name='registrations_export'),
+] + sync_urlpatterns
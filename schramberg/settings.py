@@ -49,21 +49,27 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'main.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.ParticipantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'schramberg.urls'
+# Async-версии горячих view (логин, сброс пароля); включается в schramberg/asgi.py
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+
+ROOT_URLCONF = 'schramberg.async_urls' if ASYNC_VIEWS else 'schramberg.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + время рендера для метрик (main/instrumentation.py)
+        'BACKEND': 'main.instrumentation.InstrumentedTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -84,13 +90,56 @@ WSGI_APPLICATION = 'schramberg.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# База и прочие данные живут в DATA_DIR — в Docker это volume, а не образ
+DATA_DIR = Path(os.getenv('DATA_DIR', BASE_DIR))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': DATA_DIR / 'db.sqlite3',
     }
 }
 
+# Продакшен-профиль SQLite для нескольких воркеров gunicorn:
+# WAL — читатели не ждут писателя; synchronous=NORMAL — fsync только на чекпойнтах;
+# BEGIN IMMEDIATE — писатель берёт блокировку сразу и ждёт её по busy_timeout,
+# а не падает с "database is locked" при попытке повысить блокировку посреди транзакции.
+SQLITE_PRODUCTION = os.getenv('SQLITE_PRODUCTION', 'False') == 'True'
+SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', '20'))  # секунд
+SQLITE_READ_PRAGMAS = [
+    f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT * 1000}',
+    f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024)))}",
+    f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '20000'))}",
+    'PRAGMA temp_store=MEMORY',
+]
+SQLITE_PRAGMAS = ['PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL', *SQLITE_READ_PRAGMAS]
+if SQLITE_PRODUCTION:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': '; '.join(SQLITE_PRAGMAS),
+        },
+    })
+
+# Отчёты читают через отдельное read-only соединение к тому же файлу (users/routers.py).
+# В тестах это зеркало default.
+REPORTING_DB = os.getenv('REPORTING_DB', 'True') == 'True'
+if REPORTING_DB:
+    DATABASES['reporting'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"{DATABASES['default']['NAME'].resolve().as_uri()}?mode=ro",
+        'CONN_MAX_AGE': DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT,
+            'init_command': '; '.join(['PRAGMA query_only=1', *SQLITE_READ_PRAGMAS]),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['users.routers.ReportingRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -146,5 +195,89 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD')  
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Очередь писем (users/outbox.py, manage.py send_outbox)
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5'))
+OUTBOX_RETRY_BACKOFF = int(os.getenv('OUTBOX_RETRY_BACKOFF', '60'))  # секунды, удваивается с каждой попыткой
+
+# Рассылки (users/mailing.py): писем на одно соединение и пауза между пачками
+MAILING_BATCH_SIZE = int(os.getenv('MAILING_BATCH_SIZE', '50'))
+MAILING_BATCH_PAUSE = float(os.getenv('MAILING_BATCH_PAUSE', '1.0'))
+
+
+# Даты конференции (YYYY-MM-DD): для Vollzeit и для тех, кто не указал даты
+CONFERENCE_START = os.getenv('CONFERENCE_START', '2025-08-01')
+CONFERENCE_END = os.getenv('CONFERENCE_END', '2025-08-08')
+
+# Курортный сбор: ставка за ночь по возрастным группам (below — возраст «до»,
+# не включая; None — без ограничения), скидка студентам, online не платят
+KURTAXE_TARIFF = {
+    'bands': [
+        {'key': 'children', 'name': 'Kinder / Дети', 'below': 18, 'rate': '0.00'},
+        {'key': 'adults', 'name': 'Erwachsene / Взрослые', 'below': None, 'rate': '2.50'},
+    ],
+    'students': {'key': 'students', 'name': 'Studenten / Студенты', 'discount': '0.50', 'label': '50%'},
+    'exempt_participation': ['online'],
+    # Группа для детей, у которых не указан возраст
+    'default_band': 'children',
+}
+
+# Взносы участников (EUR): Vollzeit — за неделю, иначе за ночь, online — разово.
+# Младше free_below — бесплатно, дети (и взрослые до 18) и студенты — со скидкой
+PRICING = {
+    'full_week': '190.00',
+    'per_night': '35.00',
+    'online': '20.00',
+    'free_below': 3,
+    'child_discount': '0.50',
+    'student_discount': '0.25',
+}
+
+# Какие приёмы пищи (breakfast, lunch, dinner) положены в день приезда и отъезда
+MEAL_RULES = {
+    'arrival': os.getenv('MEAL_ARRIVAL', 'dinner').split(','),
+    'departure': os.getenv('MEAL_DEPARTURE', 'breakfast,lunch').split(','),
+}
+# План питания кэшируется до изменения данных; таймаут — страховка для
+# нескольких процессов с локальным кэшем
+MEAL_PLAN_CACHE_TIMEOUT = int(os.getenv('MEAL_PLAN_CACHE_TIMEOUT', '300'))
+
+# Пересчитывать кровати регистрации при каждом сохранении взрослого/ребёнка
+HOUSING_AUTO_ALLOCATE = os.getenv('HOUSING_AUTO_ALLOCATE', 'True') == 'True'
+
+# Кэш участника по participant_id (секунды), 0 — выключен.
+# Сбрасывается при сохранении/удалении Participant.
+PARTICIPANT_CACHE_TIMEOUT = int(os.getenv('PARTICIPANT_CACHE_TIMEOUT', '0'))
+
+# Кэш строки "Sie sind eingeloggt als ..." в base.html по participant_id
+# (секунды), 0 — выключен. Сбрасывается там же, где кэш участника.
+NAV_CACHE_TIMEOUT = int(os.getenv('NAV_CACHE_TIMEOUT', '600'))
+
+# Кэш публичных страниц (home/about/conference) для анонимных посетителей,
+# секунды; 0 — выключен. PAGE_CACHE_MAX_AGE — Cache-Control для браузеров.
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', '600'))
+PAGE_CACHE_MAX_AGE = int(os.getenv('PAGE_CACHE_MAX_AGE', '60'))
+
+# Метрики на /metrics: Bearer-токен для Prometheus (без него — только staff).
+# Запросы дольше SLOW_REQUEST_MS пишутся в лог schramberg.slow_requests с SQL.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', '500'))
+
+# Ограничение частоты логина и сброса пароля (users/ratelimit.py): по IP и по
+# email, (ёмкость ведра, за сколько секунд оно наполняется). Бэкенд 'memory' —
+# в памяти процесса, 'cache' — общий Django-кэш для всех воркеров.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+# За прокси: заголовок с адресом клиента, например HTTP_X_FORWARDED_FOR, и
+# сколько наших прокси стоит перед приложением (каждый дописывает адрес справа)
+RATE_LIMIT_IP_HEADER = os.getenv('RATE_LIMIT_IP_HEADER', '')
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '1'))
+RATE_LIMITS = {
+    'login': {'ip': (20, 60), 'email': (5, 300)},
+    'password_reset': {'ip': (5, 600), 'email': (3, 3600)},
+}
+
+# Размер пула потоков для хэширования паролей в async-view (см. users/hashing.py)
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 2))
+
 
 
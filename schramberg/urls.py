@@ -19,8 +19,16 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from main.instrumentation import metrics_view
+from users.views import admin_dashboard, meal_plan_view, occupancy_json, registrations_export
+
 urlpatterns = [
+    path('admin/dashboard/', admin_dashboard, name='admin_dashboard'),
+    path('admin/dashboard/export/', registrations_export, name='registrations_export'),
+    path('admin/dashboard/occupancy.json', occupancy_json, name='occupancy_json'),
+    path('admin/dashboard/meals/', meal_plan_view, name='meal_plan'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('',include('main.urls')),
     path('users/', include('users.urls')),
 
@@ -1,7 +1,14 @@
 from django.contrib import admin
-from .models import Participant, Registration, Adult, Child
+from .models import (
+    Participant, Registration, Adult, Child, DashboardCounter, OutboxEmail, Mailing, Room, BedAssignment,
+)
 
 admin.site.register(Participant)
 admin.site.register(Registration)
 admin.site.register(Adult)
-admin.site.register(Child)
\ No newline at end of file
+admin.site.register(Child)
+admin.site.register(DashboardCounter)
+admin.site.register(OutboxEmail)
+admin.site.register(Mailing)
+admin.site.register(Room)
+admin.site.register(BedAssignment)
@@ -0,0 +1,20 @@
+# Async-версии view с теми же адресами и именами, что в users/urls.py.
+# Подключаются только под ASGI (см. schramberg/async_urls.py).
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('conference/', async_views.participant_login, name='participant_login'),
+    path('register/', async_views.participant_register, name='participant_register'),
+    path('registrierung/', async_views.participant_register, name='participant_register'),
+    path('profil/', async_views.participant_profile, name='participant_profile'),
+    path('anmeldung/neu/', async_views.registration_start, name='registration_start'),
+    path('anmeldung/neu/erwachsener/', async_views.registration_add_adult, name='registration_add_adult'),
+    path('anmeldung/neu/kind/', async_views.registration_add_child, name='registration_add_child'),
+    path('anmeldung/neu/abschluss/', async_views.registration_overview, name='registration_overview'),
+    path('anmeldung/neu/erwachsener/<int:index>/', async_views.registration_add_adult, name='registration_draft_adult'),
+    path('anmeldung/neu/kind/<int:index>/', async_views.registration_add_child, name='registration_draft_child'),
+    path('anmeldung/neu/<str:kind>/<int:index>/entfernen/', async_views.registration_draft_remove, name='registration_draft_remove'),
+    path('participant-password-reset/', async_views.participant_password_reset_request, name='participant_password_reset_request'),
+    path('participant-password-reset-confirm/<str:token>/', async_views.participant_password_reset_confirm, name='participant_password_reset_confirm'),
+]
@@ -0,0 +1,226 @@
+# async_views.py
+# Async-версии горячих view участника: логин/регистрация/сброс пароля
+# (PBKDF2 — в ограниченном пуле, hashing.py), профиль и шаги мастера; плюс
+# выгрузка для сотрудников, которая под ASGI должна идти async-потоком.
+# Пока view ждёт БД или хэш, один ASGI-процесс обслуживает другие запросы.
+# Логика и шаблоны те же, что в views.py.
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest
+from django.shortcuts import render, redirect
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+
+from . import drafts, ratelimit
+from .export import astream_export
+from .forms import (
+    AdultForm,
+    ChildForm,
+    ExportFilterForm,
+    ParticipantLoginForm,
+    ParticipantPasswordResetRequestForm,
+    ParticipantRegisterForm,
+    ParticipantSetNewPasswordForm,
+    RegistrationForm,
+)
+from .hashing import acheck_password, amake_password
+from .middleware import aget_participant
+from .models import Participant, Registration, email_matches
+from .outbox import aenqueue_mail
+from .utils import generate_password_reset_token, verify_password_reset_token
+from .views import _draft_context, attach_services, export_response, with_people
+
+
+async def participant_login(request):
+    await aget_participant(request)
+    if request.method == 'POST':
+        retry_after = await ratelimit.acheck('login', request, request.POST.get('email'))
+        if retry_after is not None:
+            return ratelimit.too_many_requests(
+                request, 'users/start_login.html', {'form': ParticipantLoginForm()}, retry_after,
+            )
+        form = ParticipantLoginForm(request.POST)
+        if form.is_valid():
+            email = form.cleaned_data['email']
+            raw_password = form.cleaned_data['password']
+            participant = await Participant.objects.filter(email_matches(email)).afirst()
+            if participant is None:
+                form.add_error('email', 'Kein Benutzer mit dieser Email gefunden.')
+            elif not await acheck_password(raw_password, participant.password):
+                form.add_error('password', 'Falsches Passwort')
+            else:
+                await request.session.aset('participant_id', participant.id)
+                return redirect('participant_profile')
+    else:
+        form = ParticipantLoginForm()
+    return render(request, 'users/start_login.html', {'form': form})
+
+
+async def participant_register(request):
+    await aget_participant(request)
+    if request.method == 'POST':
+        form = ParticipantRegisterForm(request.POST)
+        # validate_unique() проверяет email запросом в БД
+        if await sync_to_async(form.is_valid)():
+            participant = await form.asave()
+            await request.session.aset('participant_id', participant.id)
+            return redirect('participant_profile')
+    else:
+        form = ParticipantRegisterForm()
+    return render(request, 'users/registration.html', {'form': form})
+
+
+async def participant_password_reset_request(request):
+    await aget_participant(request)
+    if request.method == "POST":
+        retry_after = await ratelimit.acheck('password_reset', request, request.POST.get('email'))
+        if retry_after is not None:
+            return ratelimit.too_many_requests(
+                request, 'users/participant_password_reset_request.html',
+                {'form': ParticipantPasswordResetRequestForm()}, retry_after,
+            )
+        form = ParticipantPasswordResetRequestForm(request.POST)
+        # clean_email() проверяет адрес запросом в БД
+        if await sync_to_async(form.is_valid)():
+            email = form.cleaned_data['email']
+            token = generate_password_reset_token(email)
+            reset_url = request.build_absolute_uri(
+                reverse('participant_password_reset_confirm', args=[token])
+            )
+            await aenqueue_mail(
+                subject="Сброс пароля",
+                message=f"Перейдите по ссылке, чтобы сбросить пароль:\n{reset_url}",
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                recipient_list=[email],
+            )
+            return redirect('participant_password_reset_done')
+    else:
+        form = ParticipantPasswordResetRequestForm()
+    return render(request, 'users/participant_password_reset_request.html', {'form': form})
+
+
+async def participant_password_reset_confirm(request, token):
+    await aget_participant(request)
+    email = verify_password_reset_token(token)
+    if email is None:
+        raise Http404("Неверный или просроченный токен.")
+    participant = await Participant.objects.filter(email_matches(email)).afirst()
+    if not participant:
+        raise Http404("Участник не найден.")
+    if request.method == "POST":
+        form = ParticipantSetNewPasswordForm(request.POST)
+        if form.is_valid():
+            participant.password = await amake_password(form.cleaned_data['new_password1'])
+            await participant.asave()
+            return redirect('participant_login')
+    else:
+        form = ParticipantSetNewPasswordForm()
+    return render(request, 'users/participant_password_reset_confirm.html', {'form': form})
+
+
+# -------------- ПРОФИЛЬ И МАСТЕР АНМЕЛЬДУНГА ---------------
+# aget_participant() заодно загружает сессию, после этого черновик
+# (drafts.py) читается и пишется без обращений к БД.
+
+async def participant_profile(request):
+    participant = await aget_participant(request)
+    if not participant:
+        return redirect('participant_login')
+    registrations = [
+        reg async for reg in with_people(
+            Registration.objects.filter(participant=participant).order_by('created_at')
+        )
+    ]
+    return render(request, 'users/participant_profile.html', {
+        'participant': participant,
+        'registrations': attach_services(registrations),
+    })
+
+
+async def registration_start(request):
+    if not await aget_participant(request):
+        return redirect('participant_login')
+
+    draft = drafts.get_draft(request.session)
+    if request.method == 'POST':
+        form = RegistrationForm(request.POST, instance=drafts.draft_registration(draft))
+        if form.is_valid():
+            drafts.set_registration(request.session, form)
+            return redirect('registration_overview')
+    else:
+        form = RegistrationForm(instance=drafts.draft_registration(draft))
+    return render(request, 'users/registration_start.html', {'form': form, **_draft_context(draft)})
+
+
+async def _draft_person(request, kind, form_class, template, index):
+    if not await aget_participant(request):
+        return redirect('participant_login')
+
+    instance = None
+    if index is not None:
+        people = drafts.draft_people(drafts.get_draft(request.session), kind)
+        if index >= len(people):
+            raise Http404
+        instance = people[index]
+
+    if request.method == 'POST':
+        form = form_class(request.POST, instance=instance)
+        if form.is_valid():
+            drafts.put_person(request.session, kind, form, index)
+            return redirect('registration_start')
+        messages.error(request, "Bitte korrigieren Sie die Fehler im Formular.")
+    else:
+        form = form_class(instance=instance)
+    return render(request, template, {'form': form, 'edit_mode': index is not None})
+
+
+async def registration_add_adult(request, index=None):
+    return await _draft_person(request, 'adult', AdultForm, 'users/registration_add_adult.html', index)
+
+
+async def registration_add_child(request, index=None):
+    return await _draft_person(request, 'child', ChildForm, 'users/registration_add_child.html', index)
+
+
+@require_POST
+async def registration_draft_remove(request, kind, index):
+    if kind not in drafts.PERSON_KINDS:
+        raise Http404
+    await aget_participant(request)
+    drafts.remove_person(request.session, kind, index)
+    return redirect('registration_start')
+
+
+async def registration_overview(request):
+    participant = await aget_participant(request)
+    if not participant:
+        return redirect('participant_login')
+
+    draft = drafts.get_draft(request.session)
+    if request.method == 'POST':
+        form = RegistrationForm(request.POST, instance=drafts.draft_registration(draft))
+        if form.is_valid():
+            if not draft['adults'] and not draft['children']:
+                form.add_error(None, "Bitte fügen Sie mindestens eine Person hinzu.")
+            else:
+                drafts.set_registration(request.session, form)
+                # transaction.atomic не переживает переходы между потоками async-ORM,
+                # поэтому сама запись — одним синхронным блоком
+                await sync_to_async(drafts.commit_draft)(participant, drafts.get_draft(request.session))
+                drafts.clear_draft(request.session)
+                messages.success(request, "Anmeldung gespeichert!")
+                return redirect('participant_profile')
+    else:
+        form = RegistrationForm(instance=drafts.draft_registration(draft))
+    return render(request, 'users/registration_overview.html', {'form': form, **_draft_context(draft)})
+
+
+@staff_member_required
+async def registrations_export(request):
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    return export_response(form, astream_export)
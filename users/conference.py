@@ -0,0 +1,40 @@
+# conference.py
+# Даты конференции и "фактический" срок пребывания человека: Vollzeit —
+# вся неделя, без дат — тоже вся неделя, online — на месте не бывает.
+
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Case, DateField, Value, When
+from django.db.models.functions import Coalesce
+
+
+def conference_start():
+    return date.fromisoformat(settings.CONFERENCE_START)
+
+
+def conference_end():
+    return date.fromisoformat(settings.CONFERENCE_END)
+
+
+def stay_dates(participation_type, is_full_week, arrival_date, departure_date):
+    """(приезд, отъезд) для человека на месте или None для online."""
+    if participation_type != 'onsite':
+        return None
+    start, end = conference_start(), conference_end()
+    if is_full_week:
+        return start, end
+    arrival = arrival_date or start
+    departure = departure_date or end
+    return arrival, max(arrival, departure)
+
+
+def stay_arrival():
+    """SQL-выражение для даты приезда (см. stay_dates)."""
+    start = Value(conference_start(), output_field=DateField())
+    return Case(When(is_full_week=True, then=start), default=Coalesce('arrival_date', start))
+
+
+def stay_departure():
+    end = Value(conference_end(), output_field=DateField())
+    return Case(When(is_full_week=True, then=end), default=Coalesce('departure_date', end))
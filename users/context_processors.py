@@ -1,11 +1,9 @@
-from .models import Participant
+from django.conf import settings
+
 
 def current_participant(request):
-    participant = None
-    pid = request.session.get('participant_id')
-    if pid:
-        try:
-            participant = Participant.objects.get(id=pid)
-        except Participant.DoesNotExist:
-            participant = None
-    return {'current_participant': participant}
\ No newline at end of file
+    # Участник уже определён (лениво) в ParticipantMiddleware
+    return {
+        'current_participant': getattr(request, 'participant', None),
+        'nav_cache_timeout': settings.NAV_CACHE_TIMEOUT,
+    }
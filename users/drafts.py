@@ -0,0 +1,107 @@
+# drafts.py
+# Черновик мастера регистрации живёт в сессии, а не в базе: шаги мастера
+# ничего не пишут, а на последнем шаге регистрация и все люди сохраняются
+# одной транзакцией (Registration + bulk_create взрослых и детей).
+
+from datetime import date, datetime
+
+from django.db import transaction
+
+from .models import Adult, Child, Registration
+from .signals import people_bulk_created
+
+DRAFT_SESSION_KEY = 'registration_draft'
+
+PERSON_KINDS = {
+    'adult': (Adult, 'adults'),
+    'child': (Child, 'children'),
+}
+
+
+def _dump(instance, field_names):
+    # Только JSON-совместимые значения: даты — строками ISO
+    data = {}
+    for field in instance._meta.concrete_fields:
+        if field.name not in field_names:
+            continue
+        value = field.value_from_object(instance)
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        data[field.attname] = value
+    return data
+
+
+def _load(model, data):
+    instance = model()
+    for field in model._meta.concrete_fields:
+        if field.attname in data:
+            setattr(instance, field.attname, field.to_python(data[field.attname]))
+    return instance
+
+
+def get_draft(session):
+    return session.get(DRAFT_SESSION_KEY) or {'registration': {}, 'adults': [], 'children': []}
+
+
+def _save_draft(session, draft):
+    session[DRAFT_SESSION_KEY] = draft
+
+
+def clear_draft(session):
+    session.pop(DRAFT_SESSION_KEY, None)
+
+
+def draft_registration(draft):
+    return _load(Registration, draft['registration'])
+
+
+def draft_people(draft, kind):
+    model, key = PERSON_KINDS[kind]
+    return [_load(model, data) for data in draft[key]]
+
+
+def set_registration(session, form):
+    """Сохранить в черновик данные RegistrationForm (уже валидной)."""
+    draft = get_draft(session)
+    draft['registration'] = _dump(form.save(commit=False), form.fields)
+    _save_draft(session, draft)
+
+
+def put_person(session, kind, form, index=None):
+    """Добавить человека из валидной формы или заменить его по индексу."""
+    draft = get_draft(session)
+    _model, key = PERSON_KINDS[kind]
+    data = _dump(form.save(commit=False), form.fields)
+    if index is None:
+        draft[key].append(data)
+    else:
+        draft[key][index] = data
+    _save_draft(session, draft)
+
+
+def remove_person(session, kind, index):
+    draft = get_draft(session)
+    _model, key = PERSON_KINDS[kind]
+    if 0 <= index < len(draft[key]):
+        del draft[key][index]
+        _save_draft(session, draft)
+
+
+@transaction.atomic
+def commit_registration(participant, reg, adults, children):
+    """Регистрация и все люди — одной транзакцией, по одному INSERT на модель."""
+    reg.participant = participant
+    reg.save()
+    for person in [*adults, *children]:
+        person.registration = reg
+    Adult.objects.bulk_create(adults)
+    Child.objects.bulk_create(children)
+    people_bulk_created(reg, [*adults, *children])
+    return reg
+
+
+def commit_draft(participant, draft):
+    return commit_registration(
+        participant, draft_registration(draft),
+        draft_people(draft, 'adult'), draft_people(draft, 'child'),
+    )
@@ -0,0 +1,166 @@
+# export.py
+# Потоковая выгрузка участников: одна строка на человека (взрослого или ребёнка).
+# Участники читаются через .iterator() кусками, регистрации и люди подтягиваются
+# prefetch'ем на каждый кусок — память не растёт вместе с размером конференции.
+# Читаем через read-only соединение reporting: генератор доедается уже после
+# выхода из view, поэтому база задаётся явно через using(), а не routers.reporting().
+# Под ASGI синхронный генератор Django сначала доел бы целиком в память
+# (sync_to_async(list)), поэтому async-view отдаёт astream_export.
+
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Exists, OuterRef, Prefetch, Q
+
+from .models import Adult, Child, Participant, Registration
+from .routers import reporting_alias
+
+FORMATS = ('csv', 'jsonl')
+
+# Сколько строк выгрузки берётся из потока БД за один переход в async
+ASYNC_BATCH_ROWS = 500
+
+COLUMNS = [
+    'participant_id', 'email', 'participant_first_name', 'participant_last_name',
+    'phone_number', 'street', 'postal_code', 'city',
+    'registration_id', 'registration_created_at', 'needs_transport',
+    'has_dietary_restrictions', 'dietary_details', 'church_contact',
+    'leisure_activities', 'comment',
+    'person_type', 'first_name', 'last_name', 'gender', 'age', 'is_student',
+    'participation_type', 'arrival_date', 'departure_date', 'is_full_week',
+    'housing_preference', 'food_preference', 'services',
+]
+
+
+def person_filter(participation_type=None, arrival_from=None, arrival_to=None, housing=None):
+    condition = Q()
+    if participation_type:
+        condition &= Q(participation_type=participation_type)
+    if arrival_from:
+        condition &= Q(arrival_date__gte=arrival_from)
+    if arrival_to:
+        condition &= Q(arrival_date__lte=arrival_to)
+    if housing:
+        condition &= Q(housing_preference=housing)
+    return condition
+
+
+def export_queryset(**filters):
+    condition = person_filter(**filters)
+    registrations = Registration.objects.order_by('created_at', 'id').prefetch_related(
+        Prefetch('adults', queryset=Adult.objects.filter(condition).order_by('id')),
+        Prefetch('children', queryset=Child.objects.filter(condition).order_by('id')),
+    )
+    participants = Participant.objects.defer('password').order_by('id')
+    if condition:
+        matching = Q(
+            Exists(Adult.objects.filter(condition, registration=OuterRef('pk')))
+        ) | Q(
+            Exists(Child.objects.filter(condition, registration=OuterRef('pk')))
+        )
+        registrations = registrations.filter(matching)
+        participants = participants.filter(
+            Exists(Registration.objects.filter(matching, participant=OuterRef('pk')))
+        )
+    return participants.prefetch_related(Prefetch('registrations', queryset=registrations))
+
+
+def _participant_columns(participant):
+    return {
+        'participant_id': participant.id,
+        'email': participant.email,
+        'participant_first_name': participant.first_name,
+        'participant_last_name': participant.last_name,
+        'phone_number': participant.phone_number,
+        'street': participant.street,
+        'postal_code': participant.postal_code,
+        'city': participant.city,
+    }
+
+
+def _registration_columns(reg):
+    return {
+        'registration_id': reg.id,
+        'registration_created_at': reg.created_at.isoformat(),
+        'needs_transport': reg.needs_transport,
+        'has_dietary_restrictions': reg.has_dietary_restrictions,
+        'dietary_details': reg.dietary_details,
+        'church_contact': reg.church_contact,
+        'leisure_activities': reg.leisure_activities,
+        'comment': reg.comment,
+    }
+
+
+def _person_columns(person_type, person):
+    return {
+        'person_type': person_type,
+        'first_name': person.first_name,
+        'last_name': person.last_name,
+        'gender': person.gender,
+        'age': person.age,
+        'is_student': person.is_student,
+        'participation_type': person.participation_type,
+        'arrival_date': person.arrival_date.isoformat() if person.arrival_date else None,
+        'departure_date': person.departure_date.isoformat() if person.departure_date else None,
+        'is_full_week': person.is_full_week,
+        'housing_preference': person.housing_preference,
+        'food_preference': person.food_preference,
+        'services': ','.join(person.services_list),
+    }
+
+
+def export_rows(chunk_size=500, **filters):
+    """Генератор словарей с ключами COLUMNS."""
+    blank = dict.fromkeys(COLUMNS)
+    participants = export_queryset(**filters).using(reporting_alias())
+    for participant in participants.iterator(chunk_size=chunk_size):
+        base = {**blank, **_participant_columns(participant)}
+        registrations = participant.registrations.all()
+        if not registrations:
+            yield base
+        for reg in registrations:
+            reg_base = {**base, **_registration_columns(reg)}
+            people = [('adult', adult) for adult in reg.adults.all()]
+            people += [('child', child) for child in reg.children.all()]
+            if not people:
+                yield reg_base
+            for person_type, person in people:
+                yield {**reg_base, **_person_columns(person_type, person)}
+
+
+class _Echo:
+    # Псевдо-файл для csv.writer: write() просто возвращает строку
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+def stream_export(fmt, rows):
+    if fmt == 'csv':
+        return stream_csv(rows)
+    if fmt == 'jsonl':
+        return stream_jsonl(rows)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+async def astream_export(fmt, rows):
+    """stream_export для ASGI: строки читаются пачками в потоке, каждая пачка сразу уходит клиенту."""
+    chunks = stream_export(fmt, rows)
+    # Курсор привязан к своему соединению — все пачки читаются в одном
+    # (thread-sensitive) потоке
+    next_batch = sync_to_async(lambda: list(islice(chunks, ASYNC_BATCH_ROWS)))
+    while batch := await next_batch():
+        yield ''.join(batch)
@@ -1,7 +1,8 @@
 from django import forms
-from .models import Participant, Registration,Adult, Child
+from .models import Participant, Registration,Adult, Child, SERVICES_CHOICES, email_matches, services_to_mask
 from django.forms import inlineformset_factory
 from django.contrib.auth.hashers import make_password
+from .hashing import amake_password
 from django.core.exceptions import ValidationError
 import re
 
@@ -40,6 +41,13 @@ class ParticipantRegisterForm(forms.ModelForm):
             participant.save()
         return participant
 
+    async def asave(self):
+        # Для async-view: хэш считается в пуле потоков, а не в event loop
+        participant = super().save(commit=False)
+        participant.password = await amake_password(self.cleaned_data['password'])
+        await participant.asave()
+        return participant
+
 class ParticipantSetNewPasswordForm(forms.Form):
     new_password1 = forms.CharField(widget=forms.PasswordInput, label="Новый пароль")
     new_password2 = forms.CharField(widget=forms.PasswordInput, label="Подтверждение пароля")
@@ -59,7 +67,7 @@ class ParticipantPasswordResetRequestForm(forms.Form):
 
     def clean_email(self):
         email = self.cleaned_data['email']
-        if not Participant.objects.filter(email__iexact=email).exists():
+        if not Participant.objects.filter(email_matches(email)).exists():
             raise forms.ValidationError("Email не найден.")
         return email
 
@@ -88,23 +96,24 @@ class RegistrationForm(forms.ModelForm):
             'has_dietary_restrictions',
             'dietary_details',
             'comment',
+            'payment_method',
         ]
         widgets = {
             'leisure_activities': forms.Textarea(attrs={'rows': 2}),
             'comment': forms.Textarea(attrs={'rows': 3}),
         }
         
-class AdultForm(forms.ModelForm):
-    SERVICES_CHOICES = [
-        ('guitar', 'Gitarre'),
-        ('piano', 'Klavier'),
-        ('kids_small', 'Kleinkinder'),
-        ('kids_kiga', 'Kiga'),
-        ('kids_school', 'Schüler'),
-        ('chairs', 'Stuhldienst'),
-        ('tech', 'Technik'),
-        ('microphones', 'Mikrofondienst'),
-    ]
+class StayDatesMixin:
+    def clean(self):
+        cleaned_data = super().clean()
+        arrival = cleaned_data.get('arrival_date')
+        departure = cleaned_data.get('departure_date')
+        if arrival and departure and departure <= arrival:
+            self.add_error('departure_date', 'Die Abreise muss nach der Anreise liegen.')
+        return cleaned_data
+
+
+class AdultForm(StayDatesMixin, forms.ModelForm):
     services = forms.MultipleChoiceField(
         choices=SERVICES_CHOICES,
         widget=forms.CheckboxSelectMultiple,
@@ -123,22 +132,12 @@ class AdultForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.services:
-            self.fields['services'].initial = self.instance.services.split(',')
+            self.fields['services'].initial = self.instance.services_list
 
     def clean_services(self):
-        return ','.join(self.cleaned_data['services'])
-
-class ChildForm(forms.ModelForm):
-    SERVICES_CHOICES = [
-        ('guitar', 'Gitarre'),
-        ('piano', 'Klavier'),
-        ('kids_small', 'Kleinkinder'),
-        ('kids_kiga', 'Kiga'),
-        ('kids_school', 'Schüler'),
-        ('chairs', 'Stuhldienst'),
-        ('tech', 'Technik'),
-        ('microphones', 'Mikrofondienst'),
-    ]
+        return services_to_mask(self.cleaned_data['services'])
+
+class ChildForm(StayDatesMixin, forms.ModelForm):
     services = forms.MultipleChoiceField(
         choices=SERVICES_CHOICES,
         widget=forms.CheckboxSelectMultiple,
@@ -157,10 +156,48 @@ class ChildForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance and self.instance.services:
-            self.fields['services'].initial = self.instance.services.split(',')
+            self.fields['services'].initial = self.instance.services_list
 
     def clean_services(self):
-        return ','.join(self.cleaned_data['services'])
+        return services_to_mask(self.cleaned_data['services'])
+
+class BaseFamilyFormSet(forms.BaseFormSet):
+    def people(self):
+        """Заполненные формы → несохранённые экземпляры модели."""
+        return [form.save(commit=False) for form in self.forms if form.has_changed()]
+
+
+# Вся семья одной формой: пустые лишние формы игнорируются
+FamilyAdultFormSet = forms.formset_factory(AdultForm, formset=BaseFamilyFormSet, extra=2, max_num=20, validate_max=True)
+FamilyChildFormSet = forms.formset_factory(ChildForm, formset=BaseFamilyFormSet, extra=4, max_num=20, validate_max=True)
+
+
+def validate_family(adult_formset, child_formset):
+    """Проверки по всей семье сразу; возвращает список ошибок."""
+    errors = []
+    adults, children = adult_formset.people(), child_formset.people()
+    if not adults and not children:
+        errors.append("Bitte fügen Sie mindestens eine Person hinzu.")
+    elif children and not adults:
+        errors.append("Kinder können nur zusammen mit einem Erwachsenen angemeldet werden.")
+    return errors
+
+
+class ExportFilterForm(forms.Form):
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')], required=False)
+    participation_type = forms.ChoiceField(
+        choices=[('', '---')] + Adult._meta.get_field('participation_type').choices,
+        required=False,
+    )
+    arrival_from = forms.DateField(required=False)
+    arrival_to = forms.DateField(required=False)
+    housing = forms.ChoiceField(choices=[('', '---')] + Adult.HOUSING_CHOICES, required=False)
+
+    def filters(self):
+        return {
+            key: self.cleaned_data[key]
+            for key in ('participation_type', 'arrival_from', 'arrival_to', 'housing')
+        }
 
 def clean(self):
     cleaned_data = super().clean()
@@ -0,0 +1,36 @@
+# hashing.py
+# PBKDF2 занимает сотни миллисекунд CPU. В async-view хэшируем в отдельном
+# ограниченном пуле потоков: hashlib отпускает GIL, event loop продолжает
+# обслуживать другие запросы, а размер пула не даёт съесть все ядра.
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PASSWORD_HASHING_WORKERS,
+                    thread_name_prefix='password-hashing',
+                )
+    return _executor
+
+
+async def acheck_password(raw_password, encoded):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), check_password, raw_password, encoded)
+
+
+async def amake_password(raw_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), make_password, raw_password)
@@ -0,0 +1,211 @@
+# housing.py
+# Распределение кроватей в Brüderhaus/Schwesterhaus.
+# Это interval partitioning: люди идут по дате приезда, у каждой комнаты куча
+# (heap) кроватей по дате освобождения — кровать уезжающего сразу достаётся
+# следующему. Дом определяется полом, члены одной регистрации по возможности
+# живут в одной комнате. При изменении одной регистрации пересчитывается
+# только она — остальные кровати не двигаются.
+
+import heapq
+from collections import Counter, defaultdict, namedtuple
+from datetime import date
+
+from django.db import transaction
+
+from .conference import stay_dates
+from .models import Adult, BedAssignment, Child, Room
+from .stats import BED_HOUSING
+
+HOUSE_BY_GENDER = {'male': 'brudershaus', 'female': 'sisterhaus'}
+
+# Кровать занята на ночи [arrival, departure)
+Stay = namedtuple('Stay', 'kind person_id registration_id house arrival departure')
+Placement = namedtuple('Placement', 'stay room_id bed')
+
+
+def _order(stay):
+    # Семья с одинаковой датой приезда идёт подряд — её удобно селить вместе
+    return (stay.arrival, stay.registration_id, stay.departure, stay.kind, stay.person_id)
+
+
+class _RoomBeds:
+    """Кровати комнаты для полного прогона: куча (свободна_с, номер)."""
+
+    def __init__(self, room_id, beds):
+        self.room_id = room_id
+        self.heap = [(date.min, bed) for bed in range(1, beds + 1)]
+
+    def has_free(self, day):
+        return self.heap[0][0] <= day
+
+    def free_count(self, day):
+        return sum(1 for free_from, _bed in self.heap if free_from <= day)
+
+    def take(self, stay):
+        _free_from, bed = heapq.heappop(self.heap)
+        heapq.heappush(self.heap, (stay.departure, bed))
+        return bed
+
+
+class _RoomCalendar:
+    """Кровати комнаты для дозаселения: у каждой — список занятых интервалов."""
+
+    def __init__(self, room_id, beds):
+        self.room_id = room_id
+        self.busy = {bed: [] for bed in range(1, beds + 1)}
+
+    def _free_beds(self, arrival, departure):
+        for bed, intervals in self.busy.items():
+            if all(departure <= start or end <= arrival for start, end in intervals):
+                yield bed
+
+    def occupy(self, bed, arrival, departure):
+        self.busy[bed].append((arrival, departure))
+
+    def has_free(self, stay):
+        return next(self._free_beds(stay.arrival, stay.departure), None) is not None
+
+    def free_count(self, stay):
+        return sum(1 for _bed in self._free_beds(stay.arrival, stay.departure))
+
+    def take(self, stay):
+        bed = next(self._free_beds(stay.arrival, stay.departure))
+        self.occupy(bed, stay.arrival, stay.departure)
+        return bed
+
+
+def _choose_room(rooms, preferred, has_free, free_count, group_left):
+    # Сначала комната, где уже живёт кто-то из этой регистрации
+    if preferred is not None and has_free(preferred):
+        return preferred
+    best, best_free = None, 0
+    for room in rooms:
+        if not has_free(room):
+            continue
+        if group_left <= 1:
+            return room
+        free = free_count(room)
+        if free >= group_left:
+            return room
+        if free > best_free:
+            best, best_free = room, free
+    return best
+
+
+def _place(stays, rooms_by_house, has_free, free_count):
+    group_left = Counter((stay.registration_id, stay.house) for stay in stays)
+    group_room = {}
+    placements, unassigned = [], []
+    for stay in sorted(stays, key=_order):
+        group = (stay.registration_id, stay.house)
+        room = _choose_room(
+            rooms_by_house.get(stay.house, ()),
+            group_room.get(group),
+            lambda candidate: has_free(candidate, stay),
+            lambda candidate: free_count(candidate, stay),
+            group_left[group],
+        )
+        group_left[group] -= 1
+        if room is None:
+            unassigned.append(stay)
+            continue
+        group_room[group] = room
+        placements.append(Placement(stay, room.room_id, room.take(stay)))
+    return placements, unassigned
+
+
+def allocate(stays, rooms):
+    """Полное распределение в памяти.
+
+    rooms — (room_id, house, beds). Возвращает (placements, unassigned).
+    """
+    rooms_by_house = defaultdict(list)
+    for room_id, house, beds in rooms:
+        if beds:
+            rooms_by_house[house].append(_RoomBeds(room_id, beds))
+    return _place(
+        stays, rooms_by_house,
+        has_free=lambda room, stay: room.has_free(stay.arrival),
+        free_count=lambda room, stay: room.free_count(stay.arrival),
+    )
+
+
+def place_into(stays, rooms, occupied):
+    """Дозаселение stays при уже занятых кроватях.
+
+    occupied — (room_id, bed, arrival, departure) чужих назначений.
+    """
+    calendars = {room_id: _RoomCalendar(room_id, beds) for room_id, _house, beds in rooms if beds}
+    rooms_by_house = defaultdict(list)
+    for room_id, house, beds in rooms:
+        if beds:
+            rooms_by_house[house].append(calendars[room_id])
+    for room_id, bed, arrival, departure in occupied:
+        if room_id in calendars and bed in calendars[room_id].busy:
+            calendars[room_id].occupy(bed, arrival, departure)
+    return _place(
+        stays, rooms_by_house,
+        has_free=lambda room, stay: room.has_free(stay),
+        free_count=lambda room, stay: room.free_count(stay),
+    )
+
+
+def load_stays(registration_id=None):
+    """Все, кому нужна кровать: на месте, не с семьёй, хотя бы одна ночь."""
+    stays = []
+    for kind, model in (('adult', Adult), ('child', Child)):
+        qs = model.objects.filter(participation_type='onsite', housing_preference__in=BED_HOUSING)
+        if registration_id is not None:
+            qs = qs.filter(registration_id=registration_id)
+        rows = qs.values_list(
+            'id', 'registration_id', 'gender', 'is_full_week', 'arrival_date', 'departure_date',
+        )
+        for person_id, reg_id, gender, full_week, arrival_date, departure_date in rows:
+            arrival, departure = stay_dates('onsite', full_week, arrival_date, departure_date)
+            if departure <= arrival or gender not in HOUSE_BY_GENDER:
+                continue
+            stays.append(Stay(kind, person_id, reg_id, HOUSE_BY_GENDER[gender], arrival, departure))
+    return stays
+
+
+def _assignment(placement):
+    stay = placement.stay
+    return BedAssignment(
+        room_id=placement.room_id,
+        bed=placement.bed,
+        registration_id=stay.registration_id,
+        adult_id=stay.person_id if stay.kind == 'adult' else None,
+        child_id=stay.person_id if stay.kind == 'child' else None,
+        arrival=stay.arrival,
+        departure=stay.departure,
+    )
+
+
+@transaction.atomic
+def allocate_all(commit=True):
+    """Перераспределить все кровати заново. Возвращает (placements, unassigned)."""
+    rooms = list(Room.objects.values_list('id', 'house', 'beds'))
+    placements, unassigned = allocate(load_stays(), rooms)
+    if commit:
+        BedAssignment.objects.all().delete()
+        BedAssignment.objects.bulk_create([_assignment(p) for p in placements], batch_size=1000)
+    return placements, unassigned
+
+
+@transaction.atomic
+def reallocate_registration(registration_id):
+    """Пересчитать кровати одной регистрации, не трогая остальных."""
+    BedAssignment.objects.filter(registration_id=registration_id).delete()
+    stays = load_stays(registration_id)
+    if not stays:
+        return [], []
+    houses = {stay.house for stay in stays}
+    rooms = list(Room.objects.filter(house__in=houses).values_list('id', 'house', 'beds'))
+    occupied = BedAssignment.objects.filter(
+        room__house__in=houses,
+        arrival__lt=max(stay.departure for stay in stays),
+        departure__gt=min(stay.arrival for stay in stays),
+    ).values_list('room_id', 'bed', 'arrival', 'departure')
+    placements, unassigned = place_into(stays, rooms, occupied)
+    BedAssignment.objects.bulk_create([_assignment(p) for p in placements])
+    return placements, unassigned
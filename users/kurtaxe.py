@@ -0,0 +1,133 @@
+# kurtaxe.py
+# Курортный сбор по тарифной таблице settings.KURTAXE_TARIFF.
+# Люди сводятся к уникальным сочетаниям (ребёнок?, возраст, студент, ночи) с
+# количеством — таких сочетаний сотни даже на десятки тысяч человек, и тариф
+# применяется один раз на сочетание, а не на человека.
+
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, Value
+
+from .conference import stay_arrival, stay_departure
+from .models import Adult, Child
+
+
+class Tariff:
+    """Возрастные группы (по возрастанию границы) и скидка для студентов.
+
+    default_band — ключ группы для детей без указанного возраста; по
+    умолчанию самая младшая группа.
+    """
+
+    def __init__(self, bands, students, exempt_participation=('online',), default_band=None):
+        self.bands = [
+            {**band, 'rate': Decimal(band['rate'])}
+            for band in sorted(bands, key=lambda band: (band['below'] is None, band['below'] or 0))
+        ]
+        self.students = {**students, 'factor': 1 - Decimal(students['discount'])}
+        self.exempt_participation = tuple(exempt_participation)
+        bands_by_key = {band['key']: band for band in self.bands}
+        if default_band is not None and default_band not in bands_by_key:
+            raise ValueError(f"Unknown Kurtaxe default band: {default_band}")
+        self.default_band = bands_by_key[default_band] if default_band else self.bands[0]
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**settings.KURTAXE_TARIFF)
+
+    def band(self, is_child, age):
+        if age is None:
+            # Без возраста: дети — по группе default_band, взрослые — по последней
+            return self.default_band if is_child else self.bands[-1]
+        for band in self.bands:
+            if band['below'] is None or age < band['below']:
+                return band
+        return self.bands[-1]
+
+    def classify(self, is_child, age, is_student):
+        """(ключ группы, ставка за ночь)."""
+        band = self.band(is_child, age)
+        if is_student and band['rate']:
+            return self.students['key'], band['rate'] * self.students['factor']
+        return band['key'], band['rate']
+
+    def groups(self):
+        """Группы в порядке вывода: ключ, подпись, скидка."""
+        paid = [band for band in self.bands if band['rate']]
+        free = [band for band in self.bands if not band['rate']]
+        rows = [(band['key'], band['name'], '') for band in paid]
+        rows.append((self.students['key'], self.students['name'], self.students.get('label', '')))
+        rows += [(band['key'], band['name'], '100%') for band in free]
+        return rows
+
+
+def compute(people, tariff=None):
+    """people — (is_child, age, is_student, nights, count). Итоги по группам и общая сумма."""
+    tariff = tariff or Tariff.from_settings()
+    sums = defaultdict(lambda: {'people': 0, 'nights': 0, 'amount': Decimal('0.00')})
+    rates = {}
+    for is_child, age, is_student, nights, count in people:
+        key = (is_child, age, bool(is_student))
+        if key not in rates:
+            rates[key] = tariff.classify(*key)
+        group, rate = rates[key]
+        row = sums[group]
+        row['people'] += count
+        row['nights'] += nights * count
+        row['amount'] += rate * nights * count
+    groups = [
+        {
+            'key': key,
+            'name': name,
+            'discount': discount,
+            'people': sums[key]['people'],
+            'nights': sums[key]['nights'],
+            'kurtaxe_sum': sums[key]['amount'].quantize(Decimal('0.01')),
+        }
+        for key, name, discount in tariff.groups()
+    ]
+    return {'groups': groups, 'total': sum(group['kurtaxe_sum'] for group in groups)}
+
+
+def compute_arrays(is_child, ages, students, nights, tariff=None):
+    """Параллельные массивы по людям → итоги одним проходом через Counter."""
+    counted = Counter(zip(is_child, ages, students, nights))
+    return compute(((*key, count) for key, count in counted.items()), tariff)
+
+
+def stay_groups(tariff=None):
+    """Одним UNION-запросом: (регистрация, ребёнок?, возраст, студент, даты) → n."""
+    tariff = tariff or Tariff.from_settings()
+
+    def grouped(model, is_child):
+        return (
+            model.objects.exclude(participation_type__in=tariff.exempt_participation)
+            .annotate(
+                stay_from=stay_arrival(), stay_to=stay_departure(),
+                is_child=Value(int(is_child), output_field=IntegerField()),
+            )
+            .values('registration_id', 'is_child', 'age', 'is_student', 'stay_from', 'stay_to')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+    return grouped(Adult, False).union(grouped(Child, True), all=True)
+
+
+def kurtaxe_report(tariff=None):
+    """Общие итоги и разбивка по регистрациям: {'total': ..., 'registrations': {id: ...}}."""
+    tariff = tariff or Tariff.from_settings()
+    everyone = []
+    per_registration = defaultdict(list)
+    for row in stay_groups(tariff):
+        nights = max((row['stay_to'] - row['stay_from']).days, 0)
+        person = (bool(row['is_child']), row['age'], row['is_student'], nights, row['n'])
+        everyone.append(person)
+        per_registration[row['registration_id']].append(person)
+    report = compute(everyone, tariff)
+    report['registrations'] = {
+        registration_id: compute(people, tariff)
+        for registration_id, people in per_registration.items()
+    }
+    return report
@@ -0,0 +1,111 @@
+# mailing.py
+# Массовые рассылки по группам участников (см. "E-Mail-Verteiler" на дашборде).
+# Адреса выбираются одним запросом и дедуплицируются в БД, текст письма
+# рендерится один раз, отправка идёт пачками по одному SMTP-соединению с паузой
+# между пачками. Прогресс хранится в MailingRecipient, поэтому прерванную
+# рассылку можно просто запустить ещё раз.
+
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+from django.template import Context, Template
+from django.utils import timezone
+
+from .models import Adult, Child, MailingRecipient, Participant, Registration, has_service
+
+
+def _people_condition(segment):
+    if segment == 'onsite':
+        return Q(participation_type='onsite')
+    if segment == 'online':
+        return Q(participation_type='online')
+    if segment.startswith('service:'):
+        return has_service(segment.split(':', 1)[1])
+    return None
+
+
+def segment_emails(segment):
+    """Уникальные адреса (в нижнем регистре) участников из группы."""
+    registrations = Registration.objects.filter(participant=OuterRef('pk'))
+    if segment == 'needs_transport':
+        registrations = registrations.filter(needs_transport=True)
+    else:
+        condition = _people_condition(segment)
+        if condition is not None:
+            registrations = registrations.filter(
+                Q(Exists(Adult.objects.filter(condition, registration=OuterRef('pk'))))
+                | Q(Exists(Child.objects.filter(condition, registration=OuterRef('pk'))))
+            )
+        elif segment != 'all':
+            raise ValueError(f"Unknown mailing segment: {segment}")
+    return (
+        Participant.objects
+        .filter(Exists(registrations))
+        .annotate(address=Lower('email'))
+        .values_list('address', flat=True)
+        .distinct()
+        .order_by('address')
+    )
+
+
+def prepare_recipients(mailing):
+    # ignore_conflicts + уникальный (mailing, email): повторный вызов добавит только новых
+    MailingRecipient.objects.bulk_create(
+        [MailingRecipient(mailing=mailing, email=email) for email in segment_emails(mailing.segment)],
+        ignore_conflicts=True,
+        batch_size=1000,
+    )
+
+
+def render_body(mailing):
+    return Template(mailing.body).render(Context({'mailing': mailing}))
+
+
+def send_mailing(mailing, batch_size=None, pause=None, connection=None):
+    """Отправляет всем pending-получателям. Возвращает (sent, failed)."""
+    batch_size = batch_size or settings.MAILING_BATCH_SIZE
+    pause = settings.MAILING_BATCH_PAUSE if pause is None else pause
+
+    if mailing.status == 'draft':
+        prepare_recipients(mailing)
+        mailing.status = 'sending'
+        mailing.save(update_fields=['status'])
+
+    body = render_body(mailing)
+    from_email = settings.DEFAULT_FROM_EMAIL or None
+    connection = connection or get_connection()
+    sent = failed = 0
+    while True:
+        batch = list(mailing.recipients.filter(status='pending').order_by('id')[:batch_size])
+        if not batch:
+            break
+        connection.open()
+        try:
+            for recipient in batch:
+                message = EmailMessage(mailing.subject, body, from_email, [recipient.email], connection=connection)
+                try:
+                    message.send()
+                except Exception as exc:
+                    recipient.status = 'failed'
+                    recipient.error = str(exc)[:2000]
+                    failed += 1
+                else:
+                    recipient.status = 'sent'
+                    recipient.sent_at = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+            # Прогресс фиксируем после каждой пачки
+            MailingRecipient.objects.bulk_update(
+                [r for r in batch if r.status != 'pending'], ['status', 'error', 'sent_at'],
+            )
+        if len(batch) == batch_size and pause:
+            time.sleep(pause)
+
+    mailing.status = 'done'
+    mailing.finished_at = timezone.now()
+    mailing.save(update_fields=['status', 'finished_at'])
+    return sent, failed
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users import housing
+
+
+class Command(BaseCommand):
+    help = "Распределяет все кровати в Brüderhaus/Schwesterhaus заново"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Только посчитать и показать результат, ничего не записывая",
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        placements, unassigned = housing.allocate_all(commit=not options['dry_run'])
+        elapsed = time.perf_counter() - started
+
+        for stay in unassigned:
+            self.stdout.write(
+                f"Kein Bett: {stay.kind} #{stay.person_id} (Anmeldung #{stay.registration_id}, "
+                f"{stay.house}, {stay.arrival}–{stay.departure})"
+            )
+        message = f"{len(placements)} bed(s) assigned, {len(unassigned)} without bed in {elapsed:.3f}s."
+        if unassigned:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Сколько одновременных открытых соединений выдерживает один процесс: "
+        "открывает N соединений разом и ждёт ответа на каждое. Без --url сам "
+        "поднимает gunicorn с одним воркером в режиме WSGI и ASGI (gunicorn.conf.py) и сравнивает их."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Уже запущенный сервер, например http://localhost:8000/users/profil/")
+        parser.add_argument('--path', default='/users/conference/', help="Адрес страницы для запущенных серверов")
+        parser.add_argument('--levels', default='50,100,200,400', help="Число соединений через запятую")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Сколько ждать ответа, секунды")
+        parser.add_argument('--cookie', default='', help="Заголовок Cookie, например sessionid=...")
+        parser.add_argument('--modes', default='wsgi,asgi')
+
+    def handle(self, *args, **options):
+        levels = [int(level) for level in options['levels'].split(',')]
+        if options['url']:
+            targets = [(options['url'], None)]
+        else:
+            targets = [(mode, mode) for mode in options['modes'].split(',')]
+
+        for name, mode in targets:
+            server = None
+            url = name
+            if mode:
+                port = self.free_port()
+                server = self.start_server(mode, port)
+                url = f'http://localhost:{port}{options["path"]}'
+            try:
+                self.stdout.write(f"{name}: {url}")
+                for level in levels:
+                    result = asyncio.run(self.run_level(url, level, options['timeout'], options['cookie']))
+                    self.report(level, result)
+            finally:
+                if server:
+                    server.terminate()
+                    server.wait(timeout=10)
+
+    def report(self, level, result):
+        latencies = sorted(result['latencies'])
+        if latencies:
+            timing = (
+                f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                f"p95 {latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000:7.1f} ms"
+            )
+        else:
+            timing = 'no responses'
+        self.stdout.write(
+            f"  {level:>5} open: {result['ok']:>5} ok  {result['errors']:>5} failed  "
+            f"{result['elapsed']:6.2f} s  {timing}"
+        )
+
+    def free_port(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def start_server(self, mode, port):
+        env = {
+            **os.environ,
+            'SERVER_MODE': mode,
+            'WEB_CONCURRENCY': '1',
+            'BIND': f'127.0.0.1:{port}',
+        }
+        config = os.path.join(settings.BASE_DIR, 'gunicorn.conf.py')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', config],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"{mode} server exited: {server.stderr.read().decode()[-2000:]}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+                return server
+            except OSError:
+                time.sleep(0.1)
+        server.terminate()
+        raise CommandError(f"{mode} server did not start on port {port}")
+
+    async def run_level(self, url, level, timeout, cookie):
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        path = parts.path or '/'
+        if parts.query:
+            path += f'?{parts.query}'
+        request = (
+            f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: close\r\n"
+            + (f"Cookie: {cookie}\r\n" if cookie else '')
+            + "\r\n"
+        ).encode()
+
+        async def one():
+            started = time.perf_counter()
+            reader, writer = await asyncio.open_connection(host, port)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status_line = await reader.readline()
+                await reader.read()  # до закрытия соединения сервером
+            finally:
+                writer.close()
+            status = int(status_line.split()[1])
+            if status >= 400:
+                raise ValueError(status)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(asyncio.wait_for(one(), timeout) for _ in range(level)),
+            return_exceptions=True,
+        )
+        latencies = [result for result in results if isinstance(result, float)]
+        return {
+            'ok': len(latencies),
+            'errors': level - len(latencies),
+            'elapsed': time.perf_counter() - started,
+            'latencies': latencies,
+        }
@@ -0,0 +1,42 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.kurtaxe import Tariff, compute_arrays
+
+
+class Command(BaseCommand):
+    help = "Замеряет расчёт курортного сбора на сгенерированных данных (без БД)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=50000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--max-seconds', type=float, default=None,
+            help="Завершиться с ошибкой, если расчёт дольше (для CI)",
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        people = options['people']
+        is_child = [rng.random() < 0.3 for _ in range(people)]
+        ages = [
+            (rng.randint(0, 17) if child else rng.choice([None, rng.randint(18, 90)]))
+            for child in is_child
+        ]
+        students = [not child and rng.random() < 0.1 for child in is_child]
+        nights = [rng.randint(0, 7) for _ in range(people)]
+        tariff = Tariff.from_settings()
+
+        started = time.perf_counter()
+        result = compute_arrays(is_child, ages, students, nights, tariff)
+        elapsed = time.perf_counter() - started
+
+        for group in result['groups']:
+            self.stdout.write(
+                f"{group['name']}: {group['people']} people, {group['nights']} nights, {group['kurtaxe_sum']} EUR"
+            )
+        self.stdout.write(f"{people} people in {elapsed * 1000:.1f} ms, total {result['total']} EUR")
+        if options['max_seconds'] is not None and elapsed > options['max_seconds']:
+            raise CommandError(f"Kurtaxe calculation took {elapsed:.3f}s (limit {options['max_seconds']}s).")
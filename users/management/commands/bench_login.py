@@ -0,0 +1,99 @@
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from users.models import Participant
+
+PASSWORD = 'benchmark1'
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность логина под нагрузкой: sync-view (как в WSGI-воркере) "
+        "и async-view с хэшированием в пуле потоков. Работает на временной БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--participants', type=int, default=50)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmpdir = tempfile.TemporaryDirectory()
+        # Файловая БД, а не shared-cache в памяти: иначе параллельные записи сессий падают с "table is locked"
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir.name, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            emails = self.create_participants(options['participants'])
+            total, concurrency = options['requests'], options['concurrency']
+            # Все логины идут с одного адреса — ограничитель частоты здесь мешает замеру
+            with override_settings(RATE_LIMIT_ENABLED=False):
+                results = [
+                    ('sync', self.run_sync(emails, total, concurrency)),
+                    ('async', asyncio.run(self.run_async(emails, total, concurrency))),
+                ]
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            tmpdir.cleanup()
+            teardown_test_environment()
+
+        self.stdout.write(f"{total} logins, concurrency {concurrency}")
+        for name, (elapsed, latencies) in results:
+            latencies.sort()
+            self.stdout.write(
+                f"{name:>5}: {total / elapsed:7.1f} req/s  "
+                f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms"
+            )
+
+    def create_participants(self, count):
+        # Один хэш на всех — подготовка не должна занимать больше самого замера
+        encoded = make_password(PASSWORD)
+        Participant.objects.bulk_create([
+            Participant(first_name='Bench', last_name=str(i), email=f'bench{i}@example.com', password=encoded)
+            for i in range(count)
+        ])
+        return [f'bench{i}@example.com' for i in range(count)]
+
+    def run_sync(self, emails, total, concurrency):
+        url = reverse('participant_login')
+
+        def login(i):
+            started = time.perf_counter()
+            response = Client().post(url, {'email': emails[i % len(emails)], 'password': PASSWORD})
+            assert response.status_code == 302, response.status_code
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(login, range(total)))
+        elapsed = time.perf_counter() - started
+        return elapsed, latencies
+
+    async def run_async(self, emails, total, concurrency):
+        with override_settings(ROOT_URLCONF='schramberg.async_urls'):
+            url = reverse('participant_login')
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def login(i):
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await AsyncClient().post(url, {'email': emails[i % len(emails)], 'password': PASSWORD})
+                    assert response.status_code == 302, response.status_code
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(*(login(i) for i in range(total)))
+            return time.perf_counter() - started, list(latencies)
@@ -0,0 +1,188 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+PASSWORD = 'benchmark1'
+
+STEPS = [
+    'participant_register',
+    'registration_start',
+    'registration_add_adult',
+    'registration_add_child',
+    'registration_overview',
+    'participant_profile',
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def person(first_name, age, gender='female'):
+    return {
+        'first_name': first_name, 'last_name': 'Bench', 'gender': gender, 'age': str(age),
+        'participation_type': 'onsite', 'housing_preference': 'family', 'food_preference': 'normal',
+        'arrival_date': '2025-08-01', 'departure_date': '2025-08-08', 'is_full_week': 'on',
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон всего мастера: регистрация участника → Anmeldung → взрослые/дети → "
+        "Abschluss → профиль. Печатает p50/p95/p99, req/s и SQL-запросы по шагам, пишет JSON. "
+        "Работает на временной БД."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--families', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--adults', type=int, default=2)
+        parser.add_argument('--children', type=int, default=2)
+        parser.add_argument(
+            '--fast-hashing', action='store_true',
+            help="MD5 вместо PBKDF2, чтобы хэш не заслонял остальные шаги",
+        )
+        parser.add_argument('--output', help="Куда записать JSON с результатами")
+        parser.add_argument('--baseline', help="JSON прошлого прогона: показать изменения p95 и числа запросов")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        tmpdir = tempfile.TemporaryDirectory()
+        # Файловая БД, как в bench_login: потоки пишут сессии параллельно
+        connection.settings_dict['TEST']['NAME'] = os.path.join(tmpdir.name, 'bench.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        overrides = {}
+        if options['fast_hashing']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+        try:
+            with override_settings(**overrides):
+                samples, elapsed = self.run(options)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            tmpdir.cleanup()
+            teardown_test_environment()
+
+        result = self.summarize(samples, elapsed, options)
+        self.report(result)
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                self.compare(json.load(f), result)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run(self, options):
+        def family(i):
+            client = Client()
+            measured = []
+
+            def step(name, method, url, data=None):
+                with CaptureQueriesContext(connections['default']) as queries:
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, data or {})
+                    latency = time.perf_counter() - started
+                assert response.status_code in (200, 302), (name, response.status_code)
+                measured.append((name, latency, len(queries)))
+
+            step('participant_register', 'post', reverse('participant_register'), {
+                'first_name': 'Bench', 'last_name': str(i), 'email': f'bench{i}@example.com',
+                'password': PASSWORD, 'privacy_accepted': 'on',
+            })
+            step('registration_start', 'get', reverse('registration_start'))
+            for n in range(options['adults']):
+                step('registration_add_adult', 'post', reverse('registration_add_adult'),
+                     person(f'Erw{n}', 35 + n, 'male' if n % 2 else 'female'))
+            for n in range(options['children']):
+                step('registration_add_child', 'post', reverse('registration_add_child'), person(f'Kind{n}', 4 + n))
+            step('registration_start', 'post', reverse('registration_start'), {'payment_method': 'transfer'})
+            step('registration_overview', 'get', reverse('registration_overview'))
+            step('registration_overview', 'post', reverse('registration_overview'), {'payment_method': 'transfer'})
+            step('participant_profile', 'get', reverse('participant_profile'))
+            connections.close_all()
+            return measured
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            families = list(pool.map(family, range(options['families'])))
+        elapsed = time.perf_counter() - started
+        return [sample for measured in families for sample in measured], elapsed
+
+    def summarize(self, samples, elapsed, options):
+        by_step = defaultdict(list)
+        for name, latency, queries in samples:
+            by_step[name].append((latency, queries))
+        steps = {}
+        for name in STEPS:
+            rows = by_step.get(name, [])
+            latencies = [latency for latency, _queries in rows]
+            queries = [count for _latency, count in rows]
+            steps[name] = {
+                'requests': len(rows),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'queries_avg': round(sum(queries) / len(queries), 2) if queries else 0,
+                'queries_max': max(queries, default=0),
+            }
+        return {
+            'commit': self.git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'options': {
+                key: options[key]
+                for key in ('families', 'concurrency', 'adults', 'children', 'fast_hashing')
+            },
+            'requests': len(samples),
+            'elapsed_s': round(elapsed, 3),
+            'requests_per_second': round(len(samples) / elapsed, 1) if elapsed else 0,
+            'families_per_second': round(options['families'] / elapsed, 2) if elapsed else 0,
+            'steps': steps,
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def report(self, result):
+        self.stdout.write(
+            f"{result['options']['families']} families, concurrency {result['options']['concurrency']}: "
+            f"{result['requests']} requests in {result['elapsed_s']:.2f} s, "
+            f"{result['requests_per_second']:.1f} req/s"
+        )
+        for name, step in result['steps'].items():
+            self.stdout.write(
+                f"{name:>24}: p50 {step['p50_ms']:8.1f} ms  p95 {step['p95_ms']:8.1f} ms  "
+                f"p99 {step['p99_ms']:8.1f} ms  {step['queries_avg']:5.1f} queries"
+            )
+
+    def compare(self, baseline, result):
+        self.stdout.write(f"Compared with {baseline.get('commit') or 'baseline'}:")
+        for name, step in result['steps'].items():
+            before = baseline['steps'].get(name)
+            if not before:
+                continue
+            self.stdout.write(
+                f"{name:>24}: p95 {step['p95_ms'] - before['p95_ms']:+8.1f} ms  "
+                f"{step['queries_avg'] - before['queries_avg']:+5.1f} queries"
+            )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.export import FORMATS, export_rows, stream_export
+from users.forms import ExportFilterForm
+
+
+class Command(BaseCommand):
+    help = "Выгружает участников, регистрации, взрослых и детей в CSV или JSONL (потоково)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="Файл для записи (по умолчанию stdout)")
+        parser.add_argument('--participation-type', choices=['onsite', 'online'])
+        parser.add_argument('--arrival-from', help="YYYY-MM-DD")
+        parser.add_argument('--arrival-to', help="YYYY-MM-DD")
+        parser.add_argument('--housing')
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        form = ExportFilterForm({
+            'format': options['format'],
+            'participation_type': options['participation_type'] or '',
+            'arrival_from': options['arrival_from'] or '',
+            'arrival_to': options['arrival_to'] or '',
+            'housing': options['housing'] or '',
+        })
+        if not form.is_valid():
+            raise CommandError(form.errors.as_text())
+
+        rows = export_rows(chunk_size=options['chunk_size'], **form.filters())
+        chunks = stream_export(options['format'], rows)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Генерирует синтетических участников, регистрации, взрослых и детей для проверки "
+        "на больших объёмах. Воспроизводимо по --seed; email в домене synthetic.invalid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--people', type=int, default=10000, help="Сколько людей создать (1k–500k)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000, help="Людей на одну транзакцию")
+        parser.add_argument('--clear', action='store_true', help="Сначала удалить ранее сгенерированные данные")
+
+    def handle(self, *args, **options):
+        if options['people'] < 1:
+            raise CommandError("--people must be positive.")
+        started = time.perf_counter()
+        if options['clear']:
+            deleted = synthetic.clear()
+            self.stdout.write(f"Removed {deleted} synthetic participant(s).")
+        elif synthetic.Participant.objects.filter(email__startswith=f"{options['seed']}-",
+                                                  email__endswith=f"@{synthetic.EMAIL_DOMAIN}").exists():
+            raise CommandError(f"Data for seed {options['seed']} already exists; use --clear or another --seed.")
+        counts = synthetic.generate(options['people'], seed=options['seed'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {counts['participants']} participants, {counts['registrations']} registrations, "
+            f"{counts['adults']} adults, {counts['children']} children in {elapsed:.1f} s."
+        ))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from users.models import Adult, Child, Registration
+
+
+class Command(BaseCommand):
+    help = "Удаляет пустые регистрации (без взрослых и детей), оставшиеся от старого мастера"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-hours', type=int, default=24,
+            help="Не трогать регистрации моложе N часов (по умолчанию 24)",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Только показать количество")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['older_than_hours'])
+        empty = Registration.objects.filter(created_at__lt=cutoff).exclude(
+            Exists(Adult.objects.filter(registration=OuterRef('pk')))
+        ).exclude(
+            Exists(Child.objects.filter(registration=OuterRef('pk')))
+        )
+        if options['dry_run']:
+            self.stdout.write(f"{empty.count()} empty registration(s) would be deleted.")
+            return
+        with transaction.atomic():
+            deleted = empty.delete()[1].get('users.Registration', 0)
+        self.stdout.write(self.style.SUCCESS(f"{deleted} empty registration(s) deleted."))
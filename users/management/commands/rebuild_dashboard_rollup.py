@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users import rollup
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает таблицу итогов дашборда с нуля и сообщает о расхождениях"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Только проверить расхождения, ничего не записывая (код выхода 1 при drift)",
+        )
+
+    def handle(self, *args, **options):
+        differences = rollup.drift()
+        for key, (stored, actual) in sorted(differences.items()):
+            self.stdout.write(f"{key}: stored={stored} actual={actual}")
+
+        if options['check']:
+            if differences:
+                raise CommandError(f"Dashboard rollup drift in {len(differences)} counter(s).")
+            self.stdout.write(self.style.SUCCESS("Dashboard rollup is consistent."))
+            return
+
+        rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Dashboard rollup rebuilt ({len(differences)} counter(s) corrected)."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import pricing
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает взносы (people_count, nights_total, цены) всех регистраций"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        changed = pricing.recompute_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Prices recomputed ({changed} registration(s) changed)."))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.mailing import segment_emails, send_mailing
+from users.models import MAILING_SEGMENT_CHOICES, Mailing
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт или отправляет рассылку. Без --create отправляет рассылку <id>; "
+        "прерванную рассылку можно запустить повторно — отправятся только оставшиеся адреса."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('mailing_id', nargs='?', type=int)
+        parser.add_argument('--create', action='store_true', help="Создать рассылку (нужны --segment, --subject, --body-file)")
+        parser.add_argument('--segment', choices=[code for code, _label in MAILING_SEGMENT_CHOICES])
+        parser.add_argument('--subject')
+        parser.add_argument('--body-file')
+        parser.add_argument('--dry-run', action='store_true', help="Только показать число адресов")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--pause', type=float, help="Пауза между пачками в секундах")
+
+    def handle(self, *args, **options):
+        if options['create']:
+            if not (options['segment'] and options['subject'] and options['body_file']):
+                raise CommandError("--create needs --segment, --subject and --body-file.")
+            with open(options['body_file'], encoding='utf-8') as f:
+                body = f.read()
+            mailing = Mailing.objects.create(subject=options['subject'], body=body, segment=options['segment'])
+            self.stdout.write(f"Mailing {mailing.id} created ({segment_emails(mailing.segment).count()} recipients).")
+            return
+
+        try:
+            mailing = Mailing.objects.get(pk=options['mailing_id'])
+        except Mailing.DoesNotExist:
+            raise CommandError(f"Mailing {options['mailing_id']} not found.")
+
+        if options['dry_run']:
+            self.stdout.write(f"{segment_emails(mailing.segment).count()} recipients.")
+            return
+        if mailing.status == 'done':
+            self.stdout.write("Mailing already sent.")
+            return
+
+        sent, failed = send_mailing(mailing, batch_size=options['batch_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(f"sent={sent} failed={failed}"))
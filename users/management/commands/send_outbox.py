@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.outbox import drain
+
+
+class Command(BaseCommand):
+    help = (
+        "Отправляет письма из очереди OutboxEmail пачками через одно SMTP-соединение. "
+        "Запускать в одном экземпляре."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help="Работать постоянно, опрашивая очередь")
+        parser.add_argument('--interval', type=float, default=5.0, help="Пауза между опросами в секундах")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = drain(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(f"sent={sent} failed={failed}")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
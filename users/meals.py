@@ -0,0 +1,161 @@
+# meals.py
+# План питания: порции на каждый день и приём пищи, отдельно normal/vegetarian.
+# Как и occupancy.py, SQL отдаёт группы (приезд, отъезд, питание) → количество;
+# в день приезда и отъезда человек ест только по правилам MEAL_RULES.
+# Результат кэшируется, signals.py сбрасывает кэш при изменении людей/регистраций.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+
+from .conference import conference_end, conference_start, stay_arrival, stay_departure
+from .models import Adult, Child
+
+MEALS = [
+    ('breakfast', 'Frühstück'),
+    ('lunch', 'Mittagessen'),
+    ('dinner', 'Abendessen'),
+]
+FOOD_CHOICES = Adult._meta.get_field('food_preference').choices
+
+MEAL_PLAN_CACHE_KEY = 'meal_plan'
+
+
+def _onsite(model):
+    return model.objects.filter(participation_type='onsite').annotate(
+        stay_from=stay_arrival(), stay_to=stay_departure(),
+    )
+
+
+def portion_groups():
+    """(stay_from, stay_to, food_preference) → n одним UNION-запросом."""
+    def grouped(model):
+        return (
+            _onsite(model)
+            .values('stay_from', 'stay_to', 'food_preference')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+    return grouped(Adult).union(grouped(Child), all=True)
+
+
+def diet_groups():
+    """Люди из регистраций с особым питанием, сгруппированные по датам."""
+    def grouped(model):
+        return (
+            _onsite(model)
+            .filter(registration__has_dietary_restrictions=True)
+            .annotate(
+                details=F('registration__dietary_details'),
+                family_name=F('registration__participant__last_name'),
+            )
+            .values('registration_id', 'details', 'family_name', 'stay_from', 'stay_to')
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+    return grouped(Adult).union(grouped(Child), all=True)
+
+
+def meals_on(first, last, day, rules):
+    """Какие приёмы пищи достаются человеку в день day его пребывания."""
+    all_meals = [code for code, _label in MEALS]
+    if first == last:
+        # Приезд и отъезд в один день: считаем как день приезда, иначе
+        # человека не было бы ни в одном приёме пищи
+        return rules['arrival']
+    if day == first:
+        return rules['arrival']
+    if day == last:
+        return rules['departure']
+    return all_meals
+
+
+def build_meal_plan(portions, diets, start=None, end=None, rules=None):
+    portions, diets = list(portions), list(diets)
+    rules = rules or settings.MEAL_RULES
+    start = start or conference_start()
+    end = end or conference_end()
+    for group in portions:
+        start = min(start, group['stay_from'])
+        end = max(end, group['stay_to'])
+    length = (end - start).days + 1
+
+    # Разностные массивы для полных дней + точечные добавки в дни приезда/отъезда
+    full_days = {food: [0] * (length + 1) for food, _label in FOOD_CHOICES}
+    edges = {
+        (meal, food): [0] * length
+        for meal, _label in MEALS for food, _label in FOOD_CHOICES
+    }
+    for group in portions:
+        first = (group['stay_from'] - start).days
+        last = (max(group['stay_to'], group['stay_from']) - start).days
+        food, n = group['food_preference'], group['n']
+        if food not in full_days:
+            continue
+        if last - first > 1:
+            full_days[food][first + 1] += n
+            full_days[food][last] -= n
+        for index in {first, last}:
+            for meal in meals_on(first, last, index, rules):
+                edges[(meal, food)][index] += n
+
+    meals = {}
+    for meal, _label in MEALS:
+        meals[meal] = {}
+        for food, _label in FOOD_CHOICES:
+            running, series = 0, []
+            for index in range(length):
+                running += full_days[food][index]
+                series.append(running + edges[(meal, food)][index])
+            meals[meal][food] = series
+
+    days = [(start + timedelta(days=i)).isoformat() for i in range(length)]
+    special_diets = {day: {} for day in days}
+    for group in diets:
+        first = max((group['stay_from'] - start).days, 0)
+        last = min((max(group['stay_to'], group['stay_from']) - start).days, length - 1)
+        for index in range(first, last + 1):
+            entry = special_diets[days[index]].setdefault(group['registration_id'], {
+                'name': group['family_name'],
+                'details': group['details'],
+                'people': 0,
+            })
+            entry['people'] += group['n']
+
+    return {
+        'days': days,
+        'meals': meals,
+        'special_diets': {
+            day: [entries[key] for key in sorted(entries)] for day, entries in special_diets.items()
+        },
+    }
+
+
+def meal_plan():
+    plan = cache.get(MEAL_PLAN_CACHE_KEY)
+    if plan is None:
+        plan = build_meal_plan(portion_groups(), diet_groups())
+        cache.set(MEAL_PLAN_CACHE_KEY, plan, settings.MEAL_PLAN_CACHE_TIMEOUT)
+    return plan
+
+
+def forget_meal_plan():
+    cache.delete(MEAL_PLAN_CACHE_KEY)
+
+
+def meal_plan_rows(plan):
+    """Для шаблона: строка на день, ячейки по (приём пищи, питание)."""
+    columns = [
+        (meal, meal_label, food, food_label)
+        for meal, meal_label in MEALS for food, food_label in FOOD_CHOICES
+    ]
+    rows = []
+    for index, day in enumerate(plan['days']):
+        rows.append({
+            'day': day,
+            'portions': [plan['meals'][meal][food][index] for meal, _ml, food, _fl in columns],
+            'special_diets': plan['special_diets'][day],
+        })
+    return {'columns': [f'{meal_label} {food_label}' for _m, meal_label, _f, food_label in columns], 'rows': rows}
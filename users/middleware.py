@@ -0,0 +1,75 @@
+# middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from .models import Participant
+
+
+def participant_cache_key(participant_id):
+    return f'participant:{participant_id}'
+
+
+def load_participant(participant_id):
+    if not participant_id:
+        return None
+    timeout = settings.PARTICIPANT_CACHE_TIMEOUT
+    if timeout:
+        participant = cache.get(participant_cache_key(participant_id))
+        if participant is not None:
+            return participant
+    participant = Participant.objects.filter(id=participant_id).first()
+    if participant is not None and timeout:
+        cache.set(participant_cache_key(participant_id), participant, timeout)
+    return participant
+
+
+async def aload_participant(participant_id):
+    if not participant_id:
+        return None
+    timeout = settings.PARTICIPANT_CACHE_TIMEOUT
+    if timeout:
+        participant = await cache.aget(participant_cache_key(participant_id))
+        if participant is not None:
+            return participant
+    participant = await Participant.objects.filter(id=participant_id).afirst()
+    if participant is not None and timeout:
+        await cache.aset(participant_cache_key(participant_id), participant, timeout)
+    return participant
+
+
+def get_participant(request):
+    # Один запрос на весь request, сколько бы раз ни спрашивали
+    if not hasattr(request, '_cached_participant'):
+        request._cached_participant = load_participant(request.session.get('participant_id'))
+    return request._cached_participant
+
+
+async def aget_participant(request):
+    # В async-view вызываем заранее: потом request.participant (и шаблон) берут из памяти
+    if not hasattr(request, '_cached_participant'):
+        request._cached_participant = await aload_participant(await request.session.aget('participant_id'))
+    return request._cached_participant
+
+
+class ParticipantMiddleware:
+    """Кладёт в request.participant ленивый объект — БД трогаем только при обращении."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.participant = SimpleLazyObject(lambda: get_participant(request))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.participant = SimpleLazyObject(lambda: get_participant(request))
+        return await self.get_response(request)
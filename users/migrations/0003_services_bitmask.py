@@ -0,0 +1,70 @@
+from django.db import migrations, models
+
+
+# Копия порядка битов на момент миграции — не зависит от будущих правок models.py
+SERVICE_CODES = [
+    'guitar', 'piano', 'kids_small', 'kids_kiga',
+    'kids_school', 'chairs', 'tech', 'microphones',
+]
+
+
+def strings_to_masks(apps, schema_editor):
+    for model_name in ('Adult', 'Child'):
+        model = apps.get_model('users', model_name)
+        changed = []
+        for person in model.objects.exclude(services='').only('id', 'services').iterator(chunk_size=2000):
+            codes = {code.strip() for code in person.services.split(',')}
+            person.services_mask = sum(1 << i for i, code in enumerate(SERVICE_CODES) if code in codes)
+            changed.append(person)
+        model.objects.bulk_update(changed, ['services_mask'], batch_size=2000)
+
+
+def masks_to_strings(apps, schema_editor):
+    for model_name in ('Adult', 'Child'):
+        model = apps.get_model('users', model_name)
+        changed = []
+        for person in model.objects.exclude(services_mask=0).only('id', 'services_mask').iterator(chunk_size=2000):
+            person.services = ','.join(
+                code for i, code in enumerate(SERVICE_CODES) if person.services_mask & (1 << i)
+            )
+            changed.append(person)
+        model.objects.bulk_update(changed, ['services'], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_dashboardcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='adult',
+            name='services_mask',
+            field=models.PositiveIntegerField(default=0, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='child',
+            name='services_mask',
+            field=models.PositiveIntegerField(default=0, db_index=True),
+        ),
+        migrations.RunPython(strings_to_masks, masks_to_strings),
+        migrations.RemoveField(
+            model_name='adult',
+            name='services',
+        ),
+        migrations.RemoveField(
+            model_name='child',
+            name='services',
+        ),
+        migrations.RenameField(
+            model_name='adult',
+            old_name='services_mask',
+            new_name='services',
+        ),
+        migrations.RenameField(
+            model_name='child',
+            old_name='services_mask',
+            new_name='services',
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_outboxemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Mailing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField(help_text='Django-Template, wird einmal pro Versand gerendert')),
+                ('segment', models.CharField(choices=[('all', 'Alle Angemeldeten'), ('onsite', 'Vor Ort'), ('online', 'Nur Online'), ('needs_transport', 'Braucht Transport'), ('service:guitar', 'Dienst: Gitarre'), ('service:piano', 'Dienst: Klavier'), ('service:kids_small', 'Dienst: Kleinkinder'), ('service:kids_kiga', 'Dienst: Kiga'), ('service:kids_school', 'Dienst: Schüler'), ('service:chairs', 'Dienst: Stuhldienst'), ('service:tech', 'Dienst: Technik'), ('service:microphones', 'Dienst: Mikrofondienst')], max_length=50)),
+                ('status', models.CharField(choices=[('draft', 'Entwurf'), ('sending', 'Wird gesendet'), ('done', 'Gesendet')], default='draft', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MailingRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('pending', 'Wartend'), ('sent', 'Gesendet'), ('failed', 'Fehlgeschlagen')], default='pending', max_length=10)),
+                ('error', models.TextField(blank=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('mailing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='users.mailing')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['mailing', 'status'], name='users_maili_mailing_e96f9c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('mailing', 'email'), name='unique_mailing_recipient')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_mailing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Room',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('house', models.CharField(choices=[('brudershaus', 'Brüderhaus'), ('sisterhaus', 'Schwesterhaus')], max_length=20)),
+                ('name', models.CharField(max_length=50)),
+                ('beds', models.PositiveIntegerField()),
+            ],
+            options={
+                'ordering': ['house', 'name'],
+                'constraints': [models.UniqueConstraint(fields=('house', 'name'), name='unique_room_name')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BedAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bed', models.PositiveIntegerField()),
+                ('arrival', models.DateField()),
+                ('departure', models.DateField()),
+                ('adult', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='users.adult')),
+                ('child', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='users.child')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bed_assignments', to='users.registration')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='users.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['room', 'arrival', 'departure'], name='users_bedas_room_id_4a5a6f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:25
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+# Прайс и даты конференции на момент миграции — копия, а не импорт
+# users.pricing/users.conference и settings: их правки не должны менять
+# то, что эта миграция однажды посчитала. Дальше цены ведёт recompute_prices.
+CONFERENCE_START = date(2025, 8, 1)
+CONFERENCE_END = date(2025, 8, 8)
+FULL_WEEK = Decimal('190.00')
+PER_NIGHT = Decimal('35.00')
+ONLINE = Decimal('20.00')
+FREE_BELOW = 3
+CHILD_FACTOR = 1 - Decimal('0.50')
+STUDENT_FACTOR = 1 - Decimal('0.25')
+CENT = Decimal('0.01')
+
+
+def person_price(is_child, age, is_student, is_full_week, participation_type, nights):
+    """(полная цена, частичная цена) одного человека."""
+    if age is not None and age < FREE_BELOW:
+        factor = Decimal(0)
+    elif is_child or (age is not None and age < 18):
+        factor = CHILD_FACTOR
+    elif is_student:
+        factor = STUDENT_FACTOR
+    else:
+        factor = Decimal(1)
+    if participation_type != 'onsite':
+        return Decimal(0), ONLINE * factor
+    if is_full_week:
+        return FULL_WEEK * factor, Decimal(0)
+    return Decimal(0), PER_NIGHT * nights * factor
+
+
+def compute_prices(apps, schema_editor):
+    results = defaultdict(lambda: {
+        'people_count': 0, 'nights_total': 0,
+        'full_price': Decimal(0), 'partial_price': Decimal(0),
+    })
+    for model_name, is_child in (('Adult', False), ('Child', True)):
+        people = apps.get_model('users', model_name).objects.values_list(
+            'registration_id', 'age', 'is_student', 'is_full_week',
+            'participation_type', 'arrival_date', 'departure_date',
+        )
+        for reg_id, age, is_student, is_full_week, participation, arrival, departure in people.iterator(chunk_size=2000):
+            nights = 0
+            if participation == 'onsite':
+                if is_full_week:
+                    arrival, departure = CONFERENCE_START, CONFERENCE_END
+                nights = max(((departure or CONFERENCE_END) - (arrival or CONFERENCE_START)).days, 0)
+            full, partial = person_price(is_child, age, is_student, is_full_week, participation, nights)
+            result = results[reg_id]
+            result['people_count'] += 1
+            result['nights_total'] += nights
+            result['full_price'] += full
+            result['partial_price'] += partial
+    Registration = apps.get_model('users', 'Registration')
+    fields = ['people_count', 'nights_total', 'full_price', 'partial_price', 'total_price']
+    changed = []
+    for reg in Registration.objects.only('id', *fields).iterator(chunk_size=2000):
+        result = results.get(reg.id)
+        if result is None:
+            continue  # пустая регистрация: значения по умолчанию (0) уже верны
+        reg.people_count = result['people_count']
+        reg.nights_total = result['nights_total']
+        reg.full_price = result['full_price'].quantize(CENT)
+        reg.partial_price = result['partial_price'].quantize(CENT)
+        reg.total_price = reg.full_price + reg.partial_price
+        changed.append(reg)
+    Registration.objects.bulk_update(changed, fields, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_room_bedassignment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='full_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='nights_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='partial_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=9),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='payment_method',
+            field=models.CharField(blank=True, choices=[('transfer', 'Überweisung'), ('cash', 'Bar vor Ort')], max_length=20),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='people_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=9),
+        ),
+        migrations.RunPython(compute_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:32
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_registration_pricing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='adult',
+            index=models.Index(fields=['registration', 'participation_type'], name='users_adult_registr_cc3a5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='adult',
+            index=models.Index(fields=['arrival_date', 'departure_date'], name='users_adult_arrival_9b5c47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(fields=['registration', 'participation_type'], name='users_child_registr_58170f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='child',
+            index=models.Index(fields=['arrival_date', 'departure_date'], name='users_child_arrival_6f6717_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='participant_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registration',
+            index=models.Index(fields=['participant', 'created_at'], name='users_regis_partici_34537d_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from collections import Counter
+
+from django.db import migrations
+
+
+# Копия ключей на момент миграции — не зависит от будущих правок models.py и rollup.py
+SERVICE_CODES = [
+    'guitar', 'piano', 'kids_small', 'kids_kiga',
+    'kids_school', 'chairs', 'tech', 'microphones',
+]
+FOOD_CODES = ['normal', 'vegetarian']
+HOUSING_CODES = ['family', 'brudershaus', 'sisterhaus', 'no_preference']
+
+
+def seed_counters(apps, schema_editor):
+    # Итоги дашборда для уже существующих данных: без них apply_deltas
+    # прибавлял бы дельты к нулю. Если rebuild уже запускали — не трогаем.
+    DashboardCounter = apps.get_model('users', 'DashboardCounter')
+    if DashboardCounter.objects.exists():
+        return
+    totals = Counter({key: 0 for key in ['people', 'children', 'nights', 'registrations', 'emails']})
+    totals.update({f'service_{code}': 0 for code in SERVICE_CODES})
+    totals.update({f'food_{code}': 0 for code in FOOD_CODES})
+    totals.update({f'housing_{code}': 0 for code in HOUSING_CODES})
+    for model_name in ('Adult', 'Child'):
+        people = apps.get_model('users', model_name).objects.values_list(
+            'arrival_date', 'departure_date', 'services', 'food_preference',
+            'participation_type', 'housing_preference',
+        )
+        for arrival, departure, services, food, participation, housing in people.iterator(chunk_size=2000):
+            totals['people'] += 1
+            if model_name == 'Child':
+                totals['children'] += 1
+            if arrival and departure:
+                totals['nights'] += (departure - arrival).days
+            for i, code in enumerate(SERVICE_CODES):
+                if services & (1 << i):
+                    totals[f'service_{code}'] += 1
+            if food in FOOD_CODES:
+                totals[f'food_{food}'] += 1
+            if participation == 'onsite' and housing in HOUSING_CODES:
+                totals[f'housing_{housing}'] += 1
+    Registration = apps.get_model('users', 'Registration')
+    totals['registrations'] = Registration.objects.count()
+    totals['emails'] = Registration.objects.values('participant').distinct().count()
+    DashboardCounter.objects.bulk_create(
+        [DashboardCounter(key=key, value=value) for key, value in totals.items()],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,46 @@
 from django.contrib.auth.hashers import make_password, check_password
 from django.db import models
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
 from django.utils import timezone
 
 
+# Порядок важен: позиция в списке — номер бита в поле services.
+# Новые служения добавлять только в конец.
+SERVICES_CHOICES = [
+    ('guitar', 'Gitarre'),
+    ('piano', 'Klavier'),
+    ('kids_small', 'Kleinkinder'),
+    ('kids_kiga', 'Kiga'),
+    ('kids_school', 'Schüler'),
+    ('chairs', 'Stuhldienst'),
+    ('tech', 'Technik'),
+    ('microphones', 'Mikrofondienst'),
+]
+SERVICE_BITS = {code: 1 << i for i, (code, _label) in enumerate(SERVICES_CHOICES)}
+
+
+def services_to_mask(codes):
+    return sum(SERVICE_BITS[code] for code in set(codes) if code in SERVICE_BITS)
+
+
+def mask_to_services(mask):
+    return [code for code, _label in SERVICES_CHOICES if mask & SERVICE_BITS[code]]
+
+
+def has_service(code):
+    """Q для фильтра по служению. Перечисляем все маски с нужным битом —
+    такой IN идёт по индексу на services, в отличие от побитового AND."""
+    bit = SERVICE_BITS[code]
+    return models.Q(services__in=[mask for mask in range(1 << len(SERVICES_CHOICES)) if mask & bit])
+
+
+def email_matches(email):
+    """Q для поиска участника по email без учёта регистра. В отличие от
+    email__iexact (LIKE в SQLite) идёт по индексу на Lower(email)."""
+    return models.Q(Exact(Lower('email'), email.lower()))
+
+
 class Participant(models.Model):
     # 🔐 Только данные регистрации / логина
     first_name = models.CharField(max_length=100)
@@ -18,6 +56,9 @@ class Participant(models.Model):
     # ✅ Обязательное согласие
     privacy_accepted = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [models.Index(Lower('email'), name='participant_email_lower_idx')]
+
     def __str__(self):
         return f'{self.first_name} {self.last_name} ({self.email})'
 
@@ -41,6 +82,22 @@ class Registration(models.Model):
     dietary_details = models.CharField(max_length=200, blank=True)
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    payment_method = models.CharField(
+        max_length=20,
+        choices=[('transfer', 'Überweisung'), ('cash', 'Bar vor Ort')],
+        blank=True,
+    )
+
+    # Денормализованные итоги для списков и дашборда — считает pricing.py
+    people_count = models.PositiveIntegerField(default=0)
+    nights_total = models.PositiveIntegerField(default=0)
+    full_price = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    partial_price = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+    total_price = models.DecimalField(max_digits=9, decimal_places=2, default=0)
+
+    class Meta:
+        # Регистрации участника всегда выводятся по created_at
+        indexes = [models.Index(fields=['participant', 'created_at'])]
 
     def __str__(self):
         return f"Anmeldung von {self.participant.full_name()} ({self.id})"
@@ -85,25 +142,23 @@ class Adult(models.Model):
         default='normal'  # <= вот так!
         )
     
-    SERVICES_CHOICES = [
-        ('guitar', 'Gitarre'),
-        ('piano', 'Klavier'),
-        ('kids_small', 'Kleinkinder'),
-        ('kids_kiga', 'Kiga'),
-        ('kids_school', 'Schüler'),
-        ('chairs', 'Stuhldienst'),
-        ('tech', 'Technik'),
-        ('microphones', 'Mikrofondienst'),
-    ]
-    services = models.CharField(max_length=200, blank=True)
+    SERVICES_CHOICES = SERVICES_CHOICES
+    # Битовая маска по SERVICES_CHOICES: guitar=1, piano=2, kids_small=4, ...
+    services = models.PositiveIntegerField(default=0, db_index=True)
 
     def __str__(self):
         return f"{self.age} J. ({self.participation_type})"
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['registration', 'participation_type']),
+            models.Index(fields=['arrival_date', 'departure_date']),
+        ]
+
     @property
     def services_list(self):
-        # Разбивает строку "guitar,piano" → ["guitar", "piano"]
-        return [s for s in self.services.split(',') if s.strip()]
+        # Маска 3 → ["guitar", "piano"]
+        return mask_to_services(self.services)
 
 
 class Child(models.Model):
@@ -143,22 +198,145 @@ class Child(models.Model):
         default='normal'  # <= вот так!
         )
     
-    SERVICES_CHOICES = [
-        ('guitar', 'Gitarre'),
-        ('piano', 'Klavier'),
-        ('kids_small', 'Kleinkinder'),
-        ('kids_kiga', 'Kiga'),
-        ('kids_school', 'Schüler'),
-        ('chairs', 'Stuhldienst'),
-        ('tech', 'Technik'),
-        ('microphones', 'Mikrofondienst'),
-    ]
-    services = models.CharField(max_length=200, blank=True)
+    SERVICES_CHOICES = SERVICES_CHOICES
+    # Битовая маска по SERVICES_CHOICES: guitar=1, piano=2, kids_small=4, ...
+    services = models.PositiveIntegerField(default=0, db_index=True)
 
     def __str__(self):
         return f"{self.age} J. ({self.participation_type})"
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['registration', 'participation_type']),
+            models.Index(fields=['arrival_date', 'departure_date']),
+        ]
+
     @property
     def services_list(self):
-        # Разбивает строку "guitar,piano" → ["guitar", "piano"]
-        return [s for s in self.services.split(',') if s.strip()]
+        # Маска 3 → ["guitar", "piano"]
+        return mask_to_services(self.services)
+
+
+class DashboardCounter(models.Model):
+    # Готовые итоги для дашборда, обновляются сигналами (см. rollup.py)
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class OutboxEmail(models.Model):
+    # Письма не отправляются из view, а ждут здесь воркера (manage.py send_outbox)
+    STATUS_CHOICES = [
+        ('pending', 'Wartend'),
+        ('sent', 'Gesendet'),
+        ('failed', 'Fehlgeschlagen'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.subject} → {', '.join(self.recipients)} ({self.status})"
+
+
+MAILING_SEGMENT_CHOICES = [
+    ('all', 'Alle Angemeldeten'),
+    ('onsite', 'Vor Ort'),
+    ('online', 'Nur Online'),
+    ('needs_transport', 'Braucht Transport'),
+] + [(f'service:{code}', f'Dienst: {label}') for code, label in SERVICES_CHOICES]
+
+
+class Mailing(models.Model):
+    # Рассылка по группе участников; отправка — manage.py send_mailing <id>
+    STATUS_CHOICES = [
+        ('draft', 'Entwurf'),
+        ('sending', 'Wird gesendet'),
+        ('done', 'Gesendet'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(help_text="Django-Template, wird einmal pro Versand gerendert")
+    segment = models.CharField(max_length=50, choices=MAILING_SEGMENT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} ({self.get_segment_display()})"
+
+
+class MailingRecipient(models.Model):
+    # Прогресс рассылки по адресам — после обрыва продолжаем с pending
+    STATUS_CHOICES = [
+        ('pending', 'Wartend'),
+        ('sent', 'Gesendet'),
+        ('failed', 'Fehlgeschlagen'),
+    ]
+
+    mailing = models.ForeignKey(Mailing, on_delete=models.CASCADE, related_name='recipients')
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mailing', 'email'], name='unique_mailing_recipient'),
+        ]
+        indexes = [models.Index(fields=['mailing', 'status'])]
+
+    def __str__(self):
+        return f"{self.email} ({self.status})"
+
+
+HOUSE_CHOICES = [
+    ('brudershaus', 'Brüderhaus'),
+    ('sisterhaus', 'Schwesterhaus'),
+]
+
+
+class Room(models.Model):
+    # Комнаты и число кроватей задаются в админке; распределение — housing.py
+    house = models.CharField(max_length=20, choices=HOUSE_CHOICES)
+    name = models.CharField(max_length=50)
+    beds = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['house', 'name']
+        constraints = [
+            models.UniqueConstraint(fields=['house', 'name'], name='unique_room_name'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_house_display()} {self.name} ({self.beds} Betten)"
+
+
+class BedAssignment(models.Model):
+    # Кровать занята на ночи [arrival, departure): в день отъезда её уже можно отдать
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='assignments')
+    bed = models.PositiveIntegerField()
+    registration = models.ForeignKey(Registration, on_delete=models.CASCADE, related_name='bed_assignments')
+    adult = models.ForeignKey(Adult, on_delete=models.CASCADE, null=True, blank=True)
+    child = models.ForeignKey(Child, on_delete=models.CASCADE, null=True, blank=True)
+    arrival = models.DateField()
+    departure = models.DateField()
+
+    class Meta:
+        indexes = [models.Index(fields=['room', 'arrival', 'departure'])]
+
+    def __str__(self):
+        return f"{self.room.name} / Bett {self.bed}: {self.adult or self.child} ({self.arrival}–{self.departure})"
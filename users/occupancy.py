@@ -0,0 +1,125 @@
+# occupancy.py
+# Сколько людей на месте в каждый день конференции. SQL отдаёт не людей, а
+# группы (приезд, отъезд, пол, возраст, проживание) → количество, дальше —
+# разностный массив: +n в день приезда, −n после дня отъезда и префиксная
+# сумма. Стоимость не зависит от длины пребывания каждого человека.
+
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db.models import Case, CharField, Count, Value, When
+
+from .conference import conference_end, conference_start, stay_arrival, stay_departure
+from .models import Adult, Child
+
+# (ключ, подпись, возраст «до», не включая); последняя группа — без верхней границы
+AGE_BANDS = [
+    ('0-2', '0–2 J.', 3),
+    ('3-5', '3–5 J.', 6),
+    ('6-11', '6–11 J.', 12),
+    ('12-17', '12–17 J.', 18),
+    ('18+', 'ab 18 J.', None),
+]
+UNKNOWN = 'unknown'
+
+BREAKDOWNS = ('gender', 'age_band', 'housing')
+
+
+def _age_band():
+    whens = [When(age__lt=limit, then=Value(key)) for key, _label, limit in AGE_BANDS if limit]
+    open_band = AGE_BANDS[-1][0]
+    return Case(
+        When(age__isnull=True, then=Value(UNKNOWN)),
+        *whens,
+        default=Value(open_band),
+        output_field=CharField(),
+    )
+
+
+def _grouped(model):
+    return (
+        model.objects.filter(participation_type='onsite')
+        .annotate(stay_from=stay_arrival(), stay_to=stay_departure(), age_band=_age_band())
+        .values('stay_from', 'stay_to', 'gender', 'age_band', 'housing_preference')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+
+
+def stay_groups():
+    """Группы людей на месте одним запросом (UNION по Adult и Child)."""
+    return _grouped(Adult).union(_grouped(Child), all=True)
+
+
+def _sweep(deltas, length):
+    return list(accumulate(deltas[:length]))
+
+
+def build_timeline(groups, start=None, end=None):
+    """Таймлайн по дням из групп (stay_from, stay_to, gender, age_band, housing, n).
+
+    present — на месте в течение дня (включая день приезда и отъезда),
+    overnight — ночует (день отъезда не считается).
+    """
+    groups = list(groups)
+    start = start or conference_start()
+    end = end or conference_end()
+    if groups:
+        start = min(start, min(group['stay_from'] for group in groups))
+        end = max(end, max(group['stay_to'] for group in groups))
+    length = (end - start).days + 1
+
+    present = [0] * (length + 1)
+    overnight = [0] * (length + 1)
+    breakdowns = {name: {} for name in BREAKDOWNS}
+    for group in groups:
+        first = (group['stay_from'] - start).days
+        last = (max(group['stay_to'], group['stay_from']) - start).days
+        n = group['n']
+        present[first] += n
+        present[last + 1] -= n
+        overnight[first] += n
+        overnight[last] -= n
+        keys = {
+            'gender': group['gender'],
+            'age_band': group['age_band'],
+            'housing': group['housing_preference'] or UNKNOWN,
+        }
+        for name, key in keys.items():
+            deltas = breakdowns[name].setdefault(key, [0] * (length + 1))
+            deltas[first] += n
+            deltas[last + 1] -= n
+
+    return {
+        'days': [(start + timedelta(days=i)).isoformat() for i in range(length)],
+        'present': _sweep(present, length),
+        'overnight': _sweep(overnight, length),
+        **{
+            name: {key: _sweep(deltas, length) for key, deltas in sorted(series.items())}
+            for name, series in breakdowns.items()
+        },
+    }
+
+
+def timeline():
+    return build_timeline(stay_groups())
+
+
+def timeline_table(data):
+    """Для шаблона: заголовки колонок и строки (день, значения)."""
+    columns = [('present', 'Anwesend'), ('overnight', 'Übernachtungen')]
+    series = [data['present'], data['overnight']]
+    labels = {
+        'gender': dict(Adult.GENDER_CHOICES),
+        'age_band': {key: label for key, label, _limit in AGE_BANDS},
+        'housing': dict(Adult.HOUSING_CHOICES),
+    }
+    for name in BREAKDOWNS:
+        for key, values in data[name].items():
+            columns.append((f'{name}:{key}', labels[name].get(key, key)))
+            series.append(values)
+    rows = [
+        (day, [values[i] for values in series])
+        for i, day in enumerate(data['days'])
+    ]
+    return {'columns': [label for _key, label in columns], 'rows': rows}
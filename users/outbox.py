@@ -0,0 +1,104 @@
+# outbox.py
+# Очередь исходящих писем в БД. View только кладут письмо в OutboxEmail,
+# воркер (manage.py send_outbox) забирает их пачками и отправляет через одно
+# SMTP-соединение. Ошибки — повтор с экспоненциальной задержкой.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def enqueue_mail(subject, message, recipient_list, from_email=None):
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        recipients=list(recipient_list),
+    )
+
+
+async def aenqueue_mail(subject, message, recipient_list, from_email=None):
+    return await OutboxEmail.objects.acreate(
+        subject=subject,
+        body=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        recipients=list(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.OUTBOX_RETRY_BACKOFF * 2 ** (attempts - 1))
+
+
+def _mark_failed(item, error, now):
+    item.attempts += 1
+    item.last_error = str(error)[:2000]
+    if item.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        item.status = 'failed'
+    else:
+        item.next_attempt_at = now + retry_delay(item.attempts)
+
+
+def deliver_batch(batch_size=50, connection=None):
+    """Отправляет до batch_size созревших писем. Возвращает (sent, failed)."""
+    now = timezone.now()
+    batch = list(
+        OutboxEmail.objects
+        .filter(status='pending', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')[:batch_size]
+    )
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+    try:
+        connection.open()
+    except Exception as exc:
+        # Сервер недоступен — вся пачка уходит на повтор
+        for item in batch:
+            _mark_failed(item, exc, now)
+        failed = len(batch)
+    else:
+        try:
+            for item in batch:
+                message = EmailMessage(
+                    subject=item.subject,
+                    body=item.body,
+                    from_email=item.from_email or None,
+                    to=item.recipients,
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as exc:
+                    _mark_failed(item, exc, now)
+                    failed += 1
+                else:
+                    item.status = 'sent'
+                    item.attempts += 1
+                    item.sent_at = timezone.now()
+                    item.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+
+    OutboxEmail.objects.bulk_update(
+        batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'],
+    )
+    return sent, failed
+
+
+def drain(batch_size=50):
+    """Отправляет всё созревшее; одно соединение на пачку."""
+    total_sent = total_failed = 0
+    while True:
+        sent, failed = deliver_batch(batch_size)
+        total_sent += sent
+        total_failed += failed
+        if sent + failed < batch_size:
+            return total_sent, total_failed
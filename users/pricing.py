@@ -0,0 +1,121 @@
+# pricing.py
+# Взносы участников (TN Beiträge) по прайсу settings.PRICING. Результат
+# хранится прямо в Registration (people_count, nights_total, full_price,
+# partial_price, total_price), чтобы списки и дашборд не считали его заново.
+# Полный пересчёт — manage.py recompute_prices, при правке взрослого/ребёнка
+# signals.py пересчитывает только его регистрацию.
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, IntegerField, Value
+
+from .conference import stay_arrival, stay_departure
+from .models import Adult, Child, Registration
+
+PRICE_FIELDS = ['people_count', 'nights_total', 'full_price', 'partial_price', 'total_price']
+CENT = Decimal('0.01')
+
+
+class PriceList:
+    def __init__(self, full_week, per_night, online, free_below, child_discount, student_discount):
+        self.full_week = Decimal(full_week)
+        self.per_night = Decimal(per_night)
+        self.online = Decimal(online)
+        self.free_below = free_below
+        self.child_factor = 1 - Decimal(child_discount)
+        self.student_factor = 1 - Decimal(student_discount)
+
+    @classmethod
+    def from_settings(cls):
+        return cls(**settings.PRICING)
+
+    def factor(self, is_child, age, is_student):
+        if age is not None and age < self.free_below:
+            return Decimal(0)
+        if is_child or (age is not None and age < 18):
+            return self.child_factor
+        if is_student:
+            return self.student_factor
+        return Decimal(1)
+
+    def price(self, is_child, age, is_student, is_full_week, participation_type, nights):
+        """(полная цена, частичная цена) одного человека."""
+        factor = self.factor(is_child, age, is_student)
+        if participation_type != 'onsite':
+            return Decimal(0), self.online * factor
+        if is_full_week:
+            return self.full_week * factor, Decimal(0)
+        return Decimal(0), self.per_night * nights * factor
+
+
+def price_groups(registration_ids=None):
+    """Люди, сгруппированные по всему, что влияет на цену, — один UNION-запрос."""
+    def grouped(model, is_child):
+        qs = model.objects.all()
+        if registration_ids is not None:
+            qs = qs.filter(registration_id__in=registration_ids)
+        return (
+            qs.annotate(
+                stay_from=stay_arrival(), stay_to=stay_departure(),
+                is_child=Value(int(is_child), output_field=IntegerField()),
+            )
+            .values(
+                'registration_id', 'is_child', 'age', 'is_student', 'is_full_week',
+                'participation_type', 'stay_from', 'stay_to',
+            )
+            .annotate(n=Count('id'))
+            .order_by()
+        )
+    return grouped(Adult, False).union(grouped(Child, True), all=True)
+
+
+def compute(groups, prices=None):
+    """{registration_id: {поле: значение}} для всех регистраций из groups."""
+    prices = prices or PriceList.from_settings()
+    results = defaultdict(lambda: {
+        'people_count': 0, 'nights_total': 0,
+        'full_price': Decimal(0), 'partial_price': Decimal(0),
+    })
+    for group in groups:
+        onsite = group['participation_type'] == 'onsite'
+        nights = max((group['stay_to'] - group['stay_from']).days, 0) if onsite else 0
+        full, partial = prices.price(
+            bool(group['is_child']), group['age'], group['is_student'],
+            group['is_full_week'], group['participation_type'], nights,
+        )
+        n = group['n']
+        result = results[group['registration_id']]
+        result['people_count'] += n
+        result['nights_total'] += nights * n
+        result['full_price'] += full * n
+        result['partial_price'] += partial * n
+    for result in results.values():
+        result['full_price'] = result['full_price'].quantize(CENT)
+        result['partial_price'] = result['partial_price'].quantize(CENT)
+        result['total_price'] = result['full_price'] + result['partial_price']
+    return results
+
+
+EMPTY = {'people_count': 0, 'nights_total': 0, 'full_price': 0, 'partial_price': 0, 'total_price': 0}
+
+
+def recompute_registration(registration_id):
+    """Пересчитать одну регистрацию: один SELECT и один UPDATE."""
+    values = compute(price_groups([registration_id])).get(registration_id, EMPTY)
+    Registration.objects.filter(pk=registration_id).update(**values)
+
+
+def recompute_all(batch_size=500):
+    """Пересчитать все регистрации; возвращает число изменённых."""
+    results = compute(price_groups())
+    changed = []
+    for reg in Registration.objects.only('id', *PRICE_FIELDS).iterator(chunk_size=batch_size):
+        values = results.get(reg.id, EMPTY)
+        if any(getattr(reg, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(reg, field, value)
+            changed.append(reg)
+    Registration.objects.bulk_update(changed, PRICE_FIELDS, batch_size=batch_size)
+    return len(changed)
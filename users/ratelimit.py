@@ -0,0 +1,208 @@
+# ratelimit.py
+# Ограничение частоты логина и запросов сброса пароля: token bucket по IP и
+# по email. Проверка идёт до PBKDF2 и до постановки письма в очередь, поэтому
+# поток ботов не съедает CPU воркеров. Лимиты — settings.RATE_LIMITS:
+# (ёмкость, за сколько секунд ведро наполняется целиком).
+#
+# Бэкенды: 'memory' — в памяти процесса (у каждого воркера свои вёдра),
+# 'cache' — в общем Django-кэше. Чтение и запись вёдер в кэше — два разных
+# запроса, поэтому на это время вёдра запираются через cache.add (атомарен в
+# memcached, Redis, locmem и database-кэше); без замка N одновременных
+# запросов видели бы одно и то же ведро и проходили бы все.
+
+import asyncio
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.shortcuts import render
+
+MEMORY_MAX_KEYS = 10000
+# Замок упавшего воркера сам истекает через LOCK_TIMEOUT секунд; кто не дождался
+# замка за LOCK_WAIT, получает отказ (429), а не проходит без проверки
+LOCK_TIMEOUT = 2
+LOCK_WAIT = 1.0
+LOCK_POLL = 0.005
+
+# Часы вынесены отдельно, чтобы тесты могли их подменить
+clock = time.time
+
+
+class MemoryBackend:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, buckets, now):
+        with self._lock:
+            states = [self._buckets.get(key) for key, _capacity, _rate in buckets]
+            retry_after, updated = _consume(buckets, states, now)
+            if updated:
+                if len(self._buckets) > MEMORY_MAX_KEYS:
+                    self._prune(now)
+                self._buckets.update(updated)
+            return retry_after
+
+    def _prune(self, now):
+        # Полные вёдра ничем не отличаются от отсутствующих
+        limits = {key: (capacity, rate) for key, capacity, rate in _all_limits()}
+        for key, (tokens, stamp) in list(self._buckets.items()):
+            capacity, rate = limits.get(key.rsplit(':', 1)[0], (0, 0))
+            if not rate or tokens + (now - stamp) * rate >= capacity:
+                del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBackend:
+    def take(self, buckets, now):
+        locks = _lock_keys(buckets)
+        if not self._lock(locks):
+            return LOCK_WAIT
+        try:
+            keys = [key for key, _capacity, _rate in buckets]
+            found = cache.get_many(keys)
+            retry_after, updated = _consume(buckets, [found.get(key) for key in keys], now)
+            if updated:
+                cache.set_many(updated, timeout=_timeout(buckets))
+            return retry_after
+        finally:
+            cache.delete_many(locks)
+
+    async def atake(self, buckets, now):
+        locks = _lock_keys(buckets)
+        if not await self._alock(locks):
+            return LOCK_WAIT
+        try:
+            keys = [key for key, _capacity, _rate in buckets]
+            found = await cache.aget_many(keys)
+            retry_after, updated = _consume(buckets, [found.get(key) for key in keys], now)
+            if updated:
+                await cache.aset_many(updated, timeout=_timeout(buckets))
+            return retry_after
+        finally:
+            await cache.adelete_many(locks)
+
+    def _lock(self, locks):
+        deadline = time.monotonic() + LOCK_WAIT
+        for i, key in enumerate(locks):
+            while not cache.add(key, 1, LOCK_TIMEOUT):
+                if time.monotonic() >= deadline:
+                    cache.delete_many(locks[:i])
+                    return False
+                time.sleep(LOCK_POLL)
+        return True
+
+    async def _alock(self, locks):
+        deadline = time.monotonic() + LOCK_WAIT
+        for i, key in enumerate(locks):
+            while not await cache.aadd(key, 1, LOCK_TIMEOUT):
+                if time.monotonic() >= deadline:
+                    await cache.adelete_many(locks[:i])
+                    return False
+                await asyncio.sleep(LOCK_POLL)
+        return True
+
+
+def _lock_keys(buckets):
+    # Один порядок у всех запросов: ведро IP общее для разных email
+    return sorted(f'{key}:lock' for key, _capacity, _rate in buckets)
+
+
+def _timeout(buckets):
+    # После полного наполнения ведро можно забыть
+    return max(int(capacity / rate) + 1 for _key, capacity, rate in buckets)
+
+
+def _consume(buckets, states, now):
+    """(None, новые состояния), если во всех вёдрах есть жетон; иначе (секунды ожидания, {})."""
+    levels = []
+    for (_key, capacity, rate), state in zip(buckets, states):
+        tokens, stamp = state or (capacity, now)
+        levels.append(min(capacity, tokens + (now - stamp) * rate))
+    waits = [
+        (1 - tokens) / rate
+        for (_key, _capacity, rate), tokens in zip(buckets, levels) if tokens < 1
+    ]
+    if waits:
+        return max(waits), {}
+    return None, {key: (tokens - 1, now) for (key, _capacity, _rate), tokens in zip(buckets, levels)}
+
+
+def _all_limits():
+    for scope, limits in settings.RATE_LIMITS.items():
+        for kind, (capacity, period) in limits.items():
+            yield f'ratelimit:{scope}:{kind}', capacity, capacity / period
+
+
+_memory = MemoryBackend()
+
+
+def get_backend():
+    return CacheBackend() if settings.RATE_LIMIT_BACKEND == 'cache' else _memory
+
+
+def client_ip(request):
+    remote_addr = request.META.get('REMOTE_ADDR', '')
+    header = settings.RATE_LIMIT_IP_HEADER
+    if not header:
+        return remote_addr
+    # X-Forwarded-For: каждый прокси дописывает справа адрес, от которого
+    # получил запрос. Левые записи присылает сам клиент и может подделать,
+    # поэтому берём ту, что дописал самый внешний из наших прокси
+    entries = [entry.strip() for entry in request.META.get(header, '').split(',') if entry.strip()]
+    trusted = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if trusted < 1 or len(entries) < trusted:
+        return remote_addr
+    return entries[-trusted]
+
+
+def _buckets(scope, request, email):
+    limits = settings.RATE_LIMITS[scope]
+    values = {'ip': client_ip(request), 'email': (email or '').strip().lower()}
+    buckets = []
+    for kind, (capacity, period) in limits.items():
+        if not values.get(kind):
+            continue
+        digest = hashlib.sha256(values[kind].encode()).hexdigest()[:32]
+        buckets.append((f'ratelimit:{scope}:{kind}:{digest}', capacity, capacity / period))
+    return buckets
+
+
+def check(scope, request, email=''):
+    """None — запрос можно обрабатывать; иначе через сколько секунд повторить."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    buckets = _buckets(scope, request, email)
+    return get_backend().take(buckets, clock()) if buckets else None
+
+
+async def acheck(scope, request, email=''):
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    buckets = _buckets(scope, request, email)
+    if not buckets:
+        return None
+    backend = get_backend()
+    if isinstance(backend, CacheBackend):
+        return await backend.atake(buckets, clock())
+    return backend.take(buckets, clock())
+
+
+def too_many_requests(request, template, context, retry_after):
+    """Та же страница с сообщением и статусом 429."""
+    seconds = max(int(retry_after + 0.999), 1)
+    messages.error(request, f"Zu viele Versuche. Bitte versuchen Sie es in {seconds} Sekunden erneut.")
+    response = render(request, template, context, status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def reset():
+    """Очистить вёдра в памяти процесса (для тестов и бенчмарков)."""
+    _memory.clear()
@@ -0,0 +1,124 @@
+# rollup.py
+# Инкрементальные итоги для дашборда. Каждое сохранение/удаление Adult, Child
+# или Registration превращается в набор дельт, которые одним UPDATE
+# применяются к таблице DashboardCounter. Ключи совпадают с stats.person_totals().
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+
+from .models import Child, DashboardCounter, Registration
+from .stats import person_totals
+
+_deferred = ContextVar('rollup_deferred', default=False)
+
+
+def person_contribution(person):
+    """Вклад одного человека в итоги — зеркало SQL-агрегатов из stats.py."""
+    counts = Counter(people=1)
+    if isinstance(person, Child):
+        counts['children'] = 1
+    if person.arrival_date and person.departure_date:
+        counts['nights'] = (person.departure_date - person.arrival_date).days
+    for code in person.services_list:
+        counts[f'service_{code}'] += 1
+    counts[f'food_{person.food_preference}'] = 1
+    if person.participation_type == 'onsite' and person.housing_preference:
+        counts[f'housing_{person.housing_preference}'] = 1
+    return counts
+
+
+def subtract(new, old):
+    deltas = Counter(new)
+    deltas.subtract(old)
+    return deltas
+
+
+def _add(deltas):
+    """Одним UPDATE прибавить дельты к существующим строкам; возвращает их число."""
+    return DashboardCounter.objects.filter(key__in=deltas).update(
+        value=F('value') + Case(
+            *[When(key=key, then=Value(delta)) for key, delta in deltas.items()],
+            default=Value(0),
+            output_field=BigIntegerField(),
+        )
+    )
+
+
+def is_deferred():
+    return _deferred.get()
+
+
+@contextmanager
+def deferred():
+    """Массовые операции: дельты внутри блока не применяются, по выходу — один rebuild()."""
+    token = _deferred.set(True)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    rebuild()
+
+
+def apply_deltas(deltas):
+    if _deferred.get():
+        return
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    if _add(deltas) < len(deltas):
+        # Строки нет: новый ключ (добавили служение или вариант выбора) — у
+        # прежних людей его быть не могло, поэтому счёт начинается с нуля.
+        # Таблицу для существующих данных заполняет миграция 0009.
+        existing = set(DashboardCounter.objects.filter(key__in=deltas).values_list('key', flat=True))
+        missing = {key: delta for key, delta in deltas.items() if key not in existing}
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(key=key, value=0) for key in missing], ignore_conflicts=True,
+        )
+        _add(missing)
+
+
+def totals():
+    """Все итоги одним запросом; None, если таблица ещё не построена."""
+    values = dict(DashboardCounter.objects.values_list('key', 'value'))
+    return values or None
+
+
+def compute_totals():
+    computed = person_totals()
+    computed['registrations'] = Registration.objects.count()
+    computed['emails'] = Registration.objects.values('participant').distinct().count()
+    return computed
+
+
+def drift():
+    """{key: (stored, actual)} для всех расхождений."""
+    stored = totals() or {}
+    actual = compute_totals()
+    return {
+        key: (stored.get(key), value)
+        for key, value in actual.items()
+        if stored.get(key) != value
+    }
+
+
+@transaction.atomic
+def rebuild():
+    actual = compute_totals()
+    DashboardCounter.objects.exclude(key__in=actual).delete()
+    existing = {counter.key: counter for counter in DashboardCounter.objects.select_for_update()}
+    to_create = []
+    to_update = []
+    for key, value in actual.items():
+        counter = existing.get(key)
+        if counter is None:
+            to_create.append(DashboardCounter(key=key, value=value))
+        elif counter.value != value:
+            counter.value = value
+            to_update.append(counter)
+    DashboardCounter.objects.bulk_create(to_create)
+    DashboardCounter.objects.bulk_update(to_update, ['value'])
+    return actual
@@ -0,0 +1,51 @@
+# routers.py
+# Отчёты (дашборд, выгрузка, планы) читают через отдельное соединение
+# 'reporting' — SQLite-файл, открытый с mode=ro. В WAL такой читатель никогда
+# не берёт блокировку записи и не мешает регистрациям. Пишем всегда в default.
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPORTING = 'reporting'
+
+_reporting = ContextVar('reporting', default=False)
+
+
+def reporting_alias():
+    if REPORTING not in settings.DATABASES:
+        return DEFAULT_DB_ALIAS
+    # В тестах reporting — зеркало default (TEST.MIRROR): читаем из самого
+    # default, иначе не видно данных из незакоммиченной транзакции теста
+    if connections[REPORTING].settings_dict['NAME'] == connections[DEFAULT_DB_ALIAS].settings_dict['NAME']:
+        return DEFAULT_DB_ALIAS
+    return REPORTING
+
+
+@contextmanager
+def reporting():
+    """Все чтения внутри блока идут в reporting (если он настроен)."""
+    token = _reporting.set(True)
+    try:
+        yield
+    finally:
+        _reporting.reset(token)
+
+
+class ReportingRouter:
+    def db_for_read(self, model, **hints):
+        if _reporting.get():
+            return reporting_alias()
+        # Иначе решает Django: база экземпляра из hints или default
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
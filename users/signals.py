@@ -0,0 +1,126 @@
+# signals.py
+from collections import Counter
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import housing, pricing, rollup
+from .meals import forget_meal_plan
+from .middleware import participant_cache_key
+from .models import Adult, Child, Participant, Registration
+
+
+@receiver(post_save, sender=Participant)
+@receiver(post_delete, sender=Participant)
+def forget_cached_participant(sender, instance, **kwargs):
+    if settings.PARTICIPANT_CACHE_TIMEOUT:
+        cache.delete(participant_cache_key(instance.pk))
+    if settings.NAV_CACHE_TIMEOUT:
+        cache.delete(make_template_fragment_key('layout_nav_participant', [instance.pk]))
+
+
+@receiver(post_save, sender=Adult)
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Adult)
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Registration)
+def forget_cached_reports(sender, **kwargs):
+    forget_meal_plan()
+
+
+@receiver(pre_save, sender=Adult)
+@receiver(pre_save, sender=Child)
+def remember_person_contribution(sender, instance, **kwargs):
+    # Старое состояние нужно, чтобы применить разницу, а не пересчитывать всё
+    old = sender.objects.filter(pk=instance.pk).first() if instance.pk else None
+    instance._rollup_old = rollup.person_contribution(old) if old else {}
+
+
+@receiver(post_save, sender=Adult)
+@receiver(post_save, sender=Child)
+def person_saved(sender, instance, **kwargs):
+    old = getattr(instance, '_rollup_old', {})
+    rollup.apply_deltas(rollup.subtract(rollup.person_contribution(instance), old))
+    pricing.recompute_registration(instance.registration_id)
+    if settings.HOUSING_AUTO_ALLOCATE:
+        # Кровати пересчитываем после коммита и только для этой регистрации;
+        # при удалении человека его BedAssignment уходит каскадом
+        transaction.on_commit(partial(housing.reallocate_registration, instance.registration_id))
+
+
+@receiver(post_delete, sender=Adult)
+@receiver(post_delete, sender=Child)
+def person_deleted(sender, instance, origin=None, **kwargs):
+    rollup.apply_deltas(rollup.subtract({}, rollup.person_contribution(instance)))
+    # Если удаляется вся регистрация (или участник), пересчитывать нечего;
+    # origin — экземпляр или QuerySet, из которого вызвали delete()
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model not in (Registration, Participant):
+        pricing.recompute_registration(instance.registration_id)
+
+
+@receiver(post_save, sender=Registration)
+def registration_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    deltas = {'registrations': 1}
+    if Registration.objects.filter(participant_id=instance.participant_id).count() == 1:
+        deltas['emails'] = 1
+    rollup.apply_deltas(deltas)
+
+
+# participant_id → pk его регистраций, удаляемых текущим delete(). Все
+# pre_delete одного delete() приходят раньше всех post_delete, поэтому email
+# вычитается на последней из них; пустые записи сразу удаляются
+_deleting_registrations = ContextVar('deleting_registrations', default=None)
+
+
+def _registrations_being_deleted():
+    pending = _deleting_registrations.get()
+    if pending is None:
+        pending = {}
+        _deleting_registrations.set(pending)
+    return pending
+
+
+@receiver(pre_delete, sender=Registration)
+def registration_deleting(sender, instance, **kwargs):
+    if rollup.is_deferred():
+        return
+    _registrations_being_deleted().setdefault(instance.participant_id, set()).add(instance.pk)
+
+
+@receiver(post_delete, sender=Registration)
+def registration_deleted(sender, instance, **kwargs):
+    if rollup.is_deferred():
+        return
+    deltas = {'registrations': -1}
+    pending = _registrations_being_deleted()
+    pid = instance.participant_id
+    batch = pending.get(pid, set())
+    batch.discard(instance.pk)
+    if not batch:
+        pending.pop(pid, None)
+        if not Registration.objects.filter(participant_id=pid).exists():
+            deltas['emails'] = -1
+    rollup.apply_deltas(deltas)
+
+
+def people_bulk_created(registration, people):
+    """bulk_create не шлёт post_save — то же, что person_saved, но разом на всех."""
+    deltas = Counter()
+    for person in people:
+        deltas.update(rollup.person_contribution(person))
+    rollup.apply_deltas(deltas)
+    pricing.recompute_registration(registration.pk)
+    forget_meal_plan()
+    if settings.HOUSING_AUTO_ALLOCATE:
+        transaction.on_commit(partial(housing.reallocate_registration, registration.pk))
@@ -0,0 +1,148 @@
+# stats.py
+# Агрегаты для админ-дашборда. Всё считается на стороне БД фиксированным
+# числом запросов (aggregate() на Adult и Child, один запрос по Registration
+# с готовыми ценами, один для курортного сбора), независимо от количества людей на конференции.
+
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum
+from django.db.models.lookups import Exact
+
+from .kurtaxe import kurtaxe_report
+from .models import Adult, Child, Registration, SERVICE_BITS
+
+INSTRUMENTS = ['guitar', 'piano']
+
+# Постельное бельё нужно всем, кто живёт не в своём доме
+BED_HOUSING = ['brudershaus', 'sisterhaus', 'no_preference']
+
+NIGHTS = ExpressionWrapper(F('departure_date') - F('arrival_date'), output_field=DurationField())
+HAS_DATES = Q(arrival_date__isnull=False, departure_date__isnull=False)
+ONSITE = Q(participation_type='onsite')
+
+
+def _nights_sum(condition=Q()):
+    return Sum(NIGHTS, filter=HAS_DATES & condition)
+
+
+def _person_aggregates(model):
+    aggregates = {
+        'people': Count('id'),
+        'nights': _nights_sum(),
+    }
+    for code, _label in model.SERVICES_CHOICES:
+        # В агрегате таблица всё равно читается целиком — побитовое И компактнее IN-списка
+        bit = SERVICE_BITS[code]
+        aggregates[f'service_{code}'] = Count('id', filter=Q(Exact(F('services').bitand(bit), bit)))
+    for code, _label in model._meta.get_field('food_preference').choices:
+        aggregates[f'food_{code}'] = Count('id', filter=Q(food_preference=code))
+    for code, _label in model.HOUSING_CHOICES:
+        aggregates[f'housing_{code}'] = Count('id', filter=ONSITE & Q(housing_preference=code))
+    return aggregates
+
+
+def _merge(*rows):
+    totals = {}
+    for row in rows:
+        for key, value in row.items():
+            if key.endswith('nights'):
+                value = value.days if value else 0
+            totals[key] = totals.get(key, 0) + (value or 0)
+    return totals
+
+
+def person_totals():
+    """Один aggregate() на Adult и один на Child, результаты сложены."""
+    adults = Adult.objects.aggregate(**_person_aggregates(Adult))
+    children = Child.objects.aggregate(**_person_aggregates(Child))
+    totals = _merge(adults, children)
+    totals['children'] = children['people']
+    return totals
+
+
+def registration_rows():
+    """Одна строка на регистрацию; люди, ночи и цены уже посчитаны в pricing.py."""
+    return (
+        Registration.objects
+        .values(
+            'id', 'participant_id', 'participant__first_name', 'participant__last_name',
+            'participant__email', 'has_dietary_restrictions', 'dietary_details', 'comment',
+            'people_count', 'nights_total', 'full_price', 'partial_price', 'total_price',
+            'payment_method',
+        )
+        .order_by('created_at', 'id')
+    )
+
+
+def dashboard_context(totals=None):
+    if totals is None:
+        totals = person_totals()
+    rows = list(registration_rows())
+
+    service_labels = dict(Adult.SERVICES_CHOICES)
+    instrument_stats = {service_labels[code]: totals[f'service_{code}'] for code in INSTRUMENTS}
+    service_stats = {
+        label: totals[f'service_{code}']
+        for code, label in Adult.SERVICES_CHOICES if code not in INSTRUMENTS
+    }
+    food_stats = {
+        code: totals[f'food_{code}']
+        for code, _label in Adult._meta.get_field('food_preference').choices
+    }
+
+    kurtaxe = kurtaxe_report()
+    payment_methods = dict(Registration._meta.get_field('payment_method').choices)
+
+    housing_labels = dict(Adult.HOUSING_CHOICES)
+    bed_list = [
+        {'group': housing_labels[code], 'count': totals[f'housing_{code}']}
+        for code in BED_HOUSING
+    ]
+
+    email_list = []
+    payment_list = []
+    special_diets = []
+    important_notes = []
+    emails = set()
+    for row in rows:
+        name = f"{row['participant__first_name']} {row['participant__last_name']}"
+        email = row['participant__email']
+        if email.lower() not in emails:
+            emails.add(email.lower())
+            email_list.append({'group': f"#{row['id']}", 'address': email})
+        payment_list.append({
+            'name': name,
+            'email': email,
+            'people': row['people_count'],
+            'nights': row['nights_total'],
+            'full_price': row['full_price'],
+            'partial_price': row['partial_price'],
+            'total': row['total_price'],
+            'payment_method': payment_methods.get(row['payment_method'], ''),
+            'kurtaxe': kurtaxe['registrations'].get(row['id'], {}).get('total', 0),
+            'note': row['comment'],
+        })
+        if row['has_dietary_restrictions']:
+            special_diets.append({'name': name, 'details': row['dietary_details']})
+        if row['comment']:
+            important_notes.append({'name': name, 'note': row['comment']})
+
+    return {
+        'stats': {
+            'total_participants': len(rows),
+            'total_people': totals['people'],
+            'total_children': totals['children'],
+            'total_nights': totals['nights'],
+            'total_emails': len(emails),
+        },
+        'instrument_stats': instrument_stats,
+        'service_stats': service_stats,
+        'food_stats': food_stats,
+        'special_diets': special_diets,
+        'important_notes': important_notes,
+        'kurtaxe_groups': kurtaxe['groups'],
+        'kurtaxe_total': kurtaxe['total'],
+        'bed_list': bed_list,
+        'bed_total': sum(bed['count'] for bed in bed_list),
+        'email_list': email_list,
+        'total_emails': len(emails),
+        'payment_list': payment_list,
+    }
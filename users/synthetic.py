@@ -0,0 +1,195 @@
+# synthetic.py
+# Синтетические данные конференции для нагрузочных проверок: семьи с
+# правдоподобными датами, проживанием, питанием и служениями. Всё строится в
+# памяти пачками и пишется bulk_create в крупных транзакциях; цены считаются
+# сразу через pricing.compute, итоги дашборда — одним rollup.rebuild()
+# (и после generate, и после clear).
+# Один и тот же seed даёт один и тот же набор данных.
+
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import pricing, rollup
+from .conference import conference_end, conference_start, stay_dates
+from .meals import forget_meal_plan
+from .models import Adult, Child, Participant, Registration, services_to_mask
+
+EMAIL_DOMAIN = 'synthetic.invalid'
+PASSWORD = 'synthetic1'
+
+FIRST_NAMES = {
+    'male': ['Jakob', 'David', 'Samuel', 'Johannes', 'Daniel', 'Andreas', 'Peter', 'Viktor', 'Alexander', 'Elias'],
+    'female': ['Maria', 'Anna', 'Elena', 'Lydia', 'Rebekka', 'Natalia', 'Sara', 'Esther', 'Olga', 'Hanna'],
+}
+LAST_NAMES = [
+    'Wiebe', 'Friesen', 'Neufeld', 'Penner', 'Klassen', 'Dyck', 'Janzen', 'Martens',
+    'Schmidt', 'Becker', 'Hoffmann', 'Wagner', 'Koch', 'Braun', 'Krüger', 'Richter',
+]
+CITIES = [('Schramberg', '78713'), ('Stuttgart', '70173'), ('Freiburg', '79098'), ('Karlsruhe', '76133'), ('Ulm', '89073')]
+DIETS = ['Glutenfrei', 'Laktosefrei', 'Nussallergie', 'Diabetiker']
+ADULT_SERVICES = ['guitar', 'piano', 'kids_small', 'kids_kiga', 'kids_school', 'chairs', 'tech', 'microphones']
+CHILD_SERVICES = ['chairs', 'microphones']
+
+
+def _stay(rng, start, end):
+    """(участие, Vollzeit, приезд, отъезд) для семьи."""
+    if rng.random() < 0.08:
+        return 'online', False, None, None
+    if rng.random() < 0.6:
+        return 'onsite', True, start, end
+    days = (end - start).days
+    arrival = start + timedelta(days=rng.randint(0, days - 1))
+    departure = min(arrival + timedelta(days=rng.randint(1, 6)), end)
+    return 'onsite', False, arrival, departure
+
+
+def _housing(rng, gender, family_size):
+    if family_size > 1 and rng.random() < 0.8:
+        return 'family'
+    return rng.choice([
+        'brudershaus' if gender == 'male' else 'sisterhaus',
+        'no_preference',
+        'family',
+    ])
+
+
+def _person(model, rng, last_name, gender, age, stay, family_size, services):
+    participation_type, is_full_week, arrival, departure = stay
+    if rng.random() < 0.1:
+        # Часть людей приезжает не со всей семьёй
+        participation_type, is_full_week, arrival, departure = _stay(rng, conference_start(), conference_end())
+    fields = dict(
+        first_name=rng.choice(FIRST_NAMES[gender]), last_name=last_name, gender=gender, age=age,
+        housing_preference=_housing(rng, gender, family_size),
+        participation_type=participation_type, is_full_week=is_full_week,
+        arrival_date=arrival, departure_date=departure,
+        is_student=18 <= age <= 27 and rng.random() < 0.5,
+        food_preference='vegetarian' if rng.random() < 0.15 else 'normal',
+        services=services_to_mask(rng.sample(services, rng.choice([0, 0, 1, 2]))) if services else 0,
+    )
+    if model is Adult:
+        fields['comes_with_partner'] = family_size > 1
+    return model(**fields)
+
+
+def build_family(rng, index, seed, password, start, end, created_from):
+    """Participant, Registration и люди одной семьи (ещё не сохранённые)."""
+    last_name = rng.choice(LAST_NAMES)
+    gender = rng.choice(['male', 'female'])
+    city, postal_code = rng.choice(CITIES)
+    participant = Participant(
+        first_name=rng.choice(FIRST_NAMES[gender]), last_name=last_name,
+        email=f'{seed}-{index}@{EMAIL_DOMAIN}', password=password,
+        phone_number=f'+49 7422 {rng.randint(100000, 999999)}', city=city, postal_code=postal_code,
+        street=f'Hauptstraße {rng.randint(1, 200)}', privacy_accepted=True,
+    )
+    has_diet = rng.random() < 0.1
+    registration = Registration(
+        church_contact=rng.choice(['', 'Gemeinde Schramberg', 'Gemeinde Stuttgart']),
+        needs_transport=rng.random() < 0.1,
+        has_dietary_restrictions=has_diet,
+        dietary_details=rng.choice(DIETS) if has_diet else '',
+        payment_method=rng.choice(['transfer', 'transfer', 'cash', '']),
+        created_at=created_from + timedelta(minutes=rng.randint(0, 60 * 24 * 60)),
+    )
+
+    adults_count = rng.choice([1, 2, 2, 2])
+    children_count = rng.choice([0, 0, 1, 2, 3, 4]) if adults_count == 2 else rng.choice([0, 0, 1])
+    family_size = adults_count + children_count
+    stay = _stay(rng, start, end)
+    adults = [
+        _person(Adult, rng, last_name, gender if i == 0 else ('female' if gender == 'male' else 'male'),
+                rng.randint(18, 75), stay, family_size, ADULT_SERVICES)
+        for i in range(adults_count)
+    ]
+    children = [
+        _person(Child, rng, last_name, rng.choice(['male', 'female']), rng.randint(0, 17),
+                stay, family_size, CHILD_SERVICES if rng.random() < 0.2 else None)
+        for _ in range(children_count)
+    ]
+    return participant, registration, adults, children
+
+
+def _price_group(index, person, is_child):
+    dates = stay_dates(person.participation_type, person.is_full_week, person.arrival_date, person.departure_date)
+    return {
+        'registration_id': index, 'is_child': is_child, 'age': person.age, 'is_student': person.is_student,
+        'is_full_week': person.is_full_week, 'participation_type': person.participation_type,
+        'stay_from': dates and dates[0], 'stay_to': dates and dates[1], 'n': 1,
+    }
+
+
+def generate(people, seed=0, batch_size=5000):
+    """Создать семьи общим числом не меньше people человек. Возвращает счётчики."""
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)  # один хэш на всех
+    start, end = conference_start(), conference_end()
+    created_from = timezone.make_aware(datetime.combine(start - timedelta(days=90), time.min))
+    prices = pricing.PriceList.from_settings()
+    counts = {'participants': 0, 'registrations': 0, 'adults': 0, 'children': 0}
+
+    index = 0
+    while counts['adults'] + counts['children'] < people:
+        families = []
+        batch_people = 0
+        while batch_people < batch_size and counts['adults'] + counts['children'] + batch_people < people:
+            family = build_family(rng, index, seed, password, start, end, created_from)
+            families.append(family)
+            batch_people += len(family[2]) + len(family[3])
+            index += 1
+
+        groups = [
+            _price_group(i, person, is_child)
+            for i, (_participant, _reg, adults, children) in enumerate(families)
+            for people_list, is_child in ((adults, False), (children, True))
+            for person in people_list
+        ]
+        computed = pricing.compute(groups, prices)
+
+        with transaction.atomic():
+            participants = Participant.objects.bulk_create([family[0] for family in families], batch_size=batch_size)
+            registrations = []
+            for i, (participant, registration, _adults, _children) in enumerate(families):
+                registration.participant = participant
+                for field, value in computed.get(i, pricing.EMPTY).items():
+                    setattr(registration, field, value)
+                registrations.append(registration)
+            Registration.objects.bulk_create(registrations, batch_size=batch_size)
+            adults, children = [], []
+            for _participant, registration, family_adults, family_children in families:
+                for person in [*family_adults, *family_children]:
+                    person.registration = registration
+                adults += family_adults
+                children += family_children
+            Adult.objects.bulk_create(adults, batch_size=batch_size)
+            Child.objects.bulk_create(children, batch_size=batch_size)
+
+        counts['participants'] += len(participants)
+        counts['registrations'] += len(registrations)
+        counts['adults'] += len(adults)
+        counts['children'] += len(children)
+
+    with transaction.atomic():
+        rollup.rebuild()
+    forget_meal_plan()
+    return counts
+
+
+def clear(batch_size=1000):
+    """Удалить ранее сгенерированные данные (по домену email); возвращает число участников."""
+    participants = Participant.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').order_by('pk')
+    deleted = 0
+    # Обычный delete(): каскад и сигналы (кэши) — как при удалении через
+    # админку, пачками, чтобы не держать одну огромную транзакцию. Дельты
+    # дашборда по каждой строке не нужны: итоги пересчитываются один раз в конце.
+    with rollup.deferred():
+        while batch := list(participants.values_list('pk', flat=True)[:batch_size]):
+            with transaction.atomic():
+                _total, by_model = Participant.objects.filter(pk__in=batch).delete()
+            deleted += by_model.get(Participant._meta.label, 0)
+    forget_meal_plan()
+    return deleted
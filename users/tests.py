@@ -1,3 +1,1574 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+from smtplib import SMTPException
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DatabaseError, connection
+from django.db.utils import ConnectionHandler
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.mail.backends import locmem
+from django.db.migrations.executor import MigrationExecutor
+from django.conf import settings
+from django.forms.models import model_to_dict
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from .models import (
+    Participant, Registration, Adult, Child, DashboardCounter, OutboxEmail, Mailing,
+    Room, BedAssignment, email_matches, has_service, services_to_mask,
+)
+from . import async_views, views
+from . import export
+from .export import export_rows
+from .drafts import DRAFT_SESSION_KEY
+from .forms import AdultForm, ChildForm
+from .kurtaxe import Tariff, compute_arrays, kurtaxe_report
+from .hashing import acheck_password
+from . import housing, occupancy
+from .mailing import segment_emails, send_mailing
+from .routers import ReportingRouter, reporting
+from .meals import meal_plan
+from . import pricing, ratelimit, synthetic
+from .outbox import drain, enqueue_mail
+from .stats import dashboard_context
+from .utils import generate_password_reset_token
+from . import rollup
+
+
+def make_participant(email='anna@example.com', password=None, **kwargs):
+    participant = Participant(
+        first_name=kwargs.pop('first_name', 'Anna'),
+        last_name=kwargs.pop('last_name', 'Schmidt'),
+        email=email,
+        **kwargs,
+    )
+    # Хэширование PBKDF2 дорогое — в тестах только там, где нужен логин
+    if password:
+        participant.set_password(password)
+    participant.save()
+    return participant
+
+
+def make_family(participant, adults=2, children=1, services_per_person=False, **registration_fields):
+    reg = Registration.objects.create(participant=participant, **registration_fields)
+    for i in range(adults):
+        Adult.objects.create(
+            registration=reg, first_name=f'Erw{i}', last_name='Test',
+            gender='male' if i % 2 == 0 else 'female',
+            age=40, housing_preference='brudershaus' if i % 2 == 0 else 'sisterhaus',
+            arrival_date=date(2025, 8, 1), departure_date=date(2025, 8, 4),
+            services=services_to_mask(['guitar', 'tech'] if i == 0 else ['piano']),
+            food_preference='vegetarian' if i == 0 else 'normal',
+        )
+    for i in range(children):
+        Child.objects.create(
+            registration=reg, first_name=f'Kind{i}', last_name='Test', age=6,
+            services=services_to_mask(['kids_small'] if services_per_person else []),
+            arrival_date=date(2025, 8, 1), departure_date=date(2025, 8, 3),
+        )
+    return reg
+
+
+def draft_data(person, form_class):
+    """Человек в том виде, в каком его хранит черновик мастера в сессии."""
+    return {
+        name: value.isoformat() if isinstance(value, date) else value
+        for name, value in model_to_dict(person, fields=form_class.base_fields).items()
+    }
+
+
+class DashboardStatsTests(TestCase):
+    def test_totals(self):
+        participant = make_participant()
+        make_family(participant, has_dietary_restrictions=True, dietary_details='Nüsse', comment='Kommen später')
+        make_family(make_participant('boris@example.com'), adults=1, children=0)
+
+        context = dashboard_context()
+
+        self.assertEqual(context['stats'], {
+            'total_participants': 2,
+            'total_people': 4,
+            'total_children': 1,
+            'total_nights': 3 + 3 + 2 + 3,
+            'total_emails': 2,
+        })
+        self.assertEqual(context['instrument_stats'], {'Gitarre': 2, 'Klavier': 1})
+        self.assertEqual(context['service_stats']['Technik'], 2)
+        self.assertEqual(context['food_stats'], {'normal': 2, 'vegetarian': 2})
+        self.assertEqual(context['bed_total'], 3)
+        self.assertEqual(context['special_diets'], [{'name': 'Anna Schmidt', 'details': 'Nüsse'}])
+        self.assertEqual(context['payment_list'][0]['people'], 3)
+        self.assertEqual(context['payment_list'][0]['nights'], 8)
+
+    def test_query_count_does_not_grow(self):
+        for i in range(20):
+            make_family(make_participant(f'p{i}@example.com'))
+        with self.assertNumQueries(4):
+            dashboard_context()
+        # С готовыми итогами остаются список регистраций и курортный сбор
+        rollup.rebuild()
+        totals = rollup.totals()
+        with self.assertNumQueries(2):
+            dashboard_context(totals)
+
+    def test_dashboard_requires_staff(self):
+        url = reverse('admin_dashboard')
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Admin-Bereich')
+
+
+class DashboardRollupTests(TestCase):
+    def setUp(self):
+        rollup.rebuild()
+
+    def assertNoDrift(self):
+        self.assertEqual(rollup.drift(), {})
+
+    def test_deltas_follow_changes(self):
+        anna = make_participant()
+        reg = make_family(anna)
+        make_family(anna, adults=1, children=0)
+        boris = make_participant('boris@example.com')
+        make_family(boris)
+        self.assertNoDrift()
+        self.assertEqual(rollup.totals()['emails'], 2)
+
+        adult = reg.adults.first()
+        adult.services = services_to_mask(['microphones'])
+        adult.participation_type = 'online'
+        adult.departure_date = date(2025, 8, 9)
+        adult.save()
+        self.assertNoDrift()
+
+        reg.children.first().delete()
+        reg.delete()
+        self.assertNoDrift()
+
+        anna.delete()
+        boris.registrations.all().delete()
+        self.assertNoDrift()
+        self.assertEqual(rollup.totals()['emails'], 0)
+        self.assertEqual(rollup.totals()['people'], 0)
+
+    def test_save_is_constant_number_of_queries(self):
+        reg = make_family(make_participant())
+        adult = reg.adults.first()
+        adult.food_preference = 'normal'
+        # pre_save SELECT + UPDATE строки + UPDATE счётчиков + SELECT/UPDATE цены регистрации
+        with self.assertNumQueries(5):
+            adult.save()
+
+    def test_missing_counter_starts_from_zero(self):
+        # Новый ключ (например, добавили служение): строки ещё нет
+        DashboardCounter.objects.filter(key='service_guitar').delete()
+        with self.assertNumQueries(0):
+            rollup.apply_deltas({'service_guitar': 0})
+        make_family(make_participant())
+        self.assertNoDrift()
+        self.assertEqual(rollup.totals()['service_guitar'], 1)
+
+    def test_command_reports_and_fixes_drift(self):
+        make_family(make_participant())
+        DashboardCounter.objects.filter(key='people').update(value=999)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_dashboard_rollup', '--check', stdout=StringIO())
+        call_command('rebuild_dashboard_rollup', stdout=StringIO())
+        self.assertNoDrift()
+
+
+class QueryBudgetTests(TestCase):
+    """Число SQL-запросов каждой страницы не должно зависеть от числа регистраций."""
+
+    # Сессия + участник + данные страницы; при росте — ищите N+1
+    BUDGETS = {
+        'participant_profile': 5,
+        'registration_start': 5,
+        'registration_add_adult': 3,
+        'registration_add_child': 3,
+        'registration_draft_adult': 3,
+        'registration_overview': 5,
+        'registration_edit': 5,
+        'registration_delete': 3,
+        'edit_adult': 3,
+        'edit_child': 3,
+        'admin_dashboard': 7,
+    }
+
+    # Страницы без входа: login, регистрация и сброс пароля
+    ANONYMOUS_BUDGETS = {
+        'participant_login': 0,
+        'participant_register': 0,
+        'participant_password_reset_request': 0,
+        'participant_password_reset_confirm': 1,
+    }
+
+    def login(self, participant, reg):
+        # Мастер держит черновик в сессии (drafts.py) — кладём туда людей регистрации
+        session = self.client.session
+        session['participant_id'] = participant.id
+        session[DRAFT_SESSION_KEY] = {
+            'registration': {'comment': reg.comment, 'payment_method': reg.payment_method},
+            'adults': [draft_data(adult, AdultForm) for adult in reg.adults.all()],
+            'children': [draft_data(child, ChildForm) for child in reg.children.all()],
+        }
+        session.save()
+
+    def urls(self, reg):
+        return {
+            'participant_profile': reverse('participant_profile'),
+            'registration_start': reverse('registration_start'),
+            'registration_add_adult': reverse('registration_add_adult'),
+            'registration_add_child': reverse('registration_add_child'),
+            'registration_draft_adult': reverse('registration_draft_adult', args=[0]),
+            'registration_overview': reverse('registration_overview'),
+            'registration_edit': reverse('registration_edit', args=[reg.id]),
+            'registration_delete': reverse('registration_delete', args=[reg.id]),
+            'edit_adult': reverse('edit_adult', args=[reg.adults.first().id]),
+            'edit_child': reverse('edit_child', args=[reg.children.first().id]),
+            'admin_dashboard': reverse('admin_dashboard'),
+        }
+
+    def assertWithinBudget(self, name, url, budget=None, method='get', data=None, status=200):
+        budget = self.BUDGETS[name] if budget is None else budget
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data or {})
+        self.assertEqual(response.status_code, status, name)
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{name}: {len(queries)} queries\n" + "\n".join(q['sql'] for q in queries),
+        )
+
+    def test_profile_lists_service_labels(self):
+        participant = make_participant()
+        reg = make_family(participant)
+        self.login(participant, reg)
+        response = self.client.get(reverse('participant_profile'))
+        self.assertContains(response, 'Gitarre, Technik')
+
+    def test_draft_is_read_by_the_wizard(self):
+        participant = make_participant()
+        reg = make_family(participant)
+        self.login(participant, reg)
+        response = self.client.get(reverse('registration_overview'))
+        for person in [*reg.adults.all(), *reg.children.all()]:
+            self.assertContains(response, person.first_name)
+
+    def test_views_stay_within_budget(self):
+        rollup.rebuild()
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        participant = make_participant()
+        created = 0
+        for count in (1, 10, 100):
+            while created < count:
+                reg = make_family(participant, services_per_person=True)
+                created += 1
+            self.client.login(username='admin', password='pw')
+            self.login(participant, reg)
+            for name, url in self.urls(reg).items():
+                with self.subTest(view=name, registrations=count):
+                    self.assertWithinBudget(name, url)
+
+    def test_anonymous_views_stay_within_budget(self):
+        participant = make_participant()
+        for count in (1, 100):
+            while Registration.objects.count() < count:
+                make_family(participant)
+            urls = {
+                'participant_login': reverse('participant_login'),
+                'participant_register': reverse('participant_register'),
+                'participant_password_reset_request': reverse('participant_password_reset_request'),
+                'participant_password_reset_confirm': reverse(
+                    'participant_password_reset_confirm', args=[generate_password_reset_token(participant.email)],
+                ),
+            }
+            for name, url in urls.items():
+                with self.subTest(view=name, registrations=count):
+                    self.assertWithinBudget(name, url, self.ANONYMOUS_BUDGETS[name])
+
+    @override_settings(RATE_LIMIT_ENABLED=False)
+    def test_auth_posts_stay_within_budget(self):
+        participant = make_participant(password='geheim123')
+        make_family(participant)
+        # Поиск участника + новая сессия (проверка ключа, SAVEPOINT, INSERT, RELEASE)
+        self.assertWithinBudget(
+            'participant_login', reverse('participant_login'), 5, 'post',
+            {'email': participant.email, 'password': 'geheim123'}, status=302,
+        )
+        self.client.logout()
+        # Поиск участника + письмо в outbox
+        self.assertWithinBudget(
+            'participant_password_reset_request', reverse('participant_password_reset_request'), 2, 'post',
+            {'email': participant.email}, status=302,
+        )
+        # Проверка email + INSERT участника + новая сессия
+        self.assertWithinBudget(
+            'participant_register', reverse('participant_register'), 6, 'post',
+            {'first_name': 'Boris', 'last_name': 'Braun', 'email': 'boris@example.com',
+             'password': 'geheim123', 'privacy_accepted': 'on'}, status=302,
+        )
+
+
+class ParticipantMiddlewareTests(TestCase):
+    def setUp(self):
+        self.participant = make_participant()
+        session = self.client.session
+        session['participant_id'] = self.participant.id
+        session.save()
+
+    def participant_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [q for q in queries if 'FROM "users_participant"' in q['sql']]
+
+    def test_participant_loaded_once_per_request(self):
+        # Профиль использует участника и во view, и в base.html
+        self.assertEqual(len(self.participant_queries(reverse('participant_profile'))), 1)
+
+    def test_anonymous_request_does_not_query_participant(self):
+        self.client.logout()
+        self.assertEqual(self.participant_queries(reverse('participant_login')), [])
+
+    @override_settings(PARTICIPANT_CACHE_TIMEOUT=30)
+    def test_cache_is_invalidated_on_save(self):
+        cache.clear()
+        self.assertEqual(len(self.participant_queries(reverse('participant_profile'))), 1)
+        self.assertEqual(self.participant_queries(reverse('participant_profile')), [])
+
+        self.participant.first_name = 'Hanna'
+        self.participant.save()
+        response = self.client.get(reverse('participant_profile'))
+        self.assertContains(response, 'Willkommen Hanna')
+
+    def test_nav_fragment_is_cached_per_participant(self):
+        cache.clear()
+        self.assertEqual(len(self.participant_queries(reverse('home'))), 1)
+        # Страница сама участника не читает — строку в шапке берём из кэша фрагмента
+        self.assertEqual(self.participant_queries(reverse('home')), [])
+        self.assertContains(self.client.get(reverse('home')), 'Sie sind eingeloggt als: <b>Anna Schmidt</b>')
+
+        self.participant.first_name = 'Hanna'
+        self.participant.save()
+        self.assertContains(self.client.get(reverse('home')), '<b>Hanna Schmidt</b>')
+
+
+class ServicesBitmaskTests(TestCase):
+    def test_form_round_trip(self):
+        form = AdultForm(data={
+            'first_name': 'Erik', 'last_name': 'Test', 'gender': 'male',
+            'participation_type': 'onsite', 'food_preference': 'normal',
+            'housing_preference': 'family', 'services': ['piano', 'tech'],
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        adult = form.save(commit=False)
+        adult.registration = make_family(make_participant(), adults=0, children=0)
+        adult.save()
+        adult.refresh_from_db()
+        self.assertEqual(adult.services_list, ['piano', 'tech'])
+        self.assertEqual(AdultForm(instance=adult).fields['services'].initial, ['piano', 'tech'])
+
+    def test_service_filter_is_one_indexed_query(self):
+        make_family(make_participant())
+        tuesday = Adult.objects.filter(has_service('guitar'), arrival_date=date(2025, 8, 1))
+        with self.assertNumQueries(1):
+            self.assertEqual(tuesday.count(), 1)
+        sql, params = Adult.objects.filter(has_service('piano')).only('id').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('users_adult_services', plan)
+
+
+class ServicesMigrationTests(TransactionTestCase):
+    migrate_from = [('users', '0002_dashboardcounter')]
+    migrate_to = [('users', '0003_services_bitmask')]
+
+    def test_strings_become_masks(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        old_apps = executor.loader.project_state(self.migrate_from).apps
+        participant = old_apps.get_model('users', 'Participant').objects.create(email='old@example.com')
+        reg = old_apps.get_model('users', 'Registration').objects.create(participant=participant)
+        old_apps.get_model('users', 'Adult').objects.create(registration=reg, services='guitar,microphones')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        executor.loader.build_graph()
+        new_apps = executor.loader.project_state(self.migrate_to).apps
+        adult = new_apps.get_model('users', 'Adult').objects.get()
+        self.assertEqual(adult.services, services_to_mask(['guitar', 'microphones']))
+
+        # Остальные тесты ожидают схему последней миграции
+        call_command('migrate', verbosity=0)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.anna = make_participant()
+        make_family(self.anna)
+        boris = make_participant('boris@example.com', first_name='Boris')
+        reg = make_family(boris, adults=1, children=0)
+        reg.adults.update(participation_type='online', arrival_date=date(2025, 8, 5))
+        make_participant('carl@example.com')
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_registrations', *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_has_one_row_per_person(self):
+        rows = list(csv.DictReader(StringIO(self.export())))
+        self.assertEqual(len(rows), 3 + 1 + 1)
+        self.assertEqual(rows[0]['email'], 'anna@example.com')
+        self.assertEqual(rows[0]['services'], 'guitar,tech')
+        self.assertEqual(rows[-1]['email'], 'carl@example.com')
+        self.assertEqual(rows[-1]['registration_id'], '')
+
+    def test_jsonl_filters(self):
+        lines = self.export('--format', 'jsonl', '--participation-type', 'online').splitlines()
+        self.assertEqual([json.loads(line)['participant_first_name'] for line in lines], ['Boris'])
+        lines = self.export('--format', 'jsonl', '--arrival-to', '2025-08-02', '--housing', 'sisterhaus').splitlines()
+        self.assertEqual([json.loads(line)['first_name'] for line in lines], ['Erw1'])
+
+    def test_queries_per_chunk_are_constant(self):
+        for i in range(30):
+            make_family(make_participant(f'p{i}@example.com'))
+        # Один курсор по участникам + на каждый кусок: регистрации, взрослые, дети
+        with self.assertNumQueries(1 + 3 * 4):
+            rows = list(export_rows(chunk_size=10))
+        self.assertEqual(len(rows), 30 * 3 + 3 + 1 + 1)
+
+    def test_streaming_view(self):
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('registrations_export'), {'format': 'jsonl'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 5)
+        self.assertEqual(
+            self.client.get(reverse('registrations_export'), {'arrival_from': 'gestern'}).status_code, 400,
+        )
+
+    @override_settings(ROOT_URLCONF='schramberg.async_urls')
+    async def test_streaming_view_under_asgi(self):
+        # Синхронный генератор ASGI-обработчик доел бы целиком до первого байта
+        await self.async_client.aforce_login(
+            await sync_to_async(User.objects.create_user)('admin', password='pw', is_staff=True)
+        )
+        produced = []
+
+        def counted_rows(**filters):
+            for row in export_rows(**filters):
+                produced.append(row)
+                yield row
+
+        with mock.patch.object(export, 'ASYNC_BATCH_ROWS', 2), mock.patch.object(views, 'export_rows', counted_rows):
+            response = await self.async_client.get(reverse('registrations_export'), {'format': 'jsonl'})
+            self.assertTrue(response.is_async)
+            content = aiter(response.streaming_content)
+            first = await anext(content)
+            self.assertEqual((len(first.splitlines()), len(produced)), (2, 2))
+            rest = [chunk async for chunk in content]
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(len((first + b''.join(rest)).splitlines()), 5)
+
+
+@override_settings(
+    ROOT_URLCONF='schramberg.async_urls',
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class AsyncPasswordViewsTests(TestCase):
+    async def test_login(self):
+        participant = await sync_to_async(make_participant)(password='geheim123')
+        response = await self.async_client.post(
+            reverse('participant_login'), {'email': 'ANNA@example.com', 'password': 'falsch123'},
+        )
+        self.assertContains(response, 'Falsches Passwort')
+
+        response = await self.async_client.post(
+            reverse('participant_login'), {'email': 'ANNA@example.com', 'password': 'geheim123'},
+        )
+        self.assertRedirects(response, reverse('participant_profile'), fetch_redirect_response=False)
+        session = await self.async_client.asession()
+        self.assertEqual(await session.aget('participant_id'), participant.id)
+
+    async def test_register_hashes_password(self):
+        response = await self.async_client.post(reverse('participant_register'), {
+            'first_name': 'Neu', 'last_name': 'Person', 'email': 'neu@example.com',
+            'password': 'passwort1', 'privacy_accepted': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+        participant = await Participant.objects.aget(email='neu@example.com')
+        self.assertTrue(await sync_to_async(participant.check_password)('passwort1'))
+
+    async def test_password_reset_confirm(self):
+        await sync_to_async(make_participant)(password='geheim123')
+        url = reverse('participant_password_reset_confirm', args=[generate_password_reset_token('anna@example.com')])
+        response = await self.async_client.post(url, {'new_password1': 'neu12345', 'new_password2': 'neu12345'})
+        self.assertRedirects(response, reverse('participant_login'), fetch_redirect_response=False)
+        participant = await Participant.objects.aget(email='anna@example.com')
+        self.assertTrue(await sync_to_async(participant.check_password)('neu12345'))
+
+    def test_asgi_urlconf_routes_to_async_views(self):
+        self.assertIs(resolve(reverse('participant_login')).func, async_views.participant_login)
+        self.assertIs(resolve(reverse('participant_profile')).func, async_views.participant_profile)
+        # Редкие страницы (редактирование, удаление) остаются синхронными
+        self.assertIs(resolve(reverse('registration_edit', args=[1])).func, views.registration_edit)
+
+    async def test_hashing_runs_in_pool(self):
+        threads = []
+
+        def fake_check(raw_password, encoded):
+            threads.append(threading.current_thread().name)
+            return True
+
+        with mock.patch('users.hashing.check_password', fake_check):
+            self.assertTrue(await acheck_password('x', 'y'))
+        self.assertTrue(threads[0].startswith('password-hashing'))
+
+
+@override_settings(ROOT_URLCONF='schramberg.async_urls')
+class AsyncParticipantViewsTests(TestCase):
+    async def login(self):
+        participant = await sync_to_async(make_participant)()
+        session = await self.async_client.asession()
+        await session.aset('participant_id', participant.id)
+        await session.asave()
+        self.async_client.cookies['sessionid'] = session.session_key
+        return participant
+
+    async def test_profile(self):
+        participant = await self.login()
+        await sync_to_async(make_family)(participant, services_per_person=True)
+        response = await self.async_client.get(reverse('participant_profile'))
+        self.assertContains(response, 'Erw0 Test')
+        self.assertContains(response, 'Kind0')
+
+    async def test_wizard_commits_once(self):
+        await self.login()
+        person = {
+            'first_name': 'Max', 'last_name': 'Schmidt', 'gender': 'male', 'housing_preference': 'family',
+            'participation_type': 'onsite', 'food_preference': 'normal', 'age': '40',
+            'arrival_date': '2025-08-01', 'departure_date': '2025-08-03',
+        }
+        self.assertEqual((await self.async_client.get(reverse('registration_start'))).status_code, 200)
+        await self.async_client.post(reverse('registration_add_adult'), person)
+        await self.async_client.post(reverse('registration_add_child'), {**person, 'first_name': 'Mia', 'age': '6'})
+        await self.async_client.post(reverse('registration_add_child'), {**person, 'first_name': 'Lea', 'age': '4'})
+        remove = reverse('registration_draft_remove', args=['child', 1])
+        self.assertEqual((await self.async_client.get(remove)).status_code, 405)
+        await self.async_client.post(remove)
+        await self.async_client.post(reverse('registration_draft_adult', args=[0]), {**person, 'first_name': 'Moritz'})
+        self.assertFalse(await Registration.objects.aexists())
+        response = await self.async_client.get(reverse('registration_overview'))
+        self.assertContains(response, 'Moritz')
+        response = await self.async_client.post(reverse('registration_overview'), {'comment': 'async'})
+        self.assertRedirects(response, reverse('participant_profile'), fetch_redirect_response=False)
+        reg = await Registration.objects.aget()
+        self.assertEqual((reg.comment, reg.people_count), ('async', 2))
+        self.assertEqual([a.first_name async for a in reg.adults.all()], ['Moritz'])
+
+    async def test_password_reset_request_enqueues(self):
+        await sync_to_async(make_participant)()
+        response = await self.async_client.post(
+            reverse('participant_password_reset_request'), {'email': 'anna@example.com'},
+        )
+        self.assertRedirects(response, reverse('participant_password_reset_done'), fetch_redirect_response=False)
+        item = await OutboxEmail.objects.aget()
+        self.assertEqual(item.recipients, ['anna@example.com'])
+
+
+class CountingEmailBackend(locmem.EmailBackend):
+    """locmem-бэкенд, который считает открытия соединения."""
+    opened = 0
+    fail_for = set()
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.fail_for:
+                raise SMTPException('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='users.tests.CountingEmailBackend', OUTBOX_MAX_ATTEMPTS=3)
+class OutboxTests(TestCase):
+    def setUp(self):
+        CountingEmailBackend.opened = 0
+        CountingEmailBackend.fail_for = set()
+
+    def test_reset_request_only_enqueues(self):
+        make_participant()
+        response = self.client.post(reverse('participant_password_reset_request'), {'email': 'anna@example.com'})
+        self.assertRedirects(response, reverse('participant_password_reset_done'))
+        self.assertEqual(len(mail.outbox), 0)
+        item = OutboxEmail.objects.get()
+        self.assertEqual(item.recipients, ['anna@example.com'])
+        self.assertIn('/participant-password-reset-confirm/', item.body)
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutboxEmail.objects.get().status, 'sent')
+
+    def test_batches_reuse_one_connection(self):
+        for i in range(25):
+            enqueue_mail('Hallo', 'Text', [f'p{i}@example.com'])
+        sent, failed = drain(batch_size=10)
+        self.assertEqual((sent, failed), (25, 0))
+        self.assertEqual(len(mail.outbox), 25)
+        self.assertEqual(CountingEmailBackend.opened, 3)
+
+    def test_failures_are_retried_with_backoff(self):
+        CountingEmailBackend.fail_for = {'kaputt@example.com'}
+        item = enqueue_mail('Hallo', 'Text', ['kaputt@example.com'])
+        enqueue_mail('Hallo', 'Text', ['ok@example.com'])
+
+        self.assertEqual(drain(), (1, 1))
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), ('pending', 1))
+        self.assertGreater(item.next_attempt_at, timezone.now())
+        self.assertIn('mailbox unavailable', item.last_error)
+
+        # Пока не пришло время — не трогаем
+        self.assertEqual(drain(), (0, 0))
+        for _ in range(2):
+            OutboxEmail.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+            drain()
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.attempts), ('failed', 3))
+
+
+@override_settings(EMAIL_BACKEND='users.tests.CountingEmailBackend', MAILING_BATCH_PAUSE=0)
+class MailingTests(TestCase):
+    def setUp(self):
+        CountingEmailBackend.opened = 0
+        CountingEmailBackend.fail_for = set()
+        make_family(make_participant('Anna@Example.com'), needs_transport=True)
+        online = make_family(make_participant('boris@example.com'), adults=1, children=0)
+        online.adults.update(participation_type='online', services=services_to_mask(['piano']))
+        make_participant('ohne@example.com')  # без регистрации — не адресат
+
+    def test_segments(self):
+        self.assertEqual(list(segment_emails('all')), ['anna@example.com', 'boris@example.com'])
+        self.assertEqual(list(segment_emails('onsite')), ['anna@example.com'])
+        self.assertEqual(list(segment_emails('needs_transport')), ['anna@example.com'])
+        self.assertEqual(list(segment_emails('service:piano')), ['anna@example.com', 'boris@example.com'])
+        self.assertEqual(list(segment_emails('service:chairs')), [])
+
+    def test_duplicate_registrations_get_one_mail(self):
+        make_family(Participant.objects.get(email='Anna@Example.com'))
+        mailing = Mailing.objects.create(subject='Info', body='Hallo {{ mailing.subject }}', segment='all')
+        self.assertEqual(send_mailing(mailing), (2, 0))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['anna@example.com', 'boris@example.com'])
+        self.assertEqual(mail.outbox[0].body, 'Hallo Info')
+
+    def test_batches_render_once_and_throttle(self):
+        for i in range(7):
+            make_family(make_participant(f'p{i}@example.com'), adults=1, children=0)
+        mailing = Mailing.objects.create(subject='Info', body='Text', segment='all')
+        with mock.patch('users.mailing.Template.render', return_value='Text') as render, \
+                mock.patch('users.mailing.time.sleep') as sleep:
+            self.assertEqual(send_mailing(mailing, batch_size=3, pause=2), (9, 0))
+        render.assert_called_once()
+        self.assertEqual(CountingEmailBackend.opened, 3)
+        self.assertEqual(sleep.call_args_list, [mock.call(2)] * 3)
+        mailing.refresh_from_db()
+        self.assertEqual(mailing.status, 'done')
+
+    def test_interrupted_run_resumes(self):
+        mailing = Mailing.objects.create(subject='Info', body='Text', segment='all')
+        with mock.patch.object(CountingEmailBackend, 'send_messages', side_effect=[1, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                send_mailing(mailing, batch_size=1)
+        self.assertEqual(mailing.recipients.filter(status='sent').count(), 1)
+
+        call_command('send_mailing', str(mailing.id), stdout=StringIO())
+        self.assertEqual(mailing.recipients.filter(status='sent').count(), 2)
+        self.assertEqual(len(mail.outbox), 1)  # первое письмо ушло через mock
+
+
+class HousingTests(TestCase):
+    def stay(self, person_id, reg_id, arrival, departure, house='brudershaus'):
+        return housing.Stay('adult', person_id, reg_id, house, date(2025, 8, arrival), date(2025, 8, departure))
+
+    def test_beds_reused_between_stays(self):
+        stays = [self.stay(1, 1, 1, 3), self.stay(2, 2, 3, 5), self.stay(3, 3, 2, 4)]
+        placements, unassigned = housing.allocate(stays, [(10, 'brudershaus', 1)])
+        self.assertEqual([(p.stay.person_id, p.bed) for p in placements], [(1, 1), (2, 1)])
+        self.assertEqual([stay.person_id for stay in unassigned], [3])
+
+    def test_family_kept_in_one_room(self):
+        stays = [self.stay(1, 1, 1, 4), self.stay(2, 2, 1, 4), self.stay(3, 2, 1, 4)]
+        rooms = [(10, 'brudershaus', 2), (11, 'brudershaus', 2), (12, 'sisterhaus', 5)]
+        placements, unassigned = housing.allocate(stays, rooms)
+        rooms_by_person = {p.stay.person_id: p.room_id for p in placements}
+        self.assertEqual(rooms_by_person, {1: 10, 2: 11, 3: 11})
+        self.assertEqual(unassigned, [])
+
+    def test_gender_decides_house(self):
+        Room.objects.create(house='brudershaus', name='B1', beds=2)
+        Room.objects.create(house='sisterhaus', name='S1', beds=2)
+        reg = make_family(make_participant(), adults=2, children=1)
+        reg.adults.update(housing_preference='no_preference')
+        placements, unassigned = housing.allocate_all()
+        self.assertEqual(unassigned, [])
+        houses = dict(BedAssignment.objects.values_list('adult__gender', 'room__house'))
+        self.assertEqual(houses, {'male': 'brudershaus', 'female': 'sisterhaus'})
+        # ребёнок с семьёй кровать не занимает
+        self.assertFalse(BedAssignment.objects.filter(child__isnull=False).exists())
+
+    def test_incremental_reallocation(self):
+        Room.objects.create(house='brudershaus', name='B1', beds=1)
+        Room.objects.create(house='sisterhaus', name='S1', beds=1)
+        first = make_family(make_participant(), adults=2, children=0)
+        second = make_family(make_participant('boris@example.com'), adults=1, children=0)
+        housing.allocate_all()
+        kept = set(BedAssignment.objects.filter(registration=first).values_list('id', flat=True))
+        self.assertFalse(BedAssignment.objects.filter(registration=second).exists())
+
+        adult = second.adults.get()
+        adult.arrival_date = date(2025, 8, 4)
+        adult.departure_date = date(2025, 8, 6)
+        with self.captureOnCommitCallbacks(execute=True):
+            adult.save()
+        self.assertEqual(
+            set(BedAssignment.objects.filter(registration=first).values_list('id', flat=True)), kept,
+        )
+        assignment = BedAssignment.objects.get(registration=second)
+        self.assertEqual((assignment.adult, assignment.bed), (adult, 1))
+
+    def test_thousands_of_people_under_a_second(self):
+        rooms = [(i, 'brudershaus' if i % 2 else 'sisterhaus', 6) for i in range(60)]
+        stays = [
+            housing.Stay(
+                'adult', i, i // 3, 'brudershaus' if i % 2 else 'sisterhaus',
+                date(2025, 8, 1 + i % 4), date(2025, 8, 3 + i % 5),
+            )
+            for i in range(5000)
+        ]
+        started = time.perf_counter()
+        placements, unassigned = housing.allocate(stays, rooms)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(len(placements) + len(unassigned), 5000)
+        beds = {}
+        for p in placements:
+            for start, end in beds.get((p.room_id, p.bed), []):
+                self.assertTrue(p.stay.departure <= start or end <= p.stay.arrival)
+            beds.setdefault((p.room_id, p.bed), []).append((p.stay.arrival, p.stay.departure))
+
+
+class OccupancyTests(TestCase):
+    def test_difference_array_matches_day_by_day_count(self):
+        groups = [
+            {'stay_from': date(2025, 8, 1), 'stay_to': date(2025, 8, 3), 'gender': 'male',
+             'age_band': '18+', 'housing_preference': 'family', 'n': 2},
+            {'stay_from': date(2025, 8, 2), 'stay_to': date(2025, 8, 2), 'gender': 'female',
+             'age_band': '6-11', 'housing_preference': '', 'n': 1},
+        ]
+        data = occupancy.build_timeline(groups, date(2025, 8, 1), date(2025, 8, 4))
+        self.assertEqual(data['days'], ['2025-08-01', '2025-08-02', '2025-08-03', '2025-08-04'])
+        self.assertEqual(data['present'], [2, 3, 2, 0])
+        self.assertEqual(data['overnight'], [2, 2, 0, 0])
+        self.assertEqual(data['gender'], {'female': [0, 1, 0, 0], 'male': [2, 2, 2, 0]})
+        self.assertEqual(data['housing']['unknown'], [0, 1, 0, 0])
+
+    @override_settings(CONFERENCE_START='2025-08-01', CONFERENCE_END='2025-08-05')
+    def test_timeline_from_database(self):
+        reg = make_family(make_participant())  # 2 взрослых 1–4.08, ребёнок 1–3.08
+        Adult.objects.create(registration=reg, gender='female', age=30, is_full_week=True)
+        Adult.objects.create(registration=reg, age=30, participation_type='online')
+        with self.assertNumQueries(1):
+            data = occupancy.timeline()
+        self.assertEqual(data['present'], [4, 4, 4, 3, 1])
+        self.assertEqual(data['age_band'], {'18+': [3, 3, 3, 3, 1], '6-11': [1, 1, 1, 0, 0]})
+
+    def test_json_endpoint_and_dashboard(self):
+        make_family(make_participant())
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('occupancy_json'))
+        self.assertEqual(response.json()['present'][:4], [3, 3, 3, 2])
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, 'Belegung pro Tag')
+
+
+@override_settings(
+    CONFERENCE_START='2025-08-01', CONFERENCE_END='2025-08-04',
+    MEAL_RULES={'arrival': ['dinner'], 'departure': ['breakfast', 'lunch']},
+)
+class MealPlanTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Взрослые 1–4.08 (первый — вегетарианец), ребёнок 1–3.08
+        self.reg = make_family(
+            make_participant(), has_dietary_restrictions=True, dietary_details='Glutenfrei',
+        )
+
+    def test_portions_follow_meal_rules(self):
+        plan = meal_plan()
+        self.assertEqual(plan['meals']['breakfast']['normal'], [0, 2, 2, 1])
+        self.assertEqual(plan['meals']['dinner']['normal'], [2, 2, 1, 0])
+        self.assertEqual(plan['meals']['lunch']['vegetarian'], [0, 1, 1, 1])
+        diets = plan['special_diets']
+        self.assertEqual(diets['2025-08-03'], [{'name': 'Schmidt', 'details': 'Glutenfrei', 'people': 3}])
+        self.assertEqual(diets['2025-08-04'][0]['people'], 2)
+
+    def test_same_day_stay_gets_arrival_meals(self):
+        Adult.objects.create(
+            registration=self.reg, first_name='Tag', last_name='Gast', gender='male', age=30,
+            arrival_date=date(2025, 8, 2), departure_date=date(2025, 8, 2),
+        )
+        plan = meal_plan()
+        self.assertEqual(plan['meals']['dinner']['normal'], [2, 3, 1, 0])
+        self.assertEqual(plan['meals']['breakfast']['normal'], [0, 2, 2, 1])
+        self.assertEqual(plan['meals']['lunch']['normal'], [0, 2, 2, 1])
+
+    def test_cached_until_rows_change(self):
+        with self.assertNumQueries(2):
+            meal_plan()
+        with self.assertNumQueries(0):
+            meal_plan()
+        self.reg.adults.filter(food_preference='normal').get().delete()
+        self.assertEqual(meal_plan()['meals']['dinner']['normal'], [1, 1, 0, 0])
+
+    def test_page(self):
+        User.objects.create_user('admin', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        response = self.client.get(reverse('meal_plan'))
+        self.assertContains(response, 'Frühstück Vegetarisch')
+        self.assertContains(response, 'Schmidt (3): Glutenfrei')
+        response = self.client.get(reverse('meal_plan'), {'format': 'json'})
+        self.assertEqual(response.json()['days'][0], '2025-08-01')
+
+
+@override_settings(CONFERENCE_START='2025-08-01', CONFERENCE_END='2025-08-08')
+class KurtaxeTests(TestCase):
+    TARIFF = {
+        'bands': [
+            {'key': 'adults', 'name': 'Erwachsene', 'below': None, 'rate': '2.00'},
+            {'key': 'infants', 'name': 'Kleinkinder', 'below': 6, 'rate': '0.00'},
+            {'key': 'youth', 'name': 'Jugendliche', 'below': 18, 'rate': '1.00'},
+        ],
+        'students': {'key': 'students', 'name': 'Studenten', 'discount': '0.25', 'label': '25%'},
+    }
+
+    def test_tariff_bands_and_student_discount(self):
+        tariff = Tariff(**self.TARIFF)
+        result = compute_arrays(
+            is_child=[False, False, True, True, False],
+            ages=[40, 20, 4, 12, None],
+            students=[False, True, False, True, False],
+            nights=[3, 2, 3, 3, 1],
+            tariff=tariff,
+        )
+        groups = {group['key']: group for group in result['groups']}
+        self.assertEqual([group['key'] for group in result['groups']], ['youth', 'adults', 'students', 'infants'])
+        self.assertEqual((groups['adults']['people'], groups['adults']['nights']), (2, 4))
+        self.assertEqual(groups['adults']['kurtaxe_sum'], Decimal('8.00'))
+        # студент 20 лет: 2.00 × 0.75 × 2; школьник-студент 12 лет: 1.00 × 0.75 × 3
+        self.assertEqual(groups['students']['kurtaxe_sum'], Decimal('5.25'))
+        self.assertEqual(groups['infants']['discount'], '100%')
+        self.assertEqual(result['total'], Decimal('13.25'))
+
+    def test_child_without_age_uses_configured_band(self):
+        # В тарифе нет группы 'children': берётся самая младшая или заданная default_band
+        tariff = Tariff(**self.TARIFF)
+        self.assertEqual(tariff.classify(True, None, False), ('infants', Decimal('0.00')))
+        self.assertEqual(tariff.classify(False, None, False), ('adults', Decimal('2.00')))
+        tariff = Tariff(**self.TARIFF, default_band='youth')
+        result = compute_arrays([True], [None], [False], [2], tariff=tariff)
+        groups = {group['key']: group for group in result['groups']}
+        self.assertEqual((groups['youth']['people'], groups['youth']['kurtaxe_sum']), (1, Decimal('2.00')))
+        with self.assertRaises(ValueError):
+            Tariff(**self.TARIFF, default_band='kinder')
+
+    def test_report_per_registration_in_one_query(self):
+        first = make_family(make_participant())  # 2 × 3 ночи взрослых, ребёнок бесплатно
+        second = make_family(make_participant('boris@example.com'), adults=1, children=0)
+        second.adults.update(is_full_week=True, is_student=True)
+        Adult.objects.create(registration=second, age=30, participation_type='online', is_full_week=True)
+        with self.assertNumQueries(1):
+            report = kurtaxe_report()
+        self.assertEqual(report['registrations'][first.id]['total'], Decimal('15.00'))
+        self.assertEqual(report['registrations'][second.id]['total'], Decimal('8.75'))
+        self.assertEqual(report['total'], Decimal('23.75'))
+        context = dashboard_context()
+        self.assertEqual(context['kurtaxe_total'], Decimal('23.75'))
+        self.assertEqual(context['payment_list'][1]['kurtaxe'], Decimal('8.75'))
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('bench_kurtaxe', '--people', '50000', '--max-seconds', '1', stdout=out)
+        self.assertIn('50000 people', out.getvalue())
+
+
+# Текущий прайс и даты намеренно другие: миграция считает по своему снимку
+@override_settings(
+    CONFERENCE_START='2026-07-01', CONFERENCE_END='2026-07-03',
+    PRICING={
+        'full_week': '999.00', 'per_night': '99.00', 'online': '99.00',
+        'free_below': 0, 'child_discount': '0', 'student_discount': '0',
+    },
+)
+class PricingMigrationTests(TransactionTestCase):
+    migrate_from = [('users', '0006_room_bedassignment')]
+    migrate_to = [('users', '0007_registration_pricing')]
+
+    def test_existing_registrations_get_prices(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        old_apps = executor.loader.project_state(self.migrate_from).apps
+        participant = old_apps.get_model('users', 'Participant').objects.create(email='old@example.com')
+        OldRegistration = old_apps.get_model('users', 'Registration')
+        reg = OldRegistration.objects.create(participant=participant)
+        empty = OldRegistration.objects.create(participant=participant)
+        old_apps.get_model('users', 'Adult').objects.create(
+            registration=reg, age=40, arrival_date=date(2025, 8, 1), departure_date=date(2025, 8, 4),
+        )
+        old_apps.get_model('users', 'Child').objects.create(registration=reg, age=6, is_full_week=True)
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        executor.loader.build_graph()
+        new_apps = executor.loader.project_state(self.migrate_to).apps
+        migrated = new_apps.get_model('users', 'Registration').objects.get(pk=reg.pk)
+        self.assertEqual((migrated.people_count, migrated.nights_total), (2, 3 + 7))
+        self.assertEqual(migrated.partial_price, Decimal('105.00'))  # 3 × 35
+        self.assertEqual(migrated.full_price, Decimal('95.00'))  # 190 × 0.5
+        self.assertEqual(migrated.total_price, Decimal('200.00'))
+        self.assertEqual(new_apps.get_model('users', 'Registration').objects.get(pk=empty.pk).people_count, 0)
+
+        # Остальные тесты ожидают схему последней миграции
+        call_command('migrate', verbosity=0)
+
+
+class DashboardSeedMigrationTests(TransactionTestCase):
+    migrate_from = [('users', '0008_lookup_indexes')]
+    migrate_to = [('users', '0009_seed_dashboard_counters')]
+
+    def test_existing_data_is_counted(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        old_apps = executor.loader.project_state(self.migrate_from).apps
+        old_apps.get_model('users', 'DashboardCounter').objects.all().delete()
+        participant = old_apps.get_model('users', 'Participant').objects.create(email='old@example.com')
+        OldRegistration = old_apps.get_model('users', 'Registration')
+        reg = OldRegistration.objects.create(participant=participant)
+        OldRegistration.objects.create(participant=participant)
+        old_apps.get_model('users', 'Adult').objects.create(
+            registration=reg, age=40, housing_preference='brudershaus', services=0b101,
+            arrival_date=date(2025, 8, 1), departure_date=date(2025, 8, 4),
+        )
+        old_apps.get_model('users', 'Child').objects.create(
+            registration=reg, age=6, participation_type='online', housing_preference='family',
+        )
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        self.assertEqual(rollup.drift(), {})
+        stored = rollup.totals()
+        self.assertEqual((stored['people'], stored['children'], stored['nights']), (2, 1, 3))
+        self.assertEqual((stored['registrations'], stored['emails']), (2, 1))
+        self.assertEqual((stored['service_guitar'], stored['service_kids_small']), (1, 1))
+        self.assertEqual((stored['housing_brudershaus'], stored['housing_family']), (1, 0))
+
+        call_command('migrate', verbosity=0)
+
+
+@override_settings(
+    CONFERENCE_START='2025-08-01', CONFERENCE_END='2025-08-08',
+    PRICING={
+        'full_week': '190.00', 'per_night': '35.00', 'online': '20.00',
+        'free_below': 3, 'child_discount': '0.50', 'student_discount': '0.25',
+    },
+)
+class PricingTests(TestCase):
+    def test_prices_kept_on_registration(self):
+        reg = make_family(make_participant())  # 2 взрослых по 3 ночи, ребёнок 6 лет 2 ночи
+        reg.refresh_from_db()
+        self.assertEqual((reg.people_count, reg.nights_total), (3, 8))
+        self.assertEqual(reg.partial_price, Decimal('245.00'))  # 6 × 35 + 2 × 17.50
+        self.assertEqual(reg.full_price, Decimal('0.00'))
+
+        Adult.objects.create(registration=reg, age=22, is_student=True, is_full_week=True)
+        Adult.objects.create(registration=reg, age=50, participation_type='online')
+        Child.objects.create(registration=reg, age=1, is_full_week=True)
+        reg.refresh_from_db()
+        self.assertEqual(reg.people_count, 6)
+        self.assertEqual(reg.nights_total, 8 + 7 + 7)
+        self.assertEqual(reg.full_price, Decimal('142.50'))
+        self.assertEqual(reg.total_price, Decimal('407.50'))
+
+        reg.children.filter(age=1).delete()
+        reg.refresh_from_db()
+        self.assertEqual(reg.people_count, 5)
+
+    def test_edit_touches_only_its_registration(self):
+        first = make_family(make_participant())
+        second = make_family(make_participant('boris@example.com'), adults=1, children=0)
+        Registration.objects.filter(pk=first.pk).update(total_price=1)
+        adult = second.adults.get()
+        adult.is_full_week = True
+        adult.save()
+        self.assertEqual(Registration.objects.get(pk=first.pk).total_price, 1)
+        self.assertEqual(Registration.objects.get(pk=second.pk).total_price, Decimal('190.00'))
+
+    def test_recompute_all_in_bulk(self):
+        regs = [make_family(make_participant(f'p{i}@example.com')) for i in range(5)]
+        Registration.objects.update(total_price=0, people_count=0)
+        with self.assertNumQueries(3):  # цены + регистрации + bulk_update
+            self.assertEqual(pricing.recompute_all(), 5)
+        self.assertEqual(set(Registration.objects.values_list('total_price', flat=True)), {Decimal('245.00')})
+        call_command('recompute_prices', stdout=StringIO())
+        self.assertEqual(pricing.recompute_all(), 0)
+        context = dashboard_context()
+        self.assertEqual(context['payment_list'][0]['total'], Decimal('245.00'))
+        self.assertEqual(len(regs), len(context['payment_list']))
+
+
+SQLITE_WRITER = """
+import os, sys
+from datetime import date
+import django
+django.setup()
+from django.db import connection, transaction
+from users.models import Adult, Participant, Registration
+
+worker, count = sys.argv[1], int(sys.argv[2])
+participant = Participant.objects.create(first_name='W', last_name=worker, email=f'w{worker}@example.com')
+for i in range(count):
+    with transaction.atomic():
+        reg = Registration.objects.create(participant=participant)
+        Adult.objects.create(registration=reg, age=30, arrival_date=date(2025, 8, 1), departure_date=date(2025, 8, 3))
+with connection.cursor() as cursor:
+    cursor.execute('PRAGMA journal_mode')
+    print(cursor.fetchone()[0])
+"""
+
+
+class SqliteProductionProfileTests(SimpleTestCase):
+    """Несколько процессов одновременно пишут в один файл базы."""
+
+    WORKERS = 4
+    WRITES = 25
+
+    def run_django(self, env, *args, **kwargs):
+        return subprocess.Popen(
+            [sys.executable, *args], cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, **kwargs,
+        )
+
+    def test_concurrent_registration_writes(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            env = {
+                **os.environ,
+                'DJANGO_SETTINGS_MODULE': 'schramberg.settings',
+                'DATA_DIR': data_dir,
+                'SQLITE_PRODUCTION': 'True',
+                'HOUSING_AUTO_ALLOCATE': 'False',
+            }
+            for command in (['migrate', '--noinput'], ['rebuild_dashboard_rollup']):
+                setup = self.run_django(env, 'manage.py', *command)
+                _out, err = setup.communicate(timeout=120)
+                self.assertEqual(setup.returncode, 0, err)
+
+            writers = [
+                self.run_django(env, '-c', SQLITE_WRITER, str(worker), str(self.WRITES))
+                for worker in range(self.WORKERS)
+            ]
+            for writer in writers:
+                out, err = writer.communicate(timeout=120)
+                self.assertEqual(writer.returncode, 0, err)
+                self.assertEqual(out.strip(), 'wal')
+
+            db = sqlite3.connect(os.path.join(data_dir, 'db.sqlite3'))
+            try:
+                registrations = db.execute('SELECT COUNT(*) FROM users_registration').fetchone()[0]
+                counted = db.execute(
+                    "SELECT value FROM users_dashboardcounter WHERE key = 'registrations'"
+                ).fetchone()
+                prices = db.execute('SELECT COUNT(*) FROM users_registration WHERE people_count = 1').fetchone()[0]
+            finally:
+                db.close()
+            total = self.WORKERS * self.WRITES
+            self.assertEqual(registrations, total)
+            self.assertEqual(prices, total)
+            # UPDATE value = value + delta из разных процессов не теряет приращений
+            self.assertEqual(counted, (total,))
+
+
+class RegistrationBenchmarkTests(SimpleTestCase):
+    def test_bench_registration_smoke(self):
+        # Команда сама создаёт временную БД и тестовое окружение, поэтому в
+        # отдельном процессе: call_command внутри test runner их бы перезаписал
+        with tempfile.TemporaryDirectory() as data_dir:
+            output = os.path.join(data_dir, 'bench.json')
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'schramberg.settings', 'DATA_DIR': data_dir}
+            bench = subprocess.run(
+                [
+                    sys.executable, 'manage.py', 'bench_registration', '--families', '3', '--concurrency', '2',
+                    '--adults', '1', '--children', '1', '--fast-hashing', '--output', output,
+                ],
+                cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+            )
+            self.assertEqual(bench.returncode, 0, bench.stderr)
+            self.assertIn('3 families, concurrency 2', bench.stdout)
+            with open(output) as f:
+                result = json.load(f)
+        self.assertEqual(result['requests'], 3 * 8)
+        self.assertEqual(result['steps']['registration_add_child']['requests'], 3)
+        self.assertGreater(result['steps']['registration_overview']['queries_max'], 0)
+
+
+class ReportingDatabaseTests(SimpleTestCase):
+    # Свои соединения к временному файлу под алиасом reporting
+    databases = {'reporting'}
+
+    def test_router_sends_only_reads_to_reporting(self):
+        router = ReportingRouter()
+        with mock.patch('users.routers.reporting_alias', return_value='reporting'):
+            self.assertIsNone(router.db_for_read(Participant))
+            with reporting():
+                self.assertEqual(router.db_for_read(Participant), 'reporting')
+                self.assertEqual(router.db_for_write(Participant), 'default')
+            self.assertIsNone(router.db_for_read(Participant))
+        self.assertFalse(router.allow_migrate('reporting', 'users'))
+
+    def test_reporting_reads_never_take_write_locks(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, 'db.sqlite3')
+            writer = sqlite3.connect(path, isolation_level=None, timeout=0)
+            writer.execute('PRAGMA journal_mode=WAL')
+            writer.execute('CREATE TABLE t (x INTEGER)')
+            writer.execute('INSERT INTO t VALUES (1)')
+
+            reporting_settings = settings.DATABASES['reporting']
+            handler = ConnectionHandler({
+                'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+                'reporting': {
+                    **reporting_settings,
+                    'NAME': f"{Path(path).as_uri()}?mode=ro",
+                    'OPTIONS': {**reporting_settings['OPTIONS'], 'timeout': 0},
+                },
+            })
+            reader = handler['reporting']
+            try:
+                # Писатель держит RESERVED-блокировку — чтение идёт без ожидания
+                writer.execute('BEGIN IMMEDIATE')
+                writer.execute('INSERT INTO t VALUES (2)')
+                with reader.cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM t')
+                    self.assertEqual(cursor.fetchone(), (1,))
+                writer.execute('COMMIT')
+
+                # Долгое чтение в открытой транзакции не мешает писателю
+                with reader.cursor() as cursor:
+                    cursor.execute('BEGIN')
+                    cursor.execute('SELECT COUNT(*) FROM t')
+                    self.assertEqual(cursor.fetchone(), (2,))
+                    writer.execute('BEGIN IMMEDIATE')
+                    writer.execute('INSERT INTO t VALUES (3)')
+                    writer.execute('COMMIT')
+                    cursor.execute('SELECT COUNT(*) FROM t')
+                    self.assertEqual(cursor.fetchone(), (2,))  # снимок не изменился
+                    cursor.execute('ROLLBACK')
+
+                with self.assertRaises(DatabaseError), reader.cursor() as cursor:
+                    cursor.execute('INSERT INTO t VALUES (4)')
+            finally:
+                handler.close_all()
+                writer.close()
+
+
+class QueryPlanTests(TestCase):
+    """Горячие запросы должны идти по индексам, а не сканировать таблицы."""
+
+    def setUp(self):
+        self.participant = make_participant('Anna@Example.com')
+        self.reg = make_family(self.participant)
+
+    def assertUsesIndex(self, queryset, table):
+        plan = queryset.explain()
+        self.assertRegex(plan, rf'SEARCH {table} USING (COVERING )?INDEX', plan)
+        self.assertNotRegex(plan, rf'SCAN {table}\b', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_email_lookup_ignores_case_and_uses_index(self):
+        queryset = Participant.objects.filter(email_matches('ANNA@example.com'))
+        self.assertEqual(queryset.get(), self.participant)
+        self.assertUsesIndex(queryset, 'users_participant')
+
+    def test_registrations_of_participant_in_order(self):
+        self.assertUsesIndex(
+            Registration.objects.filter(participant=self.participant).order_by('created_at'),
+            'users_registration',
+        )
+
+    def test_people_by_registration_and_participation(self):
+        for model, table in ((Adult, 'users_adult'), (Child, 'users_child')):
+            with self.subTest(model=model.__name__):
+                self.assertUsesIndex(
+                    model.objects.filter(registration=self.reg, participation_type='onsite'), table,
+                )
+                self.assertUsesIndex(
+                    model.objects.filter(arrival_date__lte=date(2025, 8, 2), departure_date__gte=date(2025, 8, 2)),
+                    table,
+                )
+
+
+class RegistrationWizardTests(TestCase):
+    def setUp(self):
+        self.participant = make_participant()
+        session = self.client.session
+        session['participant_id'] = self.participant.id
+        session.save()
+        rollup.rebuild()
+
+    def adult_data(self, **overrides):
+        return {
+            'first_name': 'Max', 'last_name': 'Schmidt', 'gender': 'male',
+            'housing_preference': 'family', 'participation_type': 'onsite',
+            'arrival_date': '2025-08-01', 'departure_date': '2025-08-03',
+            'age': '40', 'food_preference': 'normal', 'services': ['guitar'],
+            **overrides,
+        }
+
+    def child_data(self, **overrides):
+        return {**self.adult_data(first_name='Mia', gender='female', age='5', services=[]), **overrides}
+
+    def test_steps_write_nothing_until_overview(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('registration_start'))
+            self.client.post(reverse('registration_add_adult'), self.adult_data())
+            self.client.post(reverse('registration_add_adult'), self.adult_data(first_name='Eva', gender='female'))
+            self.client.post(reverse('registration_add_child'), self.child_data())
+            self.client.post(reverse('registration_draft_adult', args=[1]), self.adult_data(first_name='Ella', gender='female'))
+            # GET ничего не меняет — удаление только формой с CSRF
+            self.assertEqual(self.client.get(reverse('registration_draft_remove', args=['child', 0])).status_code, 405)
+            self.assertContains(self.client.get(reverse('registration_start')), 'Mia')
+            self.client.post(reverse('registration_draft_remove', args=['child', 0]))
+            self.client.post(reverse('registration_add_child'), self.child_data(first_name='Tim', gender='male'))
+            self.client.post(reverse('registration_start'), {'comment': 'Hallo'})
+        writes = [
+            q['sql'] for q in queries
+            if not q['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+        self.assertTrue(all('django_session' in sql for sql in writes), writes)
+        self.assertFalse(Registration.objects.exists())
+
+        response = self.client.get(reverse('registration_overview'))
+        self.assertContains(response, 'Ella')
+        self.assertContains(response, 'Gitarre')
+        self.assertNotContains(response, 'Mia')
+
+        response = self.client.post(reverse('registration_overview'), {'comment': 'Hallo', 'payment_method': 'transfer'})
+        self.assertRedirects(response, reverse('participant_profile'))
+        reg = Registration.objects.get()
+        self.assertEqual((reg.comment, reg.payment_method, reg.people_count), ('Hallo', 'transfer', 3))
+        self.assertEqual(list(reg.adults.order_by('id').values_list('first_name', flat=True)), ['Max', 'Ella'])
+        self.assertEqual(reg.adults.get(first_name='Max').services_list, ['guitar'])
+        self.assertEqual(reg.children.get().first_name, 'Tim')
+        self.assertEqual(rollup.drift(), {})
+        self.assertNotIn('registration_draft', self.client.session)
+
+    def test_commit_is_one_transaction_with_bulk_inserts(self):
+        for _ in range(3):
+            self.client.post(reverse('registration_add_adult'), self.adult_data())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('registration_overview'), {})
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT INTO "users_adult"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Adult.objects.count(), 3)
+
+    def test_empty_draft_is_not_committed(self):
+        response = self.client.post(reverse('registration_overview'), {})
+        self.assertContains(response, 'mindestens eine Person')
+        self.assertFalse(Registration.objects.exists())
+
+    def test_purge_empty_registrations(self):
+        old = timezone.now() - timezone.timedelta(days=2)
+        empty = Registration.objects.create(participant=self.participant)
+        Registration.objects.create(participant=self.participant)  # свежая — не трогаем
+        family = make_family(self.participant)
+        Registration.objects.filter(pk__in=[empty.pk, family.pk]).update(created_at=old)
+        out = StringIO()
+        call_command('purge_empty_registrations', '--dry-run', stdout=out)
+        self.assertIn('1 empty', out.getvalue())
+        call_command('purge_empty_registrations', stdout=StringIO())
+        self.assertEqual(Registration.objects.count(), 2)
+        self.assertEqual(rollup.drift(), {})
+
+
+class FamilyEntryTests(TestCase):
+    def setUp(self):
+        self.participant = make_participant()
+        session = self.client.session
+        session['participant_id'] = self.participant.id
+        session.save()
+        rollup.rebuild()
+
+    def family_data(self, adults, children):
+        data = {'comment': 'Familie', 'payment_method': 'cash'}
+        for prefix, people in (('adults', adults), ('children', children)):
+            data.update({
+                f'{prefix}-TOTAL_FORMS': str(len(people) + 1),  # плюс пустая форма
+                f'{prefix}-INITIAL_FORMS': '0',
+            })
+            # Пустая форма — как её отправляет браузер: только значения селектов по умолчанию
+            blank = {'gender': 'male', 'housing_preference': 'family', 'participation_type': 'onsite', 'food_preference': 'normal'}
+            for i, person in enumerate([*people, blank]):
+                data.update({f'{prefix}-{i}-{key}': value for key, value in person.items()})
+        return data
+
+    def person(self, first_name, age, **overrides):
+        return {
+            'first_name': first_name, 'last_name': 'Becker', 'gender': 'female', 'age': str(age),
+            'participation_type': 'onsite', 'housing_preference': 'family', 'food_preference': 'normal',
+            'arrival_date': '2025-08-01', 'departure_date': '2025-08-05', **overrides,
+        }
+
+    def test_family_of_six_in_one_post(self):
+        adults = [self.person('Anna', 38), self.person('Paul', 40, gender='male', services='piano')]
+        children = [self.person(f'Kind{i}', 4 + i) for i in range(4)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('registration_family'), self.family_data(adults, children))
+        inserts = [q['sql'] for q in queries if q['sql'].startswith(('INSERT INTO "users_adult"', 'INSERT INTO "users_child"'))]
+        self.assertEqual(len(inserts), 2)
+        self.assertRedirects(response, reverse('participant_profile'))
+        reg = Registration.objects.get()
+        self.assertEqual((reg.people_count, reg.payment_method), (6, 'cash'))
+        self.assertEqual(reg.adults.get(first_name='Paul').services_list, ['piano'])
+        self.assertEqual(reg.children.count(), 4)
+        self.assertEqual(rollup.drift(), {})
+
+    def test_family_is_validated_together(self):
+        self.assertContains(self.client.get(reverse('registration_family')), 'Kind 4')
+        adults = [self.person('Anna', 38)]
+        children = [self.person('Kind', 5, arrival_date='2025-08-05', departure_date='2025-08-02')]
+        response = self.client.post(reverse('registration_family'), self.family_data(adults, children))
+        self.assertContains(response, 'Abreise muss nach der Anreise liegen')
+        response = self.client.post(reverse('registration_family'), self.family_data([], [self.person('Kind', 5)]))
+        self.assertContains(response, 'zusammen mit einem Erwachsenen')
+        response = self.client.post(reverse('registration_family'), self.family_data([], []))
+        self.assertContains(response, 'mindestens eine Person')
+        self.assertFalse(Registration.objects.exists())
+        self.assertFalse(Adult.objects.exists())
+
+
+    def test_departure_must_follow_arrival(self):
+        data = {
+            'first_name': 'Erik', 'last_name': 'Test', 'gender': 'male', 'age': '30',
+            'participation_type': 'onsite', 'food_preference': 'normal', 'housing_preference': 'family',
+            'arrival_date': '2025-08-03',
+        }
+        same_day = AdultForm(data={**data, 'departure_date': '2025-08-03'})
+        self.assertEqual(same_day.errors['departure_date'], ['Die Abreise muss nach der Anreise liegen.'])
+        self.assertTrue(AdultForm(data={**data, 'departure_date': '2025-08-04'}).is_valid())
+
+
+class SyntheticDataTests(TestCase):
+    def snapshot(self):
+        return list(Adult.objects.order_by('registration__participant__email', 'id').values_list(
+            'first_name', 'age', 'arrival_date', 'departure_date', 'housing_preference', 'services',
+        ))
+
+    def test_generate_is_consistent_and_reproducible(self):
+        counts = synthetic.generate(300, seed=7, batch_size=100)
+        self.assertGreaterEqual(counts['adults'] + counts['children'], 300)
+        self.assertEqual(Registration.objects.count(), counts['registrations'])
+        self.assertEqual(Child.objects.count(), counts['children'])
+        self.assertEqual(rollup.drift(), {})
+        # Цены посчитаны при генерации так же, как их пересчитал бы recompute_prices
+        self.assertEqual(pricing.recompute_all(), 0)
+        self.assertTrue(Adult.objects.filter(participation_type='online').exists())
+        self.assertTrue(Adult.objects.exclude(services=0).exists())
+        first = self.snapshot()
+
+        real = make_family(make_participant())
+        # Стоимость clear() не растёт с числом людей: ни дельт, ни пересчёта цен на строку
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(synthetic.clear(batch_size=7), counts['participants'])
+        self.assertLess(len(queries), counts['adults'] + counts['children'])
+        self.assertFalse([q for q in queries if 'UPDATE "users_registration"' in q['sql']])
+        self.assertEqual(list(Adult.objects.values_list('registration', flat=True).distinct()), [real.id])
+        self.assertEqual(rollup.totals()['registrations'], 1)
+        self.assertEqual(rollup.drift(), {})
+        real.participant.delete()
+        synthetic.generate(300, seed=7, batch_size=100)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_command_refuses_to_duplicate_seed(self):
+        call_command('generate_conference_data', '--people', '50', '--seed', '2', stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('generate_conference_data', '--people', '50', '--seed', '2', stdout=StringIO())
+        call_command('generate_conference_data', '--people', '50', '--seed', '2', '--clear', stdout=StringIO())
+        self.assertLess(Participant.objects.count(), 50)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    RATE_LIMITS={
+        'login': {'ip': (10, 60), 'email': (3, 300)},
+        'password_reset': {'ip': (5, 600), 'email': (2, 3600)},
+    },
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        ratelimit.reset()
+        cache.clear()
+        self.addCleanup(ratelimit.reset)
+
+    def login(self, email, ip='10.0.0.1'):
+        return self.client.post(
+            reverse('participant_login'), {'email': email, 'password': 'falsch123'}, REMOTE_ADDR=ip,
+        )
+
+    def test_login_burst_is_rejected_before_hashing(self):
+        make_participant(password='geheim123')
+        with mock.patch('users.views.check_password', return_value=False) as hashed:
+            statuses = [self.login(f'bot{i}@example.com').status_code for i in range(25)]
+        self.assertEqual(statuses.count(200), 10)
+        self.assertEqual(statuses.count(429), 15)
+        self.assertEqual(hashed.call_count, 0)  # таких email нет — хэш не считали ни разу
+        response = self.login('anna@example.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertContains(response, 'Zu viele Versuche', status_code=429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Другой адрес не затронут
+        self.assertEqual(self.login('anna@example.com', ip='10.0.0.2').status_code, 200)
+
+    def test_email_bucket_spans_addresses(self):
+        make_participant(password='geheim123')
+        with mock.patch('users.views.check_password', return_value=False) as hashed:
+            statuses = [self.login('ANNA@example.com', ip=f'10.1.0.{i}').status_code for i in range(8)]
+        self.assertEqual(statuses, [200] * 3 + [429] * 5)
+        self.assertEqual(hashed.call_count, 3)
+
+    def test_bucket_refills(self):
+        now = [1000.0]
+        with mock.patch('users.ratelimit.clock', lambda: now[0]):
+            for _ in range(3):
+                self.login('anna@example.com')
+            self.assertEqual(self.login('anna@example.com').status_code, 429)
+            now[0] += 100  # 3 жетона за 300 с → один за 100 с
+            self.assertEqual(self.login('anna@example.com').status_code, 200)
+            self.assertEqual(self.login('anna@example.com').status_code, 429)
+
+    def test_password_reset_burst_enqueues_only_allowed(self):
+        make_participant()
+        statuses = [
+            self.client.post(
+                reverse('participant_password_reset_request'), {'email': 'anna@example.com'},
+                REMOTE_ADDR=f'10.2.0.{i}',
+            ).status_code
+            for i in range(6)
+        ]
+        self.assertEqual(statuses, [302, 302, 429, 429, 429, 429])
+        self.assertEqual(OutboxEmail.objects.count(), 2)
+
+    @override_settings(RATE_LIMIT_BACKEND='cache')
+    def test_cache_backend_is_shared(self):
+        for _ in range(3):
+            self.login('anna@example.com')
+        ratelimit.reset()  # память процесса не участвует — вёдра в кэше
+        self.assertEqual(self.login('anna@example.com').status_code, 429)
+
+    def test_cache_backend_has_no_lost_updates(self):
+        buckets = [('ratelimit:login:email:x', 3, 3 / 300)]
+        backend = ratelimit.CacheBackend()
+        # У каждого потока свой объект кэша — подменяем метод класса
+        backend_class = type(caches['default'])
+        real_get_many = backend_class.get_many
+
+        def slow_get_many(self, keys, **kwargs):
+            # Окно между чтением и записью, в которое без замка влезают все потоки
+            found = real_get_many(self, keys, **kwargs)
+            time.sleep(0.02)
+            return found
+
+        barrier = threading.Barrier(8)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(backend.take(buckets, 1000.0))
+
+        with mock.patch.object(backend_class, 'get_many', slow_get_many):
+            threads = [threading.Thread(target=worker) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(None), 3)
+        self.assertFalse(cache.get('ratelimit:login:email:x:lock'))
+
+    def test_cache_backend_refuses_when_lock_is_held(self):
+        buckets = [('ratelimit:login:email:y', 3, 3 / 300)]
+        cache.add('ratelimit:login:email:y:lock', 1, 60)
+        with mock.patch('users.ratelimit.LOCK_WAIT', 0.02):
+            self.assertGreater(ratelimit.CacheBackend().take(buckets, 1000.0), 0)
+        cache.delete('ratelimit:login:email:y:lock')
+        self.assertIsNone(ratelimit.CacheBackend().take(buckets, 1000.0))
+
+    def forwarded_login(self, email, forwarded_for):
+        return self.client.post(
+            reverse('participant_login'), {'email': email, 'password': 'falsch123'},
+            HTTP_X_FORWARDED_FOR=forwarded_for, REMOTE_ADDR='10.3.0.1',
+        )
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR')
+    def test_spoofed_forwarded_entry_does_not_reset_bucket(self):
+        # Прокси дописал настоящий адрес справа; левую запись прислал клиент
+        statuses = [
+            self.forwarded_login(f'x{i}@example.com', f'198.51.100.{i}, 203.0.113.5').status_code
+            for i in range(11)
+        ]
+        self.assertEqual(statuses, [200] * 10 + [429])
+        self.assertEqual(self.forwarded_login('y@example.com', '203.0.113.6').status_code, 200)
+
+    @override_settings(RATE_LIMIT_IP_HEADER='HTTP_X_FORWARDED_FOR', RATE_LIMIT_TRUSTED_PROXIES=2)
+    def test_client_address_behind_two_proxies(self):
+        request = mock.Mock(META={'HTTP_X_FORWARDED_FOR': '198.51.100.7, 203.0.113.5, 10.0.0.9', 'REMOTE_ADDR': '10.0.0.2'})
+        self.assertEqual(ratelimit.client_ip(request), '203.0.113.5')
+        # Записей меньше, чем прокси, — заголовок подделан целиком
+        request.META['HTTP_X_FORWARDED_FOR'] = '203.0.113.5'
+        self.assertEqual(ratelimit.client_ip(request), '10.0.0.2')
+
+    @override_settings(ROOT_URLCONF='schramberg.async_urls', RATE_LIMIT_BACKEND='cache')
+    async def test_async_login_burst(self):
+        await sync_to_async(make_participant)(password='geheim123')
+        with mock.patch('users.async_views.acheck_password') as hashed:
+            hashed.return_value = False
+            statuses = [
+                (await self.async_client.post(
+                    reverse('participant_login'), {'email': 'anna@example.com', 'password': 'falsch123'},
+                )).status_code
+                for _ in range(5)
+            ]
+        self.assertEqual(statuses, [200, 200, 200, 429, 429])
+        self.assertEqual(hashed.call_count, 3)
@@ -18,6 +18,10 @@ urlpatterns = [
     path('anmeldung/neu/erwachsener/', views.registration_add_adult, name='registration_add_adult'),  # шаг 2
     path('anmeldung/neu/kind/', views.registration_add_child, name='registration_add_child'),         # шаг 3
     path('anmeldung/neu/abschluss/', views.registration_overview, name='registration_overview'),      # шаг 4
+    path('anmeldung/neu/familie/', views.registration_family, name='registration_family'),          # всё на одной странице
+    path('anmeldung/neu/erwachsener/<int:index>/', views.registration_add_adult, name='registration_draft_adult'),
+    path('anmeldung/neu/kind/<int:index>/', views.registration_add_child, name='registration_draft_child'),
+    path('anmeldung/neu/<str:kind>/<int:index>/entfernen/', views.registration_draft_remove, name='registration_draft_remove'),
 
 
     # Для редактирования и удаления Anmeldung (анмельдунга)
@@ -1,13 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.core.mail import send_mail
 from django.conf import settings
-from django.http import Http404
+from django.http import Http404, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.contrib.auth.hashers import check_password, make_password
 from django.contrib import messages
+from django.db import transaction
+from django.db.models import Prefetch
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.http import require_POST
 
 
-from .models import Participant, Registration, Adult, Child
+from .models import Participant, Registration, Adult, Child, email_matches
 from .forms import (
     ParticipantLoginForm,
     ParticipantRegisterForm,
@@ -16,12 +19,45 @@ from .forms import (
     RegistrationForm,
     AdultForm,
     ChildForm,
+    ExportFilterForm,
+    FamilyAdultFormSet,
+    FamilyChildFormSet,
+    validate_family,
 )
 from .utils import generate_password_reset_token, verify_password_reset_token
+from .stats import dashboard_context
+from .export import export_rows, stream_export
+from .outbox import enqueue_mail
+from . import drafts, occupancy, ratelimit, rollup
+from .meals import meal_plan, meal_plan_rows
+from .routers import reporting
+
+
+SERVICE_LABELS = dict(Adult.SERVICES_CHOICES)
+
+
+def with_people(queryset):
+    # Взрослые и дети одной пачкой на все регистрации, а не запросом на каждую
+    return queryset.prefetch_related(
+        Prefetch('adults', queryset=Adult.objects.order_by('id')),
+        Prefetch('children', queryset=Child.objects.order_by('id')),
+    )
+
+
+def attach_person_services(people):
+    # Подписи служений считаем один раз здесь, а не в шаблоне на каждой строке
+    for person in people:
+        person.services_display = ', '.join(SERVICE_LABELS.get(code, code) for code in person.services_list)
+
+
+def attach_services(registrations):
+    for reg in registrations:
+        attach_person_services([*reg.adults.all(), *reg.children.all()])
+    return registrations
 
 
 def registration_edit(request, reg_id):
-    reg = get_object_or_404(Registration, id=reg_id)
+    reg = get_object_or_404(with_people(Registration.objects.all()), id=reg_id)
     # Тут можно добавить проверку, что request.user/participant владеет этим reg
 
     if request.method == 'POST':
@@ -34,6 +70,7 @@ def registration_edit(request, reg_id):
     else:
         form = RegistrationForm(instance=reg)
 
+    attach_services([reg])
     adults = reg.adults.all()
     children = reg.children.all()
 
@@ -49,21 +86,23 @@ def registration_delete(request, reg_id):
     reg = get_object_or_404(Registration, id=reg_id)
     # Проверка владельца, если надо!
     if request.method == "POST":
-        reg.delete()
+        with transaction.atomic():
+            reg.delete()
         messages.success(request, "Anmeldung wurde gelöscht!")
         return redirect('participant_profile')
     # Если через GET, можно просто подтвердить удаление
     return render(request, 'users/registration_confirm_delete.html', {'reg': reg})
 
 def adult_edit(request, adult_id):
-    adult = get_object_or_404(Adult, id=adult_id)
+    adult = get_object_or_404(Adult.objects.select_related('registration__participant'), id=adult_id)
     reg = adult.registration
     participant = reg.participant
     # (Можно добавить проверку, что редактирует владелец)
     if request.method == 'POST':
         form = AdultForm(request.POST, instance=adult)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect('registration_edit', reg_id=reg.id)
     else:
         form = AdultForm(instance=adult)
@@ -73,17 +112,19 @@ def adult_edit(request, adult_id):
 def adult_delete(request, adult_id):
     adult = get_object_or_404(Adult, id=adult_id)
     reg_id = adult.registration.id
-    adult.delete()
+    with transaction.atomic():
+        adult.delete()
     return redirect('registration_edit', reg_id=reg_id)
 
 def child_edit(request, child_id):
-    child = get_object_or_404(Child, id=child_id)
+    child = get_object_or_404(Child.objects.select_related('registration__participant'), id=child_id)
     reg = child.registration
     participant = reg.participant
     if request.method == 'POST':
         form = ChildForm(request.POST, instance=child)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
             return redirect('registration_edit', reg_id=reg.id)
     else:
         form = ChildForm(instance=child)
@@ -93,7 +134,8 @@ def child_edit(request, child_id):
 def child_delete(request, child_id):
     child = get_object_or_404(Child, id=child_id)
     reg_id = child.registration.id
-    child.delete()
+    with transaction.atomic():
+        child.delete()
     return redirect('registration_edit', reg_id=reg_id)
 
 
@@ -101,103 +143,137 @@ def child_delete(request, child_id):
 # -------------- ПРОФИЛЬ УЧАСТНИКА ---------------
 
 def participant_profile(request):
-    participant = get_participant(request)
+    participant = request.participant
     if not participant:
         return redirect('participant_login')
-    registrations = Registration.objects.filter(participant=participant)
+    registrations = attach_services(with_people(
+        Registration.objects.filter(participant=participant).order_by('created_at')
+    ))
     return render(request, 'users/participant_profile.html', {
         'participant': participant,
         'registrations': registrations,
     })
 
 # ----------- МАСТЕР СОЗДАНИЯ АНМЕЛЬДУНГА -----------
+# Шаги мастера пишут только в черновик в сессии (drafts.py); в базу всё
+# попадает одной транзакцией на шаге «Abschluss».
+
+def _draft_context(draft):
+    adults = drafts.draft_people(draft, 'adult')
+    children = drafts.draft_people(draft, 'child')
+    attach_person_services([*adults, *children])
+    return {'adults': adults, 'children': children}
+
 
 def registration_start(request):
-    participant = get_participant(request)
+    participant = request.participant
     if not participant:
         return redirect('participant_login')
 
-    reg_id = request.session.get('reg_id')
-    reg = None
-
-    if reg_id:
-        try:
-            reg = Registration.objects.get(id=reg_id, participant=participant)
-        except Registration.DoesNotExist:
-            reg = None
-
-    # Если регистрации нет — создаём новую!
-    if not reg:
-        reg = Registration.objects.create(participant=participant)
-        request.session['reg_id'] = reg.id
-
+    draft = drafts.get_draft(request.session)
     if request.method == 'POST':
-        form = RegistrationForm(request.POST, instance=reg)
+        form = RegistrationForm(request.POST, instance=drafts.draft_registration(draft))
         if form.is_valid():
-            form.save()
-            # Если ты хочешь, чтобы после завершения всё удалялось:
-            del request.session['reg_id']
-            return redirect('participant_profile')
+            drafts.set_registration(request.session, form)
+            return redirect('registration_overview')
     else:
-        form = RegistrationForm(instance=reg)
-    return render(request, 'users/registration_start.html', {
-        'form': form,
-        'reg': reg,
-    })
+        form = RegistrationForm(instance=drafts.draft_registration(draft))
+    return render(request, 'users/registration_start.html', {'form': form, **_draft_context(draft)})
 
 
+def _draft_person(request, kind, form_class, template, index):
+    participant = request.participant
+    if not participant:
+        return redirect('participant_login')
+
+    instance = None
+    if index is not None:
+        people = drafts.draft_people(drafts.get_draft(request.session), kind)
+        if index >= len(people):
+            raise Http404
+        instance = people[index]
 
-def registration_add_adult(request):
-    participant = get_participant(request)
-    reg_id = request.session.get('reg_id')
-    reg = get_object_or_404(Registration, id=reg_id, participant=participant)
     if request.method == 'POST':
-        form = AdultForm(request.POST)
+        form = form_class(request.POST, instance=instance)
         if form.is_valid():
-            adult = form.save(commit=False)
-            adult.registration = reg
-            adult.save()
+            drafts.put_person(request.session, kind, form, index)
             return redirect('registration_start')
-        else:
-            messages.error(request, "Bitte korrigieren Sie die Fehler im Formular.")
+        messages.error(request, "Bitte korrigieren Sie die Fehler im Formular.")
     else:
-        form = AdultForm()
-    return render(request, 'users/registration_add_adult.html', {'form': form})
+        form = form_class(instance=instance)
+    return render(request, template, {'form': form, 'edit_mode': index is not None})
+
 
-def registration_add_child(request):
-    participant = get_participant(request)
-    reg_id = request.session.get('reg_id')
-    reg = get_object_or_404(Registration, id=reg_id, participant=participant)
+def registration_add_adult(request, index=None):
+    return _draft_person(request, 'adult', AdultForm, 'users/registration_add_adult.html', index)
+
+
+def registration_add_child(request, index=None):
+    return _draft_person(request, 'child', ChildForm, 'users/registration_add_child.html', index)
+
+
+@require_POST
+def registration_draft_remove(request, kind, index):
+    if kind not in drafts.PERSON_KINDS:
+        raise Http404
+    drafts.remove_person(request.session, kind, index)
+    return redirect('registration_start')
+
+
+def registration_overview(request):
+    participant = request.participant
+    if not participant:
+        return redirect('participant_login')
+
+    draft = drafts.get_draft(request.session)
     if request.method == 'POST':
-        form = ChildForm(request.POST)
+        form = RegistrationForm(request.POST, instance=drafts.draft_registration(draft))
         if form.is_valid():
-            child = form.save(commit=False)
-            child.registration = reg
-            child.save()
-            return redirect('registration_start')
+            if not draft['adults'] and not draft['children']:
+                form.add_error(None, "Bitte fügen Sie mindestens eine Person hinzu.")
+            else:
+                drafts.set_registration(request.session, form)
+                drafts.commit_draft(participant, drafts.get_draft(request.session))
+                drafts.clear_draft(request.session)
+                messages.success(request, "Anmeldung gespeichert!")
+                return redirect('participant_profile')
     else:
-        form = ChildForm()
-    return render(request, 'users/registration_add_child.html', {'form': form})
+        form = RegistrationForm(instance=drafts.draft_registration(draft))
+    return render(request, 'users/registration_overview.html', {'form': form, **_draft_context(draft)})
 
-def registration_overview(request):
-    participant = get_participant(request)
-    reg_id = request.session.get('reg_id')
-    reg = get_object_or_404(Registration, id=reg_id, participant=participant)
-    adults = reg.adults.all()
-    children = reg.children.all()
+def registration_family(request):
+    # Вся семья на одной странице: один POST, одна транзакция
+    participant = request.participant
+    if not participant:
+        return redirect('participant_login')
+
+    draft = drafts.get_draft(request.session)
     if request.method == 'POST':
-        form = RegistrationForm(request.POST, instance=reg)
-        if form.is_valid():
-            form.save()
-            del request.session['reg_id']
-            return redirect('participant_profile')
+        form = RegistrationForm(request.POST, instance=drafts.draft_registration(draft))
+        adult_formset = FamilyAdultFormSet(request.POST, prefix='adults')
+        child_formset = FamilyChildFormSet(request.POST, prefix='children')
+        # Все формы проверяются сразу, чтобы ошибки были видны одним заходом
+        if all([form.is_valid(), adult_formset.is_valid(), child_formset.is_valid()]):
+            errors = validate_family(adult_formset, child_formset)
+            for error in errors:
+                form.add_error(None, error)
+            if not errors:
+                drafts.commit_registration(
+                    participant, form.save(commit=False),
+                    adult_formset.people(), child_formset.people(),
+                )
+                drafts.clear_draft(request.session)
+                messages.success(request, "Anmeldung gespeichert!")
+                return redirect('participant_profile')
+        messages.error(request, "Bitte korrigieren Sie die Fehler im Formular.")
     else:
-        form = RegistrationForm(instance=reg)
-    return render(request, 'users/registration_overview.html', {
+        form = RegistrationForm(instance=drafts.draft_registration(draft))
+        adult_formset = FamilyAdultFormSet(prefix='adults')
+        child_formset = FamilyChildFormSet(prefix='children')
+    return render(request, 'users/registration_family.html', {
         'form': form,
-        'reg': reg,
-        'adults': adults,
-        'children': children,
+        'adult_formset': adult_formset,
+        'child_formset': child_formset,
     })
 
 # -------------- АВТОРИЗАЦИЯ/РЕГИСТРАЦИЯ -----------------
@@ -215,12 +291,18 @@ def participant_register(request):
 
 def participant_login(request):
     if request.method == 'POST':
+        # До хэширования пароля: перебор и боты не должны съедать CPU
+        retry_after = ratelimit.check('login', request, request.POST.get('email'))
+        if retry_after is not None:
+            return ratelimit.too_many_requests(
+                request, 'users/start_login.html', {'form': ParticipantLoginForm()}, retry_after,
+            )
         form = ParticipantLoginForm(request.POST)
         if form.is_valid():
             email = form.cleaned_data['email']
             raw_password = form.cleaned_data['password']
             try:
-                participant = Participant.objects.get(email__iexact=email)
+                participant = Participant.objects.get(email_matches(email))
                 if not check_password(raw_password, participant.password):
                     form.add_error('password', 'Falsches Passwort')
                 else:
@@ -237,16 +319,16 @@ def participant_logout(request):
         del request.session['participant_id']
     return redirect('participant_login')
 
-def get_participant(request):
-    participant_id = request.session.get('participant_id')
-    if not participant_id:
-        return None
-    return get_object_or_404(Participant, id=participant_id)
-
 # ------------- PASSWORD RESET (как у тебя было) -------------
 
 def participant_password_reset_request(request):
     if request.method == "POST":
+        retry_after = ratelimit.check('password_reset', request, request.POST.get('email'))
+        if retry_after is not None:
+            return ratelimit.too_many_requests(
+                request, 'users/participant_password_reset_request.html',
+                {'form': ParticipantPasswordResetRequestForm()}, retry_after,
+            )
         form = ParticipantPasswordResetRequestForm(request.POST)
         if form.is_valid():
             email = form.cleaned_data['email']
@@ -254,7 +336,7 @@ def participant_password_reset_request(request):
             reset_url = request.build_absolute_uri(
                 reverse('participant_password_reset_confirm', args=[token])
             )
-            send_mail(
+            enqueue_mail(
                 subject="Сброс пароля",
                 message=f"Перейдите по ссылке, чтобы сбросить пароль:\n{reset_url}",
                 from_email=settings.DEFAULT_FROM_EMAIL,
@@ -269,7 +351,7 @@ def participant_password_reset_confirm(request, token):
     email = verify_password_reset_token(token)
     if email is None:
         raise Http404("Неверный или просроченный токен.")
-    participant = Participant.objects.filter(email=email).first()
+    participant = Participant.objects.filter(email_matches(email)).first()
     if not participant:
         raise Http404("Участник не найден.")
     if request.method == "POST":
@@ -291,3 +373,47 @@ def participant_password_reset_complete(request):
 
 def privacy_policy(request):
     return render(request, 'users/privacy_policy.html')
+
+# ------------- АДМИН-ДАШБОРД -------------
+
+@staff_member_required
+def admin_dashboard(request):
+    # Итоги берём из готовой таблицы; пока её не построили — считаем на лету
+    with reporting():
+        context = dashboard_context(rollup.totals())
+        context['occupancy'] = occupancy.timeline_table(occupancy.timeline())
+    return render(request, 'users/dashboard.html', context)
+
+
+@staff_member_required
+def meal_plan_view(request):
+    with reporting():
+        plan = meal_plan()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(plan)
+    return render(request, 'users/meal_plan.html', {'plan': meal_plan_rows(plan)})
+
+
+@staff_member_required
+def occupancy_json(request):
+    with reporting():
+        return JsonResponse(occupancy.timeline())
+
+
+@staff_member_required
+def registrations_export(request):
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    return export_response(form, stream_export)
+
+
+def export_response(form, streamer):
+    fmt = form.cleaned_data['format'] or 'csv'
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(
+        streamer(fmt, export_rows(**form.filters())),
+        content_type=f'{content_type}; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="anmeldungen.{fmt}"'
+    return response